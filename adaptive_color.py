@@ -0,0 +1,471 @@
+import ctypes
+import ctypes.util
+import logging
+import sys
+import threading
+import time
+
+from frame_stats import FrameTimeHistogram
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # Falls back to sampling fewer pixels in pure Python
+
+logger = logging.getLogger(__name__)
+
+# sRGB channel value -> linear light, for WCAG relative luminance
+SRGB_TO_LINEAR = [c / 255 / 12.92 if c <= 10 else ((c / 255 + 0.055) / 1.055) ** 2.4 for c in range(256)]
+LUMA_WEIGHTS = (0.0722, 0.7152, 0.2126) # Blue, green, red (captured pixels are BGRX)
+
+ZPIXMAP = 2
+ALL_PLANES = 0xFFFFFFFF
+SRCCOPY = 0x00CC0020
+DIB_RGB_COLORS = 0
+
+class XImage(ctypes.Structure):
+    """The leading fields of Xlib's XImage (the function table that follows isn't needed)."""
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+    ]
+
+class BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ("biSize", ctypes.c_uint32),
+        ("biWidth", ctypes.c_int32),
+        ("biHeight", ctypes.c_int32),
+        ("biPlanes", ctypes.c_uint16),
+        ("biBitCount", ctypes.c_uint16),
+        ("biCompression", ctypes.c_uint32),
+        ("biSizeImage", ctypes.c_uint32),
+        ("biXPelsPerMeter", ctypes.c_int32),
+        ("biYPelsPerMeter", ctypes.c_int32),
+        ("biClrUsed", ctypes.c_uint32),
+        ("biClrImportant", ctypes.c_uint32),
+    ]
+
+class X11Grabber:
+    """Copies a screen region with XGetImage on its own display connection (works under Xvfb).
+
+    Note that without a compositor the copy includes the overlay's own pixels, which is
+    why the analysis can ignore a square around the center.
+    """
+
+    def __init__(self, x, y, width, height):
+        self.x, self.y, self.width, self.height = x, y, width, height
+        self.display = None
+        path = ctypes.util.find_library("X11")
+        if not path:
+            raise OSError("libX11 not found")
+        self.xlib = ctypes.cdll.LoadLibrary(path)
+        self.xlib.XOpenDisplay.restype = ctypes.c_void_p
+        self.xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self.xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        self.xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        self.xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        self.xlib.XGetImage.restype = ctypes.POINTER(XImage)
+        self.xlib.XGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.c_int,
+                                        ctypes.c_uint, ctypes.c_uint, ctypes.c_ulong, ctypes.c_int]
+        self.xlib.XDestroyImage.argtypes = [ctypes.POINTER(XImage)]
+        self.display = self.xlib.XOpenDisplay(None)
+        if not self.display:
+            raise OSError("could not open the X display")
+        self.root_window = self.xlib.XDefaultRootWindow(self.display)
+
+    def grab(self):
+        """Returns (BGRX bytes, width, height, bytes per row), or None if the copy failed."""
+        image = self.xlib.XGetImage(self.display, self.root_window, self.x, self.y,
+                                    self.width, self.height, ALL_PLANES, ZPIXMAP)
+        if not image:
+            return None
+        try:
+            contents = image.contents
+            if contents.bits_per_pixel != 32:
+                raise OSError(f"unsupported {contents.bits_per_pixel}-bit X visual")
+            pixels = ctypes.string_at(contents.data, contents.bytes_per_line * contents.height)
+            return pixels, contents.width, contents.height, contents.bytes_per_line
+        finally:
+            self.xlib.XDestroyImage(image)
+
+    def close(self):
+        if self.display:
+            self.xlib.XCloseDisplay(self.display)
+            self.display = None
+
+class GdiGrabber:
+    """Copies a screen region with BitBlt into a 32-bit DIB.
+
+    BitBlt without CAPTUREBLT leaves out layered windows, so the overlay itself isn't captured.
+    """
+
+    def __init__(self, x, y, width, height):
+        self.x, self.y, self.width, self.height = x, y, width, height
+        self.user32 = ctypes.windll.user32
+        self.gdi32 = ctypes.windll.gdi32
+        for name in ("GetDC", "CreateCompatibleDC", "CreateCompatibleBitmap", "SelectObject"):
+            getattr(self.user32 if name == "GetDC" else self.gdi32, name).restype = ctypes.c_void_p
+        self.user32.GetDC.argtypes = [ctypes.c_void_p]
+        self.user32.ReleaseDC.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        self.gdi32.CreateCompatibleDC.argtypes = [ctypes.c_void_p]
+        self.gdi32.CreateCompatibleBitmap.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int]
+        self.gdi32.SelectObject.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        self.gdi32.BitBlt.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                      ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_uint32]
+        self.gdi32.GetDIBits.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_uint,
+                                         ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint]
+        self.gdi32.DeleteObject.argtypes = [ctypes.c_void_p]
+        self.gdi32.DeleteDC.argtypes = [ctypes.c_void_p]
+
+        self.screen_dc = self.user32.GetDC(None)
+        self.memory_dc = self.gdi32.CreateCompatibleDC(self.screen_dc)
+        self.bitmap = self.gdi32.CreateCompatibleBitmap(self.screen_dc, width, height)
+        self.gdi32.SelectObject(self.memory_dc, self.bitmap)
+        self.header = BITMAPINFOHEADER(ctypes.sizeof(BITMAPINFOHEADER), width, -height, 1, 32) # Top-down rows
+        self.buffer = ctypes.create_string_buffer(width * height * 4)
+
+    def grab(self):
+        if not self.gdi32.BitBlt(self.memory_dc, 0, 0, self.width, self.height,
+                                 self.screen_dc, self.x, self.y, SRCCOPY):
+            return None
+        if not self.gdi32.GetDIBits(self.memory_dc, self.bitmap, 0, self.height, self.buffer,
+                                    ctypes.byref(self.header), DIB_RGB_COLORS):
+            return None
+        return self.buffer.raw, self.width, self.height, self.width * 4
+
+    def close(self):
+        if self.memory_dc:
+            self.gdi32.DeleteObject(self.bitmap)
+            self.gdi32.DeleteDC(self.memory_dc)
+            self.user32.ReleaseDC(None, self.screen_dc)
+            self.memory_dc = None
+
+class StaticGrabber:
+    """Replays captured BGRX frames in a loop, for testing without a screen."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+
+    def grab(self):
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        return frame
+
+    def close(self):
+        pass
+
+def screen_grabber(x, y, width, height):
+    """Returns the grabber for this platform, or None if the screen can't be captured."""
+    try:
+        if sys.platform == "win32":
+            return GdiGrabber(x, y, width, height)
+        if sys.platform.startswith("linux"):
+            return X11Grabber(x, y, width, height)
+    except (OSError, AttributeError) as e:
+        logger.warning("Screen capture unavailable, adaptive color disabled: %s", e)
+    return None
+
+def solid_frame(rgb, width, height):
+    """Returns a BGRX frame filled with one color."""
+    return bytes((rgb[2], rgb[1], rgb[0], 255)) * (width * height), width, height, width * 4
+
+def load_ppm(path):
+    """Reads a binary PPM (P6, 8-bit) screenshot as a BGRX frame."""
+    with open(path, "rb") as f:
+        data = f.read()
+    fields = []
+    pos = 0
+    while len(fields) < 4:
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b"#":
+            pos = data.index(b"\n", pos) + 1
+            continue
+        end = pos
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    if fields[0] != b"P6" or int(fields[3]) != 255:
+        raise ValueError(f"{path} is not an 8-bit binary PPM")
+    width, height = int(fields[1]), int(fields[2])
+    rgb = data[pos + 1:pos + 1 + width * height * 3]
+    bgrx = bytearray(width * height * 4)
+    bgrx[0::4] = rgb[2::3]
+    bgrx[1::4] = rgb[1::3]
+    bgrx[2::4] = rgb[0::3]
+    return bytes(bgrx), width, height, width * 4
+
+_mask_cache = {}
+
+def measure(pixels, width, height, stride, exclude=0, step=2):
+    """Returns the (mean, standard deviation) of the relative luminance (0-1) of a BGRX frame.
+
+    Every `step`-th pixel in each direction is used, skipping the centered square of
+    half-size `exclude` where the crosshair itself is drawn.
+    """
+    cx, cy = width // 2, height // 2
+    if np is not None:
+        image = np.frombuffer(pixels, np.uint8, count=stride * height).reshape(height, stride)
+        bgr = image[::step, :width * 4].reshape(-1, width, 4)[:, ::step, :3]
+        luminance = np.asarray(SRGB_TO_LINEAR, np.float32)[bgr] @ np.asarray(LUMA_WEIGHTS, np.float32)
+        if exclude:
+            key = (luminance.shape, step, cx, cy, exclude)
+            mask = _mask_cache.get(key)
+            if mask is None:
+                ys = np.arange(0, height, step)[:, None]
+                xs = np.arange(0, width, step)[None, :]
+                mask = (abs(ys - cy) > exclude) | (abs(xs - cx) > exclude)
+                _mask_cache[key] = mask
+            luminance = luminance[mask]
+        if luminance.size == 0:
+            return 0.0, 0.0
+        return float(luminance.mean()), float(luminance.std())
+
+    # Pure Python: sample four times fewer pixels to stay within a similar CPU cost
+    step *= 2
+    linear = SRGB_TO_LINEAR
+    wb, wg, wr = LUMA_WEIGHTS
+    total = total_sq = 0.0
+    count = 0
+    for y in range(0, height, step):
+        row = y * stride
+        inside_y = abs(y - cy) <= exclude
+        for x in range(0, width, step):
+            if inside_y and abs(x - cx) <= exclude:
+                continue
+            i = row + x * 4
+            value = wb * linear[pixels[i]] + wg * linear[pixels[i + 1]] + wr * linear[pixels[i + 2]]
+            total += value
+            total_sq += value * value
+            count += 1
+    if not count:
+        return 0.0, 0.0
+    mean = total / count
+    return mean, max(total_sq / count - mean * mean, 0.0) ** 0.5
+
+def relative_luminance(rgb):
+    return (LUMA_WEIGHTS[2] * SRGB_TO_LINEAR[rgb[0]] + LUMA_WEIGHTS[1] * SRGB_TO_LINEAR[rgb[1]]
+            + LUMA_WEIGHTS[0] * SRGB_TO_LINEAR[rgb[2]])
+
+def contrast_ratio(l1, l2):
+    """WCAG contrast ratio between two relative luminances (1-21)."""
+    if l1 < l2:
+        l1, l2 = l2, l1
+    return (l1 + 0.05) / (l2 + 0.05)
+
+class ColorChooser:
+    """Picks the palette color that stands out best against the measured background.
+
+    A color is scored by its contrast ratio against the darker and the brighter side of
+    the background (mean -/+ one standard deviation), keeping the worse of the two, so a
+    busy background favours colors that read on both. The measurements are smoothed, and
+    the choice only changes when another color scores `hysteresis` better than the current
+    one, so the crosshair doesn't flicker at the boundary. In "blend" mode the shown color
+    fades toward the choice over a few samples instead of switching at once.
+    """
+
+    def __init__(self, palette, hysteresis=0.25, smoothing=0.5, mode="pick"):
+        self.palette = [tuple(int(c) for c in color[:3]) for color in palette]
+        self.luminances = [relative_luminance(color) for color in self.palette]
+        self.hysteresis = hysteresis
+        self.smoothing = smoothing
+        self.mode = mode
+        self.mean = None
+        self.spread = 0.0
+        self.current = None # Index of the chosen palette color
+        self.shown = None # RGB currently shown (differs from the choice while blending)
+        self.switches = 0
+
+    def score(self, index):
+        luminance = self.luminances[index]
+        return min(contrast_ratio(luminance, max(self.mean - self.spread, 0.0)),
+                   contrast_ratio(luminance, min(self.mean + self.spread, 1.0)))
+
+    def update(self, mean, spread):
+        """Feeds one measurement. Returns the (crosshair RGB, outline RGB or None) to show."""
+        if self.mean is None:
+            self.mean, self.spread = mean, spread
+        else:
+            self.mean += (mean - self.mean) * self.smoothing
+            self.spread += (spread - self.spread) * self.smoothing
+        best = max(range(len(self.palette)), key=self.score)
+        if self.current is None:
+            self.current = best
+        elif best != self.current and self.score(best) > self.score(self.current) * (1 + self.hysteresis):
+            self.current = best
+            self.switches += 1
+        target = self.palette[self.current]
+        if self.mode == "blend" and self.shown is not None:
+            # Halve the remaining difference each sample, then snap once it's invisible
+            shown = tuple(s + (t - s) // 2 if abs(t - s) > 2 else t for s, t in zip(self.shown, target))
+        else:
+            shown = target
+        self.shown = shown
+        # The outline is the palette color that contrasts most with the crosshair color
+        outline = None
+        if len(self.palette) > 1:
+            shown_luminance = relative_luminance(shown)
+            outline = max((color for i, color in enumerate(self.palette) if i != self.current),
+                          key=lambda color: contrast_ratio(relative_luminance(color), shown_luminance))
+        return shown, outline
+
+class AdaptiveColorSampler:
+    """Samples the screen around the crosshair on a background thread and picks its colors.
+
+    The thread grabs and analyzes the region `rate_hz` times a second, but measures the CPU
+    time each sample costs and sleeps long enough to stay under `cpu_budget` (a fraction of
+    one core), so a slow capture path lowers the rate instead of stealing time from the game.
+    The Tk thread only reads `colors`, a (crosshair RGB, outline RGB or None) tuple.
+    """
+
+    def __init__(self, grabber_factory, rate_hz=4.0, cpu_budget=0.02, exclude=0):
+        self.grabber_factory = grabber_factory # Called on the sampler thread, which owns the grabber
+        self.rate_hz = rate_hz
+        self.cpu_budget = cpu_budget
+        self.exclude = exclude
+        self.chooser = None
+        self.colors = None
+        self.samples = 0
+        self.failures = 0
+        self.throttled = 0 # Samples after which the CPU budget stretched the interval
+        self.costs = FrameTimeHistogram() # CPU time per sample (ms)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def configure(self, palette, hysteresis=0.25, mode="pick", rate_hz=None, cpu_budget=None, exclude=None):
+        """Sets the palette and tuning. Replacing the chooser restarts the color choice."""
+        self.chooser = ColorChooser(palette, hysteresis, mode=mode)
+        if rate_hz is not None:
+            self.rate_hz = rate_hz
+        if cpu_budget is not None:
+            self.cpu_budget = cpu_budget
+        if exclude is not None:
+            self.exclude = exclude
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="adaptive-color", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def sample(self, grabber):
+        """Grabs, measures and chooses once. Returns the colors, or None if the grab failed."""
+        chooser = self.chooser
+        frame = grabber.grab()
+        if frame is None or chooser is None:
+            self.failures += 1
+            return None
+        mean, spread = measure(*frame, exclude=self.exclude)
+        self.colors = chooser.update(mean, spread)
+        self.samples += 1
+        return self.colors
+
+    def _run(self):
+        grabber = self.grabber_factory()
+        if grabber is None:
+            return
+        try:
+            while not self._stop.is_set():
+                start = time.thread_time()
+                try:
+                    self.sample(grabber)
+                except Exception as e:
+                    self.failures += 1
+                    logger.error("Adaptive color sample failed: %s", e)
+                cost = time.thread_time() - start
+                self.costs.add(cost * 1000)
+                interval = 1.0 / max(self.rate_hz, 0.1)
+                if self.cpu_budget > 0 and cost / self.cpu_budget > interval:
+                    interval = cost / self.cpu_budget
+                    self.throttled += 1
+                self._stop.wait(interval)
+        finally:
+            grabber.close()
+
+    def get_stats(self):
+        chooser = self.chooser
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "numpy": np is not None,
+            "samples": self.samples,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "switches": chooser.switches if chooser else 0,
+            "background_luminance": round(chooser.mean, 3) if chooser and chooser.mean is not None else None,
+            "colors": self.colors,
+            "cpu_ms": self.costs.summary()
+        }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check adaptive crosshair colors against screenshots or the screen.")
+    parser.add_argument("images", nargs="*", help="binary PPM screenshots to analyze (default: built-in checks)")
+    parser.add_argument("--grab", type=int, metavar="SIZE", help="sample a SIZE x SIZE region at the screen's top-left")
+    args = parser.parse_args()
+    palette = [(255, 255, 255), (0, 255, 0), (0, 0, 0)]
+
+    if args.images or args.grab:
+        sampler = AdaptiveColorSampler(None)
+        sampler.configure(palette)
+        if args.grab:
+            grabbers = [screen_grabber(0, 0, args.grab, args.grab)]
+        else:
+            grabbers = [StaticGrabber([load_ppm(path)]) for path in args.images]
+        for grabber in grabbers:
+            if grabber is not None:
+                print(sampler.sample(grabber))
+                grabber.close()
+        print(sampler.get_stats())
+        sys.exit(0)
+
+    # Dark background -> the brightest color; bright background -> black
+    chooser = ColorChooser(palette, smoothing=1.0)
+    dark, bright = solid_frame((20, 20, 30), 64, 64), solid_frame((235, 235, 220), 64, 64)
+    assert chooser.update(*measure(*dark))[0] == (255, 255, 255)
+    assert chooser.update(*measure(*bright)) == ((0, 0, 0), (255, 255, 255))
+
+    # Hysteresis: a mid-grey that slightly favours white doesn't flip the choice back
+    mid = solid_frame((118, 118, 118), 64, 64)
+    assert chooser.update(*measure(*mid))[0] == (0, 0, 0) and chooser.switches == 1
+
+    # The excluded center (where the crosshair is) doesn't affect the measurement
+    pixels = bytearray(dark[0])
+    for y in range(24, 40):
+        for x in range(24, 40):
+            pixels[(y * 64 + x) * 4:(y * 64 + x) * 4 + 3] = b"\xff\xff\xff"
+    assert measure(bytes(pixels), 64, 64, 256, exclude=16) == measure(*dark, exclude=16)
+
+    # Blending fades toward the new choice over several samples
+    blender = ColorChooser(palette, smoothing=1.0, mode="blend")
+    blender.update(*measure(*dark))
+    steps = [blender.update(*measure(*bright))[0] for _ in range(10)]
+    assert steps[0] not in palette and steps[-1] == (0, 0, 0)
+
+    # The sampler thread stays under its CPU budget
+    sampler = AdaptiveColorSampler(lambda: StaticGrabber([dark, bright]), rate_hz=1000, cpu_budget=0.05)
+    sampler.configure(palette)
+    sampler.start()
+    time.sleep(0.5)
+    sampler.stop()
+    stats = sampler.get_stats()
+    assert stats["samples"] > 0 and not stats["running"]
+    print(stats)
+    print("Adaptive color checks passed.")
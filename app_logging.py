@@ -0,0 +1,113 @@
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(threadName)s %(name)s: %(message)s"
+CONSOLE_FORMAT = "%(message)s"
+
+class RateLimitFilter(logging.Filter):
+    """Lets each DEBUG message template through at most once per interval.
+
+    Records are keyed by logger name and unformatted message, so a message logged from
+    an input hook on every event costs one dict lookup when it's suppressed. The next record
+    that gets through reports how many were dropped. INFO and above are never limited.
+    """
+
+    def __init__(self, interval=1.0):
+        super().__init__()
+        self.interval = interval
+        self._last_emit = {} # (logger name, msg) -> monotonic time of the last record let through
+        self._suppressed = {} # (logger name, msg) -> records dropped since then
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        last = self._last_emit.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+        self._last_emit[key] = now
+        dropped = self._suppressed.pop(key, 0)
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} similar suppressed)"
+        return True
+
+class EnqueueOnlyHandler(logging.handlers.QueueHandler):
+    """QueueHandler that hands the record over untouched.
+
+    The stock QueueHandler formats the message on the calling thread. Here formatting is
+    left to the listener thread, so producers (including pynput hook threads) only pay for
+    creating the record and one queue put. Log arguments must therefore not be mutated
+    after the call; pass strings and numbers, not live sets or dicts.
+    """
+
+    def prepare(self, record):
+        return record
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+_log_file = None
+
+def _make_handlers(log_file):
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    handlers = [console]
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=1_000_000, backupCount=2,
+                                                            encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(file_handler)
+    return tuple(handlers)
+
+def start_logging(level=logging.INFO, log_file=None, debug_interval=1.0):
+    """Routes all logging through a queue drained by a background thread. Safe to call twice."""
+    global _listener, _queue_handler, _log_file
+    with _lock:
+        if _listener is not None:
+            return
+        log_queue = queue.SimpleQueue()
+        _queue_handler = EnqueueOnlyHandler(log_queue)
+        _queue_handler.addFilter(RateLimitFilter(debug_interval))
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+        _log_file = log_file or None
+        _listener = logging.handlers.QueueListener(log_queue, *_make_handlers(_log_file),
+                                                   respect_handler_level=True)
+        _listener.start()
+
+def configure_logging(level, log_file=None):
+    """Applies a new level and log file while running. The handler swap happens between records."""
+    global _log_file
+    logging.getLogger().setLevel(level.upper() if isinstance(level, str) else level)
+    with _lock:
+        if _listener is None or (log_file or None) == _log_file:
+            return
+        old_handlers = _listener.handlers
+        try:
+            _listener.handlers = _make_handlers(log_file)
+        except OSError as e:
+            logging.getLogger(__name__).error("Could not open log file %s: %s", log_file, e)
+            return
+        _log_file = log_file or None
+    for handler in old_handlers:
+        handler.close()
+
+def stop_logging():
+    """Flushes queued records and stops the listener thread."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener = None
+        _queue_handler = None
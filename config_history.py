@@ -0,0 +1,122 @@
+import copy
+import json
+from collections import deque
+
+_MISSING = object() # Marks a key that didn't exist on one side of a change
+
+class ConfigHistory:
+    """Undo/redo for configuration edits, stored as per-key deltas.
+
+    Each entry maps only the keys an edit changed to their (old, new) values, so a history
+    of hundreds of edits costs about as much as the values that actually changed. Both stacks
+    are bounded deques; the oldest entries fall off once `limit` is reached.
+
+    The history can be mirrored to an append-only JSON Lines journal: one line per edit, undo
+    or redo. replay() rebuilds the stacks from those lines, and compacted_lines() produces the
+    shortest journal that rebuilds the current stacks.
+    """
+
+    def __init__(self, limit=100):
+        self.limit = limit
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = deque(maxlen=limit)
+
+    def set_limit(self, limit):
+        """Changes the maximum number of undo (and redo) entries, keeping the newest ones."""
+        if limit != self.limit:
+            self.limit = limit
+            self.undo_stack = deque(self.undo_stack, maxlen=limit)
+            self.redo_stack = deque(self.redo_stack, maxlen=limit)
+
+    @staticmethod
+    def diff(old, new):
+        """Returns {key: (old value, new value)} for every key that differs between two configs."""
+        delta = {}
+        for key in old.keys() | new.keys():
+            before = old.get(key, _MISSING)
+            after = new.get(key, _MISSING)
+            if before != after:
+                # Copy so later in-place edits of lists in either config can't rewrite history
+                delta[key] = (copy.deepcopy(before), copy.deepcopy(after))
+        return delta
+
+    def record(self, old, new):
+        """Records the change from old to new. Returns the delta, or None if nothing changed."""
+        delta = self.diff(old, new)
+        if not delta:
+            return None
+        self.undo_stack.append(delta)
+        self.redo_stack.clear()
+        return delta
+
+    @staticmethod
+    def _apply(config, delta, side):
+        for key, values in delta.items():
+            value = values[side]
+            if value is _MISSING:
+                config.pop(key, None)
+            else:
+                config[key] = copy.deepcopy(value)
+
+    def undo(self, config):
+        """Reverts the latest edit in config (in place). Returns the delta, or None if there is none."""
+        if not self.undo_stack:
+            return None
+        delta = self.undo_stack.pop()
+        self._apply(config, delta, 0)
+        self.redo_stack.append(delta)
+        return delta
+
+    def redo(self, config):
+        """Re-applies the latest undone edit in config (in place). Returns the delta, or None."""
+        if not self.redo_stack:
+            return None
+        delta = self.redo_stack.pop()
+        self._apply(config, delta, 1)
+        self.undo_stack.append(delta)
+        return delta
+
+    @staticmethod
+    def encode(op, delta=None):
+        """Returns one journal line for an "edit", "undo" or "redo"."""
+        entry = {"op": op}
+        if delta is not None:
+            changes = {}
+            for key, (before, after) in delta.items():
+                change = {}
+                if before is not _MISSING:
+                    change["old"] = before
+                if after is not _MISSING:
+                    change["new"] = after
+                changes[key] = change
+            entry["changes"] = changes
+        return json.dumps(entry, separators=(",", ":")) + "\n"
+
+    def replay(self, lines):
+        """Rebuilds the stacks from journal lines. Malformed lines are skipped. Returns the line count."""
+        count = 0
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                op = entry["op"]
+                if op == "edit":
+                    delta = {key: (change.get("old", _MISSING), change.get("new", _MISSING))
+                             for key, change in entry["changes"].items()}
+                    self.undo_stack.append(delta)
+                    self.redo_stack.clear()
+                elif op == "undo" and self.undo_stack:
+                    self.redo_stack.append(self.undo_stack.pop())
+                elif op == "redo" and self.redo_stack:
+                    self.undo_stack.append(self.redo_stack.pop())
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue
+            count += 1
+        return count
+
+    def compacted_lines(self):
+        """Returns the shortest journal that rebuilds the current undo and redo stacks."""
+        lines = [self.encode("edit", delta) for delta in self.undo_stack]
+        # Redo entries were originally applied in the reverse of their stack order
+        lines.extend(self.encode("edit", delta) for delta in reversed(self.redo_stack))
+        lines.extend(self.encode("undo") for _ in self.redo_stack)
+        return lines
@@ -0,0 +1,232 @@
+import asyncio
+import concurrent.futures
+import getpass
+import hmac
+import json
+import logging
+import os
+import queue
+import secrets
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import time
+
+from frame_stats import FrameTimeHistogram
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTROL_PORT = 47800 # Loopback TCP port used where Unix-domain sockets are unavailable
+RESPONSE_TIMEOUT = 2.0 # Seconds to wait for the overlay to apply a command
+
+def _user_id():
+    """Returns the uid (the user name where there are no uids) that names per-user files."""
+    return str(os.getuid()) if hasattr(os, "getuid") else getpass.getuser()
+
+def _runtime_dir():
+    """Returns the current user's private runtime directory: $XDG_RUNTIME_DIR, or a 0700 temp subfolder."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return runtime_dir
+    return os.path.join(tempfile.gettempdir(), f"crosshair-{_user_id()}")
+
+def default_socket_path():
+    """Returns the default location of the control socket, private to the current user."""
+    return os.path.join(_runtime_dir(), f"crosshair_control_{_user_id()}.sock")
+
+def ensure_private_dir(path):
+    """Creates a 0700 directory, refusing one that another user owns."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a directory owned by this user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+
+def _socket_in_use(path):
+    """True if something is accepting connections on the Unix socket at path."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+def default_token_path(port=DEFAULT_CONTROL_PORT):
+    """Returns where the TCP transport's access token is written for a given port."""
+    return os.path.join(tempfile.gettempdir(), f"crosshair_control_{port}.token")
+
+def read_token(port=DEFAULT_CONTROL_PORT):
+    """Reads the access token a running overlay wrote for its TCP port."""
+    with open(default_token_path(port), "r") as f:
+        return f.read().strip()
+
+def uses_unix_socket():
+    """Unix-domain sockets are used wherever asyncio supports them."""
+    return hasattr(asyncio, "start_unix_server") and sys.platform != "win32"
+
+def parse_command(line):
+    """Splits a command line into (command, args). Arguments are parsed as JSON where possible.
+
+    A JSON object or array right after the command is one argument, spaces and all.
+    """
+    parts = line.strip().split(None, 2)
+    if not parts:
+        raise ValueError("Empty command")
+    command = parts[0].lower()
+    args = []
+    rest = line.strip()[len(parts[0]):].lstrip()
+    if rest[:1] in ("{", "["):
+        try:
+            return command, [json.loads(rest)]
+        except json.JSONDecodeError:
+            pass # Not a single JSON value; split it as usual
+    if len(parts) > 1:
+        args.append(parts[1])
+    if len(parts) > 2:
+        try:
+            args.append(json.loads(parts[2]))
+        except json.JSONDecodeError:
+            args.append(parts[2]) # Bare strings, e.g. `set jitter_mode up`
+    return command, args
+
+class ControlServer:
+    """Accepts control commands on a local socket and hands them to the overlay between frames.
+
+    The asyncio loop runs in a background thread and only parses and queues commands.
+    The overlay calls drain() from its frame loop, so every change is applied on the Tk thread.
+
+    The Unix-domain socket lives in a per-user 0700 directory and is itself owner-only. Loopback TCP has no such permissions, so
+    there each connection must first send `auth <token>` with the token the server writes
+    to default_token_path(port), a file only the current user can read.
+    """
+
+    def __init__(self, path=None, port=DEFAULT_CONTROL_PORT, on_queued=None):
+        self.path = path or default_socket_path()
+        self.port = port
+        self.on_queued = on_queued # Called on the server thread after each command is queued
+        self.pending = queue.SimpleQueue()
+        self.handle_times = FrameTimeHistogram() # Time spent applying commands on the Tk thread
+        self.token = None # Required from TCP clients (see _start)
+        self._bound = False # Whether this server created the socket (or token) file
+        self.loop = None
+        self._server = None
+        self.thread = threading.Thread(target=self._run, name="control-server", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._start())
+        except OSError as e:
+            logger.error("Could not start control socket: %s", e)
+            self.loop.close()
+            return
+        self.loop.run_forever()
+        self._server.close()
+        self.loop.run_until_complete(self._server.wait_closed())
+        self.loop.close()
+
+    async def _start(self):
+        if uses_unix_socket():
+            if self.path == default_socket_path():
+                ensure_private_dir(os.path.dirname(self.path))
+            if os.path.exists(self.path):
+                if _socket_in_use(self.path):
+                    raise OSError(f"{self.path} is in use by another overlay")
+                os.unlink(self.path) # Stale socket from a previous run
+            self._server = await asyncio.start_unix_server(self._handle_client, path=self.path)
+            self._bound = True
+            os.chmod(self.path, 0o600) # The directory already keeps other users out
+            logger.info("Control socket listening on %s", self.path)
+        else:
+            self.token = secrets.token_hex(16)
+            token_path = default_token_path(self.port)
+            if os.path.exists(token_path):
+                os.unlink(token_path) # Stale token from a previous run
+            fd = os.open(token_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(self.token)
+            self._bound = True
+            self._server = await asyncio.start_server(self._handle_client, host="127.0.0.1", port=self.port)
+            logger.info("Control socket listening on 127.0.0.1:%s", self.port)
+
+    async def _handle_client(self, reader, writer):
+        try:
+            if self.token is not None and not await self._authenticate(reader, writer):
+                return
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self._execute(line.decode("utf-8", "replace"))
+                writer.write((json.dumps(response) + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _authenticate(self, reader, writer):
+        """Reads the `auth <token>` line a TCP client must send first. Returns True if it matched."""
+        line = await reader.readline()
+        try:
+            command, args = parse_command(line.decode("utf-8", "replace"))
+        except ValueError:
+            command, args = None, []
+        if command == "auth" and len(args) == 1 and hmac.compare_digest(str(args[0]), self.token):
+            response = {"ok": True, "result": "authenticated"}
+        else:
+            response = {"ok": False, "error": "Authentication required"}
+        writer.write((json.dumps(response) + "\n").encode("utf-8"))
+        await writer.drain()
+        return response["ok"]
+
+    async def _execute(self, line):
+        try:
+            command, args = parse_command(line)
+        except ValueError as e:
+            return {"ok": False, "error": str(e)}
+        future = concurrent.futures.Future()
+        self.pending.put((command, args, future))
+        if self.on_queued is not None:
+            self.on_queued()
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), RESPONSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": "Timed out waiting for the overlay"}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "result": result}
+
+    def drain(self, handler):
+        """Applies all queued commands with handler(command, args). Must be called on the Tk thread."""
+        while True:
+            try:
+                command, args, future = self.pending.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue # The client already gave up waiting
+            start = time.perf_counter()
+            try:
+                future.set_result(handler(command, args))
+            except Exception as e:
+                future.set_exception(e)
+            self.handle_times.add((time.perf_counter() - start) * 1000)
+
+    def stop(self):
+        """Stops the asyncio loop and removes the socket (or token) file."""
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=1.0)
+        if not self._bound:
+            return # Another instance's file, if any, isn't ours to remove
+        path = self.path if uses_unix_socket() else default_token_path(self.port)
+        if os.path.exists(path):
+            os.unlink(path)
@@ -0,0 +1,91 @@
+"""Command-line client for the overlay's control socket.
+
+Examples:
+    python crosshair_ctl.py set gap 8
+    python crosshair_ctl.py set crosshair_color [0,255,0,255]
+    python crosshair_ctl.py preset Classic
+    python crosshair_ctl.py state
+    python crosshair_ctl.py stats
+"""
+import argparse
+import json
+import socket
+import sys
+
+from control_server import DEFAULT_CONTROL_PORT, default_socket_path, read_token, uses_unix_socket
+
+class ControlClient:
+    """A connection to the control socket that stays open for any number of commands.
+
+    Over loopback TCP it first authenticates with the token the overlay wrote for the port.
+    """
+
+    def __init__(self, path=None, port=DEFAULT_CONTROL_PORT, timeout=5.0):
+        if uses_unix_socket():
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = path or default_socket_path()
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = ("127.0.0.1", port)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(address)
+        except OSError:
+            self.sock.close()
+            raise
+        self.reader = self.sock.makefile("r", encoding="utf-8")
+        if not uses_unix_socket():
+            try:
+                self.call("auth " + read_token(port))
+            except (OSError, ValueError):
+                self.close()
+                raise
+
+    def send(self, line):
+        """Sends one command line and returns the decoded response."""
+        self.sock.sendall((line.strip() + "\n").encode("utf-8"))
+        response = self.reader.readline()
+        if not response:
+            raise ConnectionError("The overlay closed the control connection")
+        return json.loads(response)
+
+    def call(self, line):
+        """Sends one command line and returns its result, raising ValueError if the overlay rejected it."""
+        response = self.send(line)
+        if not response.get("ok"):
+            raise ValueError(response.get("error"))
+        return response.get("result")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+def send_command(line, path=None, port=DEFAULT_CONTROL_PORT, timeout=5.0):
+    """Sends one command line to the overlay and returns the decoded response."""
+    client = ControlClient(path, port, timeout)
+    try:
+        return client.send(line)
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Control a running crosshair overlay.")
+    parser.add_argument("--socket", help="Control socket path (Unix-domain sockets)")
+    parser.add_argument("--port", type=int, default=DEFAULT_CONTROL_PORT, help="Control port (Windows)")
+    parser.add_argument("command", nargs="+",
+                        help="set <key> <value> | get [key] | preset <name> | presets | state | stats | session | threads | save | undo | redo | ping | quit")
+    args = parser.parse_args()
+
+    try:
+        response = send_command(" ".join(args.command), path=args.socket, port=args.port)
+    except (OSError, ValueError) as e: # ValueError: the overlay rejected our token
+        print(f"Could not reach the overlay: {e}", file=sys.stderr)
+        return 2
+    if not response.get("ok"):
+        print(f"Error: {response.get('error')}", file=sys.stderr)
+        return 1
+    print(json.dumps(response.get("result"), indent=4))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,400 @@
+import logging
+import time
+
+from frame_state import FrameState
+from jitter_engine import JitterNoise
+from spring import CriticallyDampedSpring, omega_from_lerp
+from strafe_timing import StrafeTimer
+from movement_model import MovementModel
+from scene import DEFAULT_LAYERS
+from key_bindings import MOVEMENT_ACTIONS
+from response_curves import SpreadCurves
+
+logger = logging.getLogger(__name__)
+
+CLICK_SPREAD_BUTTONS = {
+    "left": frozenset(("left",)),
+    "right": frozenset(("right",)),
+    "both": frozenset(("left", "right"))
+}
+
+# Default values of the settings CrosshairModel reads (the overlay adds its own on top)
+CROSSHAIR_DEFAULTS = {
+    "crosshair_color": [255, 255, 255, 255], # Default to opaque white
+    "outline_color": [0, 0, 0, 255], # Default to opaque black outline
+    "line_thickness": 2,
+    "outline_thickness": 1,
+    "gap": 5,
+    "length": 40, # Defines the total length of each crosshair arm from center
+    "show_outline": True,
+    # Movement Spread settings
+    "movement_spread_enabled": False,
+    "movement_spread_amount": 10,
+    "movement_spread_speed": 2,
+    "movement_max_speed": 250,
+    "movement_accelerate": 5.5,
+    "movement_friction": 5.2,
+    "movement_stop_speed": 80,
+    "movement_accurate_fraction": 0.34,
+    # Counter-strafe settings
+    "counter_strafe_enabled": True,
+    "counter_strafe_reduction_speed": 5,
+    "counter_strafe_min_spread": 0,
+    "counter_strafe_window_ms": 100,
+    "counter_strafe_perfect_ms": 10,
+    "counter_strafe_history": 16,
+    # New: Click Spread settings
+    "mouse_spread_enabled": False,
+    "mouse_spread_amount": 6,
+    "mouse_spread_max_speed": 4000,
+    "mouse_coalesce_ms": 2,
+    "mouse_half_life_ms": 60,
+    "click_spread_enabled": False,
+    "click_spread_amount": 5,
+    "click_spread_speed": 3,
+    "click_spread_button": "left",
+    # New crouch spread settings
+    "crouch_spread_enabled": False,
+    "crouch_spread_amount": 5,
+    "crouch_spread_speed": 2,
+    # Jitter settings
+    "jitter_enabled": True,
+    "jitter_amount": 5,
+    "jitter_speed": 1,
+    "jitter_offset": 0,
+    "jitter_mode": "random",
+    "jitter_seed": 0,
+    # Dynamic length parameter
+    "dynamic_length_enabled": True,
+    # Lerp speed parameter
+    "lerp_speed": 0.2
+}
+
+class CrosshairModel:
+    """The crosshair's spread, recoil and jitter logic, without Tk or input hooks.
+
+    CrosshairOverlay feeds it live pynput events and draws the result; offline_render.py
+    feeds it a recorded or synthetic input trace. Both call advance() once per frame,
+    which leaves the animated values in self.frame.
+    """
+
+    def __init__(self):
+        # Initialize base values before they're used
+        self.base_gap = 0
+        self.base_segment_length = 0
+
+        # Per-frame animated state (see frame_state.py)
+        self.frame = FrameState()
+
+        # Initialize jitter variables
+        self.jitter_offset = 0
+        self.jitter_direction_x = 1
+        self.jitter_direction_y = 1
+        self.jitter_noise = JitterNoise() # Precomputed jitter tables, rebuilt on config change
+
+        # Initialize recoil variables
+        self.recoil_amount = 10  # Pixels to move up when shooting
+        self.recoil_speed = 0.5  # Speed of recoil movement
+        self.recoil_recovery_speed = 0.2  # Speed of returning to original position
+
+        # Closed-form animation of spread and recoil (see spring.py)
+        self.spread_spring = CriticallyDampedSpring(now=time.perf_counter())
+        self.recoil_spring = CriticallyDampedSpring(now=time.perf_counter())
+
+        # Enhanced input tracking
+        self.input_state = {
+            'keys': set(),          # Currently held actions (see key_bindings.py)
+            'mouse': set(),         # Currently pressed mouse buttons
+            'last_key': None,       # Last action pressed
+            'last_mouse': None      # Last mouse button pressed
+        }
+
+        # Dynamic Spread state variables
+        self.is_counter_strafing = False
+        self.counter_strafe_quality = 0.0 # 0-1, from release-to-opposite-press timing
+        self.strafe_timer = StrafeTimer()
+        self.session_stats = None # Optional SessionStats fed by input events and frames
+        self.spread_curves = SpreadCurves() # Keyframed spread responses to input events
+        self.movement_model = MovementModel() # Simulated ground velocity driving movement spread
+        self.movement_spread_fraction = 0.0 # 0-1, from the simulated speed
+        self.mouse_spread_fraction = 0.0 # 0-1, from the smoothed mouse speed
+
+        self.lerp_speed = 0.2  # Adjust this value for faster/smoother transitions
+
+        # Jitter parameters
+        self.jitter_enabled = True
+        self.jitter_amount = 2  # pixels max jitter offset
+        self.jitter_speed = 0.1  # pixels per frame increase rate
+
+        # New jitter mode parameter: "random", "up", "sideways"
+        self.jitter_mode = "random"
+
+    def apply_crosshair_config(self, config):
+        """Applies the appearance and spread settings of a configuration dictionary."""
+        # Set base_gap equal to the gap from config
+        self.gap = config["gap"]
+        self.base_gap = self.gap  # base_gap should equal gap
+
+        # Tkinter uses hex color codes, and doesn't directly support alpha in line colors.
+        # We'll convert RGB to hex and ignore alpha for line drawing, as the window transparency
+        # is handled by -transparentcolor.
+        self.crosshair_color = self._rgb_to_hex(config["crosshair_color"][:3])
+        self.outline_color = self._rgb_to_hex(config["outline_color"][:3])
+        self.line_thickness = config["line_thickness"]
+        self.outline_thickness = config["outline_thickness"]
+        self.base_segment_length = config["length"]
+        self.show_outline = config["show_outline"]
+        # Movement Spread parameters
+        self.movement_spread_enabled = config["movement_spread_enabled"]
+        self.movement_spread_amount = config["movement_spread_amount"]
+        self.movement_spread_speed = config["movement_spread_speed"]
+        self.movement_max_speed = config.get("movement_max_speed", 250)
+        self.movement_accelerate = config.get("movement_accelerate", 5.5)
+        self.movement_friction = config.get("movement_friction", 5.2)
+        self.movement_stop_speed = config.get("movement_stop_speed", 80)
+        self.movement_accurate_fraction = config.get("movement_accurate_fraction", 0.34)
+        self.movement_model.configure(self.movement_max_speed, self.movement_accelerate,
+                                      self.movement_friction, self.movement_stop_speed)
+        # Counter-strafe parameters
+        self.counter_strafe_enabled = config["counter_strafe_enabled"]
+        self.counter_strafe_reduction_speed = config["counter_strafe_reduction_speed"]
+        self.counter_strafe_min_spread = config["counter_strafe_min_spread"]
+        self.counter_strafe_window_ms = config.get("counter_strafe_window_ms", 100)
+        self.counter_strafe_perfect_ms = config.get("counter_strafe_perfect_ms", 10)
+        self.counter_strafe_history = config.get("counter_strafe_history", 16)
+        self.strafe_timer.configure(self.counter_strafe_window_ms, self.counter_strafe_perfect_ms,
+                                    self.counter_strafe_history)
+        # Mouse speed spread parameters
+        self.mouse_spread_enabled = config.get("mouse_spread_enabled", False)
+        self.mouse_spread_amount = config.get("mouse_spread_amount", 6)
+        self.mouse_spread_max_speed = config.get("mouse_spread_max_speed", 4000)
+        # Click Spread parameters
+        self.click_spread_enabled = config["click_spread_enabled"]
+        self.click_spread_amount = config["click_spread_amount"]
+        self.click_spread_speed = config["click_spread_speed"]
+        self.click_spread_button = config["click_spread_button"]
+        self.click_spread_buttons = CLICK_SPREAD_BUTTONS.get(self.click_spread_button, frozenset())
+        # Crouch Spread parameters
+        self.crouch_spread_enabled = config.get("crouch_spread_enabled", False)
+        self.crouch_spread_amount = config.get("crouch_spread_amount", 5)
+        self.crouch_spread_speed = config.get("crouch_spread_speed", 2)
+        # Jitter parameters
+        self.jitter_enabled = config["jitter_enabled"]
+        self.jitter_amount = config["jitter_amount"]
+        self.jitter_speed = config["jitter_speed"]
+        self.jitter_offset = 0  # Initialize current jitter offset
+        self.jitter_mode = config.get("jitter_mode", "random")
+        self.jitter_direction_x = 1
+        self.jitter_direction_y = 1
+        self.jitter_seed = config.get("jitter_seed", 0)
+        self.jitter_noise.configure(self.jitter_mode, self.jitter_amount, self.jitter_speed, self.jitter_seed)
+
+        # Lerp Param
+        self.lerp_speed = config.get("lerp_speed", 0.1)
+
+        # Dynamic length parameter
+        self.dynamic_length_enabled = config.get("dynamic_length_enabled", True)
+
+        # Spring frequencies derived from the recoil speeds
+        self.recoil_omega = omega_from_lerp(self.recoil_speed)
+        self.recoil_recovery_omega = omega_from_lerp(self.recoil_recovery_speed)
+
+        # Crosshair layers (a single classic cross if the config defines none)
+        self.layers = config.get("layers") or DEFAULT_LAYERS
+
+        # Spread response curves, compiled to lookup tables (none if the config defines none)
+        self.spread_curves.compile(config.get("spread_curves") or {})
+
+    def scene_defaults(self):
+        """Returns the top-level crosshair settings that layers fall back to (see scene.py)."""
+        return {
+            "color": self.crosshair_color,
+            "thickness": self.line_thickness,
+            "outline": self.show_outline,
+            "outline_color": self.outline_color,
+            "outline_thickness": self.outline_thickness,
+            "gap": self.base_gap,
+            "length": self.base_segment_length,
+            "dynamic_length": self.dynamic_length_enabled
+        }
+
+    def _rgb_to_hex(self, rgb):
+        """Converts an RGB tuple to a Tkinter-compatible hex color string."""
+        return f'#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}'
+
+    def press_action(self, action, t_ns):
+        """Handles the start of a movement or crouch action; t_ns is the event's perf_counter_ns() timestamp."""
+        keys = self.input_state['keys']
+        now = t_ns / 1_000_000_000
+        if action in MOVEMENT_ACTIONS and keys.isdisjoint(MOVEMENT_ACTIONS):
+            self.spread_curves.trigger("move_start", now)
+        elif action == "crouch":
+            self.spread_curves.trigger("crouch", now)
+        keys.add(action)
+        self.input_state['last_key'] = action
+        if self.strafe_timer.press(action, t_ns):
+            self.spread_curves.trigger("counter_strafe", now)
+        self._update_movement_state()
+
+    def release_action(self, action, t_ns):
+        """Handles the end of a movement or crouch action; t_ns is the event's perf_counter_ns() timestamp."""
+        keys = self.input_state['keys']
+        keys.discard(action)
+        if action in MOVEMENT_ACTIONS and keys.isdisjoint(MOVEMENT_ACTIONS):
+            self.spread_curves.trigger("move_stop", t_ns / 1_000_000_000)
+        self.strafe_timer.release(action, t_ns)
+        self._update_movement_state()
+
+    def set_session_stats(self, stats):
+        """Starts feeding a SessionStats (see session_stats.py), or stops with None."""
+        self.session_stats = stats
+        self.strafe_timer.on_record = stats.record_strafe if stats is not None else None
+
+    def set_mouse_button(self, button_name, pressed, now=None):
+        """Handles a mouse button press or release; now is its perf_counter() time (default: now)."""
+        if pressed:
+            self.input_state['mouse'].add(button_name)
+            self.input_state['last_mouse'] = button_name
+            if button_name in self.click_spread_buttons:
+                self.spread_curves.trigger("shot", time.perf_counter() if now is None else now)
+            if button_name == "left" and self.session_stats is not None:
+                # Moving means above the accurate speed when simulated, else any movement key held
+                if self.movement_spread_enabled:
+                    moving = self.movement_spread_fraction > 0
+                else:
+                    moving = bool(self.movement_model.wish_x or self.movement_model.wish_y)
+                self.session_stats.record_shot(moving)
+        else:
+            self.input_state['mouse'].discard(button_name)
+
+        # Update target spread
+        self._update_target_spread()
+
+    def advance(self, now, mouse_speed=None):
+        """Animates spread, recoil and jitter to time now (seconds) and stores them in self.frame.
+
+        mouse_speed is the smoothed mouse speed in pixels per second, or None when it isn't tracked.
+        """
+        # Counter-strafes end window_ms after they happen, even if the new key stays held
+        if self.is_counter_strafing and self.strafe_timer.expire(int(now * 1_000_000_000)):
+            self._update_movement_state()
+
+        # Step the movement simulation; the spread target only changes when the speed band does
+        if self.movement_spread_enabled:
+            self.movement_model.advance(now)
+            fraction = self.movement_model.spread_fraction(self.movement_accurate_fraction)
+            if fraction != self.movement_spread_fraction:
+                self.movement_spread_fraction = fraction
+                self._update_target_spread()
+
+        # Mouse speed spread
+        if mouse_speed is not None:
+            fraction = min(mouse_speed / self.mouse_spread_max_speed, 1.0)
+            if fraction < 0.01:
+                fraction = 0.0
+            if fraction != self.mouse_spread_fraction:
+                self.mouse_spread_fraction = fraction
+                self._update_target_spread()
+
+        frame = self.frame
+        shooting = self.click_spread_enabled and not self.click_spread_buttons.isdisjoint(self.input_state['mouse'])
+        crouching = self.crouch_spread_enabled and 'crouch' in self.input_state['keys']
+
+        # Determine the appropriate speed based on the current state
+        if self.is_counter_strafing and self.counter_strafe_enabled:
+            current_speed = self.counter_strafe_reduction_speed
+        elif shooting:
+            current_speed = self.click_spread_speed
+        elif crouching:
+            current_speed = self.crouch_spread_speed
+        else:
+            current_speed = self.movement_spread_speed
+
+        # Calculate the lerp factor based on the current speed, clamp between 0 and 1
+        lerp_factor = min(current_speed * self.lerp_speed, 1.0)
+
+        # Update recoil if shooting
+        frame.target_recoil_offset = -self.recoil_amount if shooting else 0
+
+        # Recoil spring: recoil_speed when moving up, recoil_recovery_speed when returning
+        if frame.target_recoil_offset < frame.recoil_offset:
+            recoil_omega = self.recoil_omega
+        else:
+            recoil_omega = self.recoil_recovery_omega
+        self.recoil_spring.retarget(frame.target_recoil_offset, recoil_omega, now)
+        frame.recoil_offset = self.recoil_spring.sample(now)
+
+        # Spread spring, evaluated exactly at this frame's timestamp
+        self.spread_spring.retarget(frame.target_spread_offset, omega_from_lerp(lerp_factor), now)
+        frame.current_spread_offset = self.spread_spring.sample(now)
+        if self.spread_curves.active:
+            frame.current_spread_offset += self.spread_curves.sample(now)
+
+        # Gap and length follow the spread directly (no second smoothing pass)
+        frame.current_gap = self.base_gap + frame.current_spread_offset
+        if self.dynamic_length_enabled:
+            frame.current_length = self.base_segment_length + frame.current_spread_offset
+        else:
+            frame.current_length = self.base_segment_length
+        frame.spread_settled = self.spread_spring.settled and self.recoil_spring.settled and not self.spread_curves.active
+        if self.session_stats is not None:
+            self.session_stats.on_frame(now, frame.target_spread_offset, frame.current_spread_offset)
+
+        # Jitter animation update (precomputed noise, already smooth)
+        if self.jitter_enabled and self.input_state['mouse']:
+            self.jitter_noise.advance_into(frame)
+        else:
+            frame.jitter_x = 0
+            frame.jitter_y = 0
+
+    def _update_movement_state(self):
+        """Update movement-related state based on current input."""
+        keys = self.input_state['keys']
+        self.movement_model.set_wish(('moveright' in keys) - ('moveleft' in keys), ('forward' in keys) - ('back' in keys))
+
+        # The strafe timer has already seen this event's timestamp
+        self.is_counter_strafing = self.counter_strafe_enabled and self.strafe_timer.active
+        if self.is_counter_strafing:
+            self.counter_strafe_quality = self.strafe_timer.quality
+            logger.debug("Counter-strafe detected, quality %.2f", self.counter_strafe_quality)
+        else:
+            self.counter_strafe_quality = 0.0
+
+        # Update target spread
+        self._update_target_spread()
+
+    def _update_target_spread(self):
+        """Enhanced target spread calculation."""
+        # Start with base gap as the minimum spread
+        current_spread = self.base_gap
+        
+        # Movement spread (adds to base gap), scaled by the simulated movement speed
+        if self.movement_spread_enabled and self.movement_spread_fraction > 0:
+            movement_spread = self.movement_spread_amount * self.movement_spread_fraction
+            if self.is_counter_strafing:
+                # Apply counter-strafe reduction, scaled by how well it was timed
+                movement_spread = max(
+                    movement_spread - self.counter_strafe_reduction_speed * self.counter_strafe_quality,
+                    self.counter_strafe_min_spread
+                )
+            current_spread += movement_spread
+
+        # Mouse speed spread (adds to current spread)
+        if self.mouse_spread_fraction:
+            current_spread += self.mouse_spread_amount * self.mouse_spread_fraction
+
+        # Click spread (adds to current spread)
+        if self.click_spread_enabled and not self.click_spread_buttons.isdisjoint(self.input_state['mouse']):
+            current_spread = max(current_spread, self.base_gap + self.click_spread_amount)
+
+        # Crouch spread (reduces from total spread) - apply after all other spreads
+        if self.crouch_spread_enabled and 'crouch' in self.input_state['keys']:
+            # Remove debug print for crouch spread
+            # print(f"Crouch spread active. Keys: {self.input_state['keys']}")
+            current_spread = max(current_spread - self.crouch_spread_amount, self.base_gap)
+        else:
+            # print(f"Crouch spread inactive. Keys: {self.input_state['keys']}")
+            pass
+        
+        # Calculate final spread offset (total spread minus base gap)
+        self.frame.target_spread_offset = current_spread - self.base_gap
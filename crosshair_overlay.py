@@ -1,15 +1,40 @@
 import tkinter as tk
 import tkinter.ttk as ttk
+import copy
 import json
 import os
 import sys
 import ctypes # Import ctypes for Windows API calls
 import psutil # For process detection
 from pynput import keyboard, mouse # Import pynput for global key and mouse listening
-import threading # For running pynput listener in a separate thread
+import time
+import logging
 
 # Import the CustomizationMenu directly, as it's in the same directory
 from customization_menu import CustomizationMenu
+from menu_process import MenuProcess
+from linux_overlay import LinuxOverlay
+from state_export import (SharedStateExporter, default_state_path, INPUT_FORWARD, INPUT_BACKWARD,
+                          INPUT_LEFT, INPUT_RIGHT, INPUT_CROUCH, INPUT_MOUSE_LEFT, INPUT_MOUSE_RIGHT,
+                          INPUT_COUNTER_STRAFE)
+from control_server import ControlServer, DEFAULT_CONTROL_PORT
+from frame_stats import FrameTimeHistogram
+from io_worker import IOWorkerPool
+from profiler_capture import ProfilerCapture, write_capture
+from preset_store import PresetStore
+from scene import Scene, CanvasSceneView, DEFAULT_LAYERS
+from crosshair_model import CrosshairModel, CROSSHAIR_DEFAULTS
+from mouse_tracker import MouseTracker
+from config_history import ConfigHistory
+from input_watchdog import InputWatchdog, callback_arity
+from input_process import (EventRing, InputCaptureProcess, start_wake_listener, KEY_DOWN, KEY_UP, BUTTON_DOWN,
+                           MOVE_BUCKET)
+from key_bindings import KeyBindings, key_code, DEFAULT_KEY_BINDINGS, MODEL_ACTIONS, HOLD_ACTIONS
+from session_stats import SessionStats, read_session_log
+from adaptive_color import AdaptiveColorSampler, screen_grabber
+from visibility import VisibilityController
+from thread_accounting import ThreadAccounting
+from app_logging import start_logging, configure_logging, stop_logging
 
 # Windows API constants (remain the same as they apply to any window handle)
 if sys.platform == "win32":
@@ -30,36 +55,33 @@ if sys.platform == "win32":
     SWP_NOSIZE = 0x0001
     SWP_NOACTIVATE = 0x0010
 
-class CrosshairOverlay:
+logger = logging.getLogger(__name__)
+
+# Config keys the control socket may change. File paths and the socket's own settings are
+# left out, so a local client can't redirect where the overlay writes.
+CONTROL_SETTABLE_KEYS = frozenset(CROSSHAIR_DEFAULTS) | frozenset((
+    "layers", "spread_curves", "clickthrough_enabled", "state_export_enabled",
+    "visibility_require_game", "visibility_hide_buttons", "visibility_hide_in_menu", "visibility_idle_timeout",
+    "menu_process_enabled", "profiler_hotkey", "key_bindings", "profiler_duration", "profiler_top_n",
+    "input_watchdog_interval_ms", "input_stall_ms", "input_hook_timeout_ms", "input_process_enabled",
+    "input_ring_capacity", "session_stats_enabled", "thread_accounting_enabled", "thread_accounting_interval",
+    "adaptive_color_enabled", "adaptive_color_palette", "adaptive_color_mode", "adaptive_color_hysteresis",
+    "adaptive_color_region", "adaptive_color_rate_hz", "adaptive_color_cpu_budget", "log_level",
+    "config_history_limit", "config_journal_enabled"
+))
+
+class CrosshairOverlay(CrosshairModel):
     # Define a unique color that will be made transparent.
     # This color should ideally not be used in your crosshair design.
     TRANSPARENT_COLOR = '#000001' # A very dark, almost black, distinct color
     GAME_PROCESS_NAME = "cs2.exe" # The name of the game executable
+    PRESET_STORE_PATH = "presets.db" # Preset library (presets used to live inline in config.json)
+    FRAME_INTERVAL_MS = 16 # Aim for ~60 FPS
 
     def __init__(self):
-        import random
-        self.random = random
-
-        # Initialize base values before they're used
-        self.base_gap = 0
-        self.base_segment_length = 0
-        self.current_gap = 0
-        self.current_length = 0
-        self.target_spread_offset = 0
-        
-        # Initialize jitter variables
-        self.jitter_x = 0
-        self.jitter_y = 0
-        self.jitter_offset = 0
-        self.jitter_direction_x = 1
-        self.jitter_direction_y = 1
-
-        # Initialize recoil variables
-        self.recoil_offset = 0
-        self.target_recoil_offset = 0
-        self.recoil_amount = 10  # Pixels to move up when shooting
-        self.recoil_speed = 0.5  # Speed of recoil movement
-        self.recoil_recovery_speed = 0.2  # Speed of returning to original position
+        start_logging() # Before anything logs; apply_config sets the configured level later
+
+        CrosshairModel.__init__(self) # Spread, recoil and jitter state
 
         # ... rest of __init__ ...
 
@@ -74,11 +96,15 @@ class CrosshairOverlay:
         self.root.geometry(f"{self.screen_width}x{self.screen_height}+0+0") # Full screen
         self.root.overrideredirect(True) # Remove window decorations (title bar, borders)
         self.root.attributes('-topmost', True) # Always on top
-        self.root.attributes('-transparentcolor', self.TRANSPARENT_COLOR) # Make this color transparent
+        if sys.platform == "win32":
+            # -transparentcolor is Windows-only; on Linux the X Shape extension hides everything else
+            self.root.attributes('-transparentcolor', self.TRANSPARENT_COLOR) # Make this color transparent
 
         # Create a canvas to draw on
         self.canvas = tk.Canvas(self.root, bg=self.TRANSPARENT_COLOR, highlightthickness=0)
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.scene = None
+        self.scene_view = CanvasSceneView(self.canvas) # Canvas items for the compiled crosshair layers
 
         # Bind escape key to quit and F1 to open customization menu
         # These bindings work because the Tkinter window is the one receiving them
@@ -86,6 +112,9 @@ class CrosshairOverlay:
         # self.root.bind('<Escape>', lambda e: self.quit_overlay())
         self.root.bind('<F1>', self._toggle_customization_menu)
 
+        # Supervises every pynput listener below, restarting any that die or stall
+        self.input_watchdog = InputWatchdog()
+
         # Extend pynput keyboard listener to handle global F1 key only (remove Escape)
         def on_global_press(key):
             try:
@@ -93,50 +122,32 @@ class CrosshairOverlay:
                 if key == keyboard.Key.f1:
                     self.root.after(0, self._toggle_customization_menu)
             except Exception as e:
-                print(f"Error in global key handler: {e}")
-
-        self.global_keyboard_listener = keyboard.Listener(on_press=on_global_press)
-        self.global_keyboard_listener_thread = threading.Thread(target=self.global_keyboard_listener.start)
-        self.global_keyboard_listener_thread.daemon = True
-        self.global_keyboard_listener_thread.start()
-
-        # Enhanced input tracking
-        self.input_state = {
-            'keys': set(),          # Currently pressed keys
-            'mouse': set(),         # Currently pressed mouse buttons
-            'modifiers': set(),     # Currently pressed modifier keys
-            'last_key': None,       # Last key pressed
-            'last_mouse': None,     # Last mouse button pressed
-            'mouse_position': (0, 0) # Current mouse position
+                logger.error("Error in global key handler: %s", e)
+
+        self.input_watchdog.register("global_keyboard",
+                                     lambda wrap: keyboard.Listener(on_press=wrap(on_global_press)))
+
+        # Key bindings, compiled into a key code -> action table by rebind_keys()
+        self.bindings = KeyBindings()
+        self.key_binding_config = None
+        self.key_commands = {
+            "toggle_menu": self._toggle_customization_menu,
+            "quit": self.quit_overlay,
+            "profiler": self._toggle_profiler_capture
         }
 
-        # Enhanced key bindings configuration
-        self.key_bindings = {
-            'toggle_menu': keyboard.Key.f1,
-            'quit': keyboard.Key.esc,
-            'movement': {
-                'forward': 'w',
-                'backward': 's',
-                'left': 'a',
-                'right': 'd'
-            },
-            'actions': {
-                'crouch': keyboard.Key.ctrl,
-                'jump': keyboard.Key.space,
-                'shoot': {
-                    'primary': mouse.Button.left,
-                    'secondary': mouse.Button.right
-                }
-            }
-        }
+        # On-demand profiler (hotkey configured by load_config)
+        self.profiler = ProfilerCapture()
+        self.profiler_hotkey = "f9"
+        self.input_record_path = "" # Trace file for offline_render.py (configured by load_config)
 
-        # Create reverse mapping for movement keys
-        self.movement_key_map = {
-            'w': 'forward',
-            's': 'backward',
-            'a': 'left',
-            'd': 'right'
-        }
+        # Rules that hide the crosshair and suspend the frame loop (configured by load_config)
+        self.visibility = VisibilityController(frame_interval_ms=self.FRAME_INTERVAL_MS)
+        self.frame_job = None # Pending after() of update_overlay; None while suspended
+        self.wake_pending = False
+        self.hide_buttons = frozenset()
+        self.visibility_require_game = False
+        self.visibility_hide_in_menu = False
 
         # Enhanced input listeners
         self._setup_input_listeners()
@@ -144,25 +155,15 @@ class CrosshairOverlay:
         # Track if the menu is open to prevent multiple instances
         self.menu_open = False
         self.customization_menu = None
+        self.menu_process = None # The menu's own process, when menu_process_enabled is set
 
         # Dynamic Spread state variables
-        self.current_spread_offset = 0
-        self.wasd_keys_pressed = set() # To track currently pressed WASD keys
-        self.opposite_keys = {'w': 's', 's': 'w', 'a': 'd', 'd': 'a'}
-        self.is_counter_strafing = False
-        self.last_movement_key = None # To help with counter-strafe logic
-        self.mouse_buttons_pressed = set() # New: To track currently pressed mouse buttons
-
-        # Add lerping variables
-        self.current_gap = self.base_gap
-        self.current_length = self.base_segment_length
-        self.lerp_speed = 0.2  # Adjust this value for faster/smoother transitions
-
-        # Jitter parameters
-        self.jitter_enabled = True
-        self.jitter_amount = 2  # pixels max jitter offset
-        self.jitter_speed = 0.1  # pixels per frame increase rate
-        self.jitter_offset = 0.0  # current jitter offset magnitude
+        self.mouse_tracker = MouseTracker() # Coalesced mouse speed, fed by the "mouse_move" listener
+        self.mouse_tracking = False # Whether mouse speed is being tracked for mouse spread
+        self.input_process_enabled = False
+        self.input_ring = None # Events from the input capture process, when enabled
+        self.input_process_options = None # Settings the running capture process was started with
+        self.ring_wake = None # Pipe the capture process wakes the suspended overlay through
 
         # New crouch spread parameters
         # Removed crouch spread parameters as per user request
@@ -170,59 +171,61 @@ class CrosshairOverlay:
         # self.crouch_spread_amount = 5
         # self.crouch_spread_speed = 2
 
-        # New jitter mode parameter: "random", "up", "sideways"
-        self.jitter_mode = "random"
-
         # Game status tracking
         self.game_running = False
         self.game_check_interval = 1000 # Check every 1 second
-
-        # pynput keyboard listener setup
-        self.keyboard_listener = keyboard.Listener(
-            on_press=self._on_key_press,
-            on_release=self._on_key_release
-        )
-        self.keyboard_listener_thread = threading.Thread(target=self.keyboard_listener.start)
-        self.keyboard_listener_thread.daemon = True  # Allow the main program to exit even if this thread is running
-        self.keyboard_listener_thread.start()
-        print("pynput keyboard listener started.")
-
-        # Track ctrl key state for crouch spread
-        self.ctrl_pressed = False
-
-        # New pynput mouse listener setup
-        self.mouse_listener = mouse.Listener(
-            on_move=self._on_mouse_move,
-            on_click=self._on_mouse_click,
-            on_scroll=self._on_mouse_scroll
-        )
-        self.mouse_listener_thread = threading.Thread(target=self.mouse_listener.start)
-        self.mouse_listener_thread.daemon = True  # Allow the main program to exit
-        self.mouse_listener_thread.start()
-        print("pynput mouse listener started.")
-
+        self.game_process_running = False # Result of the latest background process scan
 
         # Clickthrough enabled flag
         self.clickthrough_enabled = True
+        self.linux_overlay = None # X11 Shape backend, created on Linux only
 
-        # Apply platform-specific settings for click-through
-        if sys.platform == "win32":
-            self._setup_windows_overlay()
-        # elif sys.platform == "linux":
-        #     self._setup_linux_overlay() # Placeholder for future Linux support
+        # Background sampler that adapts the crosshair colors to the screen behind it (configured by load_config)
+        self.adaptive_color = None
+        self.adaptive_color_region = None # Capture size the running sampler was started with
+        self.adaptive_colors = None # (crosshair RGB, outline RGB or None) currently drawn
+
+        # Shared-memory export of the live crosshair state (configured by load_config)
+        self.state_exporter = None
+
+        # Worker pool for config writes and process scans, so the Tk thread never waits on I/O
+        self.io_pool = IOWorkerPool(self.root)
+
+        # Local control socket (configured by load_config)
+        self.control_server = None
+
+        # Per-thread CPU and wakeup accounting (configured by load_config)
+        self.thread_accounting = None
+        self.thread_accounting_unavailable = False # Set once ThreadAccounting found neither /proc nor psutil
+        self._thread_sample_job = None
+
+        # Frame timing statistics
+        self.frame_intervals = FrameTimeHistogram() # Time between frame starts
+        self.frame_work = FrameTimeHistogram() # Time spent inside update_overlay
+        self.last_frame_time = None
+
+        # Preset library, written one preset at a time (seeded with the built-in presets once)
+        self.preset_store = PresetStore(self.PRESET_STORE_PATH, CustomizationMenu.default_presets())
+
+        # Undo/redo history of config edits (journal configured by load_config)
+        self.config_history = ConfigHistory()
+        self.config_journal_path = None
 
         # Load config
         self.config_path = "config.json"
         self.load_config() # This will now also call rebind_keys()
 
-        print("Open CS2 and press F1 to open the customization menu.")
+        # Apply platform-specific settings for click-through
+        if sys.platform == "win32":
+            self._setup_windows_overlay()
+        elif sys.platform.startswith("linux"):
+            self._setup_linux_overlay()
 
-        # Start checking game status
-        self._check_game_status()
+        logger.info("Open CS2 and press F1 to open the customization menu.")
 
-    def _lerp(self, current, target, speed):
-        """Linear interpolation between current and target values."""
-        return current + (target - current) * speed
+        # Start checking game status and input hook health
+        self._check_game_status()
+        self.root.after(self.input_watchdog_interval, self._check_input_hooks)
 
     def _setup_windows_overlay(self):
         """Applies Windows-specific settings for click-through."""
@@ -237,83 +240,116 @@ class CrosshairOverlay:
         user32.SetWindowLongA(hwnd, GWL_EXSTYLE, new_style)
         user32.SetWindowPos(hwnd, HWND_TOPMOST, 0, 0, 0, 0, SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE)
 
+    def _setup_linux_overlay(self):
+        """Applies X11-specific settings for click-through and shaped painting."""
+        if self.linux_overlay is None:
+            self.linux_overlay = LinuxOverlay(self.root)
+            # The layers only compute shape rectangles when something consumes them
+            self.scene.with_rects = self.linux_overlay.available
+            self.scene.invalidate()
+        self.linux_overlay.set_clickthrough(self.clickthrough_enabled)
+
     def _setup_input_listeners(self):
         """Set up enhanced input listeners for keyboard and mouse."""
         # Keyboard listener
-        self.keyboard_listener = keyboard.Listener(
-            on_press=self._on_key_press,
-            on_release=self._on_key_release
-        )
+        self.input_watchdog.register("keyboard", lambda wrap: keyboard.Listener(
+            on_press=wrap(self._hook(self._on_key_press)),
+            on_release=wrap(self._hook(self._on_key_release))
+        ))
         
-        # Mouse listener
-        self.mouse_listener = mouse.Listener(
-            on_move=self._on_mouse_move,
-            on_click=self._on_mouse_click,
-            on_scroll=self._on_mouse_scroll
-        )
-        
-        # Start listeners in separate threads
-        self.keyboard_listener_thread = threading.Thread(
-            target=self.keyboard_listener.start,
-            daemon=True
-        )
-        self.mouse_listener_thread = threading.Thread(
-            target=self.mouse_listener.start,
-            daemon=True
-        )
-        
-        self.keyboard_listener_thread.start()
-        self.mouse_listener_thread.start()
+        # Mouse listener (moves are only subscribed by _configure_mouse_tracking when mouse spread needs them)
+        self.input_watchdog.register("mouse", lambda wrap: mouse.Listener(
+            on_click=wrap(self._hook(self._on_mouse_click)),
+            on_scroll=wrap(self._hook(self._on_mouse_scroll))
+        ))
+        logger.info("pynput keyboard and mouse listeners started.")
+
+    def _check_input_hooks(self):
+        """Restarts input listeners that died or stalled, then reschedules itself."""
+        self.input_watchdog.check()
+        self.root.after(self.input_watchdog_interval, self._check_input_hooks)
+
+    def _hook(self, handler):
+        """Wraps a pynput callback so it can be profiled on demand and counts as input for the idle rule."""
+        profiler = self.profiler
+        visibility = self.visibility
+        arity = callback_arity(handler) # Drops arguments such as pynput's `injected` the handler doesn't take
+        def callback(*args):
+            args = args[:arity]
+            visibility.note_input()
+            if "idle" in visibility.hidden_by:
+                self._request_wake()
+            if profiler.active:
+                return profiler.runcall(handler, *args)
+            return handler(*args)
+        return callback
 
     def _on_key_press(self, key):
         """Enhanced key press handler."""
-        try:
-            key_char = key.char.lower()
-        except AttributeError:
-            key_char = str(key).replace('Key.', '').lower()
-
-        # Add key to input_state keys and modifiers immediately
-        self.input_state['keys'].add(key_char)
-        modifier_keys = {'ctrl', 'ctrl_l', 'ctrl_r', 'shift', 'shift_l', 'shift_r', 'alt', 'alt_l', 'alt_r'}
-        if key_char in modifier_keys:
-            self.input_state['modifiers'].add(key_char)
-
-        # Handle specific key bindings immediately
-        if key_char == str(self.key_bindings['toggle_menu']).replace('Key.', '').lower():
-            self.root.after(0, self._toggle_customization_menu)
-        elif key_char == str(self.key_bindings['quit']).replace('Key.', '').lower():
-            self.root.after(0, self.quit_overlay)
-
-        # Update movement state immediately
-        self._update_movement_state()
+        t_ns = time.perf_counter_ns() # Taken first so handler work doesn't skew strafe timing
+        action = self.bindings.press(key_code(key))
+        if action is not None:
+            self._handle_action(action, t_ns, True)
 
     def _on_key_release(self, key):
         """Enhanced key release handler."""
-        try:
-            key_char = key.char.lower()
-        except AttributeError:
-            key_char = str(key).replace('Key.', '').lower()
-
-        # Remove key from input_state keys and modifiers immediately
-        self.input_state['keys'].discard(key_char)
-        modifier_keys = {'ctrl', 'ctrl_l', 'ctrl_r', 'shift', 'shift_l', 'shift_r', 'alt', 'alt_l', 'alt_r'}
-        if key_char in modifier_keys:
-            self.input_state['modifiers'].discard(key_char)
-
-        # Update movement state immediately
-        self._update_movement_state()
-
-    def _on_mouse_move(self, x, y):
-        """Enhanced mouse movement handler."""
-        self.input_state['mouse_position'] = (x, y)
-        # You could add mouse movement-based features here
+        t_ns = time.perf_counter_ns() # Taken first so handler work doesn't skew strafe timing
+        action = self.bindings.release(key_code(key))
+        if action is not None:
+            self._handle_action(action, t_ns, False)
+
+    def _handle_action(self, action, t_ns, pressed):
+        """Starts or ends a bound action, from a pynput hook or from the input capture process."""
+        if action in MODEL_ACTIONS:
+            # Update input and movement state immediately
+            if pressed:
+                self.press_action(action, t_ns)
+            else:
+                self.release_action(action, t_ns)
+            if self.input_record_path:
+                self._record_input(t_ns, {"key": action, "down": pressed})
+        elif action in HOLD_ACTIONS:
+            self.root.after(0, self._set_hold, action, pressed)
+        elif pressed:
+            self.root.after(0, self.key_commands[action])
+
+    def _on_ring_event(self, kind, t_ns, a, b, name):
+        """Applies one event from the input capture process on the Tk thread."""
+        self.visibility.note_input(t_ns / 1_000_000_000)
+        if kind == KEY_DOWN:
+            action = self.bindings.press(name or b) # Keys without a virtual key code are sent by character
+            if action is not None:
+                self._handle_action(action, t_ns, True)
+        elif kind == KEY_UP:
+            action = self.bindings.release(name or b)
+            if action is not None:
+                self._handle_action(action, t_ns, False)
+        elif kind == MOVE_BUCKET:
+            self.mouse_tracker.add_bucket(a, b, t_ns)
+        else:
+            pressed = kind == BUTTON_DOWN
+            if self.input_record_path:
+                self._record_input(t_ns, {"button": name, "down": pressed})
+            self.set_mouse_button(name, pressed, t_ns / 1_000_000_000)
+            if name in self.hide_buttons:
+                self._set_hold(name, pressed)
 
     def _on_mouse_click(self, x, y, button, pressed):
         """Enhanced mouse click handler."""
         button_name = str(button).replace('Button.', '') # e.g., 'Button.left' -> 'left'
+        t_ns = time.perf_counter_ns()
+        if self.input_record_path:
+            self._record_input(t_ns, {"button": button_name, "down": pressed})
         
         # Schedule the update on the Tkinter main thread
-        self.root.after_idle(lambda: self._process_mouse_event(button_name, pressed))
+        self.root.after_idle(lambda: self.set_mouse_button(button_name, pressed, t_ns / 1_000_000_000))
+        if button_name in self.hide_buttons:
+            self.root.after(0, self._set_hold, button_name, pressed)
+
+    def _record_input(self, t_ns, event):
+        """Appends one input event to the trace file replayed by offline_render.py."""
+        event["t"] = round(t_ns / 1_000_000, 3)
+        self.io_pool.append_text(self.input_record_path, json.dumps(event) + "\n")
 
     def _on_mouse_scroll(self, x, y, dx, dy):
         """Enhanced mouse scroll handler."""
@@ -331,51 +367,160 @@ class CrosshairOverlay:
         """Periodically checks if the game process is running and updates overlay visibility."""
         # Remove game process check to always show overlay
         if not self.game_running:
-            print("Showing overlay without game process check.")
+            logger.info("Showing overlay without game process check.")
             self.game_running = True
             self.root.deiconify() # Show the window
             self.draw_crosshair() # Initial draw
 
+        # Scan the process table on the I/O pool; the result comes back on the Tk thread
+        self.io_pool.submit(self._is_process_running, self.GAME_PROCESS_NAME,
+                            callback=self._on_game_process_scan)
+
         # Schedule the next check
         self.root.after(self.game_check_interval, self._check_game_status)
 
+    def _on_game_process_scan(self, running):
+        """Stores the result of a background game process scan."""
+        self.game_process_running = running
+        self._set_hidden("game", self.visibility_require_game and not running)
+
+    def _set_hidden(self, reason, hidden):
+        """Activates or clears one visibility rule (see visibility.py). Tk thread only."""
+        if self.visibility.set(reason, hidden):
+            self._on_visibility_changed()
+
+    def _set_hold(self, name, pressed):
+        """Tracks a held hide key or button. Tk thread only."""
+        if self.visibility.hold(name, pressed):
+            self._on_visibility_changed()
+
+    def _on_visibility_changed(self):
+        """Suspends the frame loop when the crosshair hides, and restarts it at once when it shows."""
+        if self.visibility.visible:
+            logger.debug("Crosshair shown; resuming frames.")
+            if self.input_ring is not None:
+                self.input_ring.set_sleeping(False)
+            self.last_frame_time = None # The suspension isn't a frame interval
+            if self.frame_job is None:
+                self.frame_job = self.root.after(0, self.update_overlay)
+            return
+        logger.debug("Crosshair hidden (%s); suspending frames.", ", ".join(sorted(self.visibility.hidden_by)))
+        if self.frame_job is not None:
+            self.root.after_cancel(self.frame_job)
+            self.frame_job = None
+        self.draw_crosshair() # Hides it
+        if self.input_ring is not None:
+            self.input_ring.set_sleeping(True)
+            self._request_wake() # Take in events written before the capture process saw the flag
+
+    def _wake_if_suspended(self):
+        """Wakes the Tk thread for work that arrived while the frame loop is suspended. Any thread."""
+        if self.visibility.hidden_by:
+            self._request_wake()
+
+    def _request_wake(self):
+        """Schedules one _wake() on the Tk thread, however many threads ask for it. Any thread."""
+        if not self.wake_pending:
+            self.wake_pending = True
+            self.root.after(0, self._wake)
+
+    def _wake(self):
+        """Takes in queued commands and input while suspended; input ends an idle suspension."""
+        self.wake_pending = False
+        if self.visibility.visible:
+            return # The frame loop is running and drains everything itself
+        self.visibility.note_wake()
+        if self.control_server is not None:
+            self.control_server.drain(self._handle_control_command)
+        if self.input_ring is not None:
+            self.input_ring.drain(self._on_ring_event)
+        suspended_at = self.visibility.suspended_at
+        if suspended_at is not None and self.visibility.last_input > suspended_at:
+            self._set_hidden("idle", False)
+
+    def _menu_is_open(self):
+        return self.menu_open or (self.menu_process is not None and self.menu_process.is_alive())
+
     def load_config(self):
-        default_config = {
-            "crosshair_color": [255, 255, 255, 255], # Default to opaque white
-            "outline_color": [0, 0, 0, 255], # Default to opaque black outline
-            "line_thickness": 2,
-            "outline_thickness": 1,
-            "gap": 5,
-            "length": 40, # Defines the total length of each crosshair arm from center
-            "show_outline": True,
-            # Movement Spread settings
-            "movement_spread_enabled": False,
-            "movement_spread_amount": 10,
-            "movement_spread_speed": 2,
-            # Counter-strafe settings
-            "counter_strafe_enabled": True,
-            "counter_strafe_reduction_speed": 5,
-            "counter_strafe_min_spread": 0,
-            # New: Click Spread settings
-            "click_spread_enabled": False,
-            "click_spread_amount": 5,
-            "click_spread_speed": 3,
-            "click_spread_button": "left",
-            # New crouch spread settings
-            "crouch_spread_enabled": False,
-            "crouch_spread_amount": 5,
-            "crouch_spread_speed": 2,
-            # Jitter settings
-            "jitter_enabled": True,
-            "jitter_amount": 5,
-            "jitter_speed": 1,
-            "jitter_offset": 0,
-            "jitter_mode": "random",
-            # Dynamic length parameter
-            "dynamic_length_enabled": True,
-            # Lerp speed parameter
-            "lerp_speed": 0.2
-        }
+        """Reads config.json and applies it. Blocks, so only used at startup."""
+        self._on_config_read(self._read_config_file())
+
+    def reload_config(self):
+        """Re-reads config.json on the I/O pool and applies it on the Tk thread."""
+        self.io_pool.submit(self._read_config_file, callback=self._on_config_read)
+
+    def _on_config_read(self, config):
+        """Moves any inline presets into the preset store, then applies the config."""
+        if "presets" in config:
+            self.preset_store.import_presets(config.pop("presets"))
+            self.io_pool.write_json(self.config_path, config)
+            logger.info("Moved presets from %s to %s.", self.config_path, self.PRESET_STORE_PATH)
+        self.apply_config(config)
+
+    def save_preset(self, name, preset, tags=None):
+        """Writes a single preset to the preset store on the I/O pool."""
+        self.io_pool.submit(self.preset_store.put, name, dict(preset), tags)
+
+    def save_config(self, config):
+        """Applies a configuration in memory and writes it to config.json on the I/O pool."""
+        # Deep copy: the menu edits lists such as curve keyframes in place, and sharing them
+        # would leave the history nothing to diff against
+        config = copy.deepcopy(config)
+        self._record_config_change(self.config, config)
+        self.apply_config(config)
+        self.io_pool.write_json(self.config_path, self.config)
+
+    def _read_config_file(self):
+        """Reads config.json, creating it or adding missing default keys first."""
+        default_config = copy.deepcopy(CROSSHAIR_DEFAULTS)
+        default_config.update({
+            # Click-through window setting
+            "clickthrough_enabled": True,
+            # Shared-memory state export (empty path uses the platform default)
+            "state_export_enabled": False,
+            "state_export_path": "",
+            # Local control socket (empty path uses the platform default)
+            "control_socket_enabled": False,
+            "control_socket_path": "",
+            "control_port": DEFAULT_CONTROL_PORT,
+            # Visibility rules: hide the crosshair and suspend drawing while the game isn't running,
+            # while a button in visibility_hide_buttons (or a key bound to "hide") is held, while the
+            # menu is open, or after visibility_idle_timeout seconds without input (0 = never)
+            "visibility_require_game": False,
+            "visibility_hide_buttons": [],
+            "visibility_hide_in_menu": False,
+            "visibility_idle_timeout": 0,
+            # Run the customization menu in its own process (talks to the overlay over the control socket)
+            "menu_process_enabled": False,
+            # On-demand profiler capture
+            "profiler_hotkey": "f9",
+            "key_bindings": {}, # Overrides of DEFAULT_KEY_BINDINGS in key_bindings.py
+            "profiler_duration": 10,
+            "profiler_top_n": 30,
+            "profiler_output_dir": "profiles",
+            "input_record_path": "",
+            "input_watchdog_interval_ms": 1000,
+            "input_stall_ms": 1000,
+            "input_hook_timeout_ms": 300,
+            "input_process_enabled": False,
+            "input_ring_capacity": 1024,
+            "session_stats_enabled": True,
+            "session_log_path": "sessions.jsonl",
+            "thread_accounting_enabled": True,
+            "thread_accounting_interval": 2.0, # Seconds between samples
+            "adaptive_color_enabled": False,
+            "adaptive_color_palette": [], # Empty: choose between crosshair_color and outline_color
+            "adaptive_color_mode": "pick",
+            "adaptive_color_hysteresis": 0.25,
+            "adaptive_color_region": 96,
+            "adaptive_color_rate_hz": 4,
+            "adaptive_color_cpu_budget": 0.02,
+            "log_level": "INFO",
+            "log_file": "",
+            "config_history_limit": 100,
+            "config_journal_enabled": False,
+            "config_journal_path": "config_history.jsonl"
+        })
 
         if not os.path.exists(self.config_path):
             with open(self.config_path, "w") as f:
@@ -394,229 +539,592 @@ class CrosshairOverlay:
                     f.truncate()
 
         with open(self.config_path, "r") as f:
-            config = json.load(f)
-        
-        # Set base_gap equal to the gap from config
-        self.gap = config["gap"]
-        self.base_gap = self.gap  # base_gap should equal gap
-
-        # Tkinter uses hex color codes, and doesn't directly support alpha in line colors.
-        # We'll convert RGB to hex and ignore alpha for line drawing, as the window transparency
-        # is handled by -transparentcolor.
-        self.crosshair_color = self._rgb_to_hex(config["crosshair_color"][:3])
-        self.outline_color = self._rgb_to_hex(config["outline_color"][:3])
-        self.line_thickness = config["line_thickness"]
-        self.outline_thickness = config["outline_thickness"]
-        # self.gap = config["gap"]
-        self.base_segment_length = config["length"]
-        self.show_outline = config["show_outline"]
-        # Movement Spread parameters
-        self.movement_spread_enabled = config["movement_spread_enabled"]
-        self.movement_spread_amount = config["movement_spread_amount"]
-        self.movement_spread_speed = config["movement_spread_speed"]
-        # Counter-strafe parameters
-        self.counter_strafe_enabled = config["counter_strafe_enabled"]
-        self.counter_strafe_reduction_speed = config["counter_strafe_reduction_speed"]
-        self.counter_strafe_min_spread = config["counter_strafe_min_spread"]
-        # Click Spread parameters
-        self.click_spread_enabled = config["click_spread_enabled"]
-        self.click_spread_amount = config["click_spread_amount"]
-        self.click_spread_speed = config["click_spread_speed"]
-        self.click_spread_button = config["click_spread_button"]
-        # Crouch Spread parameters
-        self.crouch_spread_enabled = config.get("crouch_spread_enabled", False)
-        self.crouch_spread_amount = config.get("crouch_spread_amount", 5)
-        self.crouch_spread_speed = config.get("crouch_spread_speed", 2)
-        # Jitter parameters
-        self.jitter_enabled = config["jitter_enabled"]
-        self.jitter_amount = config["jitter_amount"]
-        self.jitter_speed = config["jitter_speed"]
-        self.jitter_offset = 0  # Initialize current jitter offset
-        self.jitter_mode = config.get("jitter_mode", "random")
-        self.jitter_direction_x = 1
-        self.jitter_direction_y = 1
-
-        # Lerp Param
-        self.lerp_speed = config.get("lerp_speed", 0.1)
-        
-        # Dynamic length parameter
-        self.dynamic_length_enabled = config.get("dynamic_length_enabled", True)
-        
-        # Initialize jitter position variables if not already set
-        if not hasattr(self, 'jitter_x'):
-            self.jitter_x = 0
-        if not hasattr(self, 'jitter_y'):
-            self.jitter_y = 0
+            return json.load(f)
+
+    def apply_config(self, config):
+        """Applies a configuration dictionary to the overlay without touching the disk."""
+        self.config = config
+
+        self.apply_crosshair_config(config)
+        self.mouse_coalesce_ms = config.get("mouse_coalesce_ms", 2)
+        self.mouse_tracker.configure(self.mouse_coalesce_ms, config.get("mouse_half_life_ms", 60))
+        # Input capture process parameters
+        self.input_process_enabled = config.get("input_process_enabled", False)
+        self.input_ring_capacity = config.get("input_ring_capacity", 1024)
+        self._configure_mouse_tracking()
+        self._configure_input_capture()
+
+        # Crosshair layers
+        self._build_scene()
+
+        # Background-adaptive color parameters
+        self.adaptive_color_enabled = config.get("adaptive_color_enabled", False)
+        self._configure_adaptive_color(config)
+
+        # Click-through parameter
+        self.clickthrough_enabled = config.get("clickthrough_enabled", True)
+
+        # Shared-memory state export parameters
+        self.state_export_enabled = config.get("state_export_enabled", False)
+        self.state_export_path = config.get("state_export_path", "") or default_state_path()
+        self._configure_state_export()
+
+        # Control socket parameters
+        self.control_socket_enabled = config.get("control_socket_enabled", False)
+        self.control_socket_path = config.get("control_socket_path", "")
+        self.control_port = config.get("control_port", DEFAULT_CONTROL_PORT)
+        self.menu_process_enabled = config.get("menu_process_enabled", False)
+        self._configure_control_server()
+
+        # Profiler capture parameters
+        self.profiler_hotkey = str(config.get("profiler_hotkey", "f9")).lower()
+        self.profiler_duration = config.get("profiler_duration", 10)
+        self.profiler_top_n = config.get("profiler_top_n", 30)
+        self.profiler_output_dir = config.get("profiler_output_dir", "profiles")
+
+        # Key bindings (the profiler hotkey is the default binding of the "profiler" action)
+        key_binding_config = dict(DEFAULT_KEY_BINDINGS, profiler=self.profiler_hotkey)
+        key_binding_config.update(config.get("key_bindings") or {})
+        if key_binding_config != self.key_binding_config:
+            self.key_binding_config = key_binding_config
+            self.rebind_keys()
+
+        # Visibility rules
+        self.visibility_require_game = config.get("visibility_require_game", False)
+        self.visibility_hide_in_menu = config.get("visibility_hide_in_menu", False)
+        self.hide_buttons = frozenset(config.get("visibility_hide_buttons", []))
+        self.visibility.idle_timeout = config.get("visibility_idle_timeout", 0)
+        self._set_hidden("game", self.visibility_require_game and not self.game_process_running)
+        self._set_hidden("menu", self.visibility_hide_in_menu and self._menu_is_open())
+        if not self.visibility.idle_timeout:
+            self._set_hidden("idle", False)
+        for name in self.visibility.held - self.hide_buttons - set(HOLD_ACTIONS):
+            self._set_hold(name, False) # A button that is no longer a hide button
+
+        # Session statistics parameters
+        self.session_stats_enabled = config.get("session_stats_enabled", True)
+        self.session_log_path = config.get("session_log_path", "sessions.jsonl")
+        self._configure_session_stats()
+
+        # Thread accounting parameters
+        self.thread_accounting_enabled = config.get("thread_accounting_enabled", True)
+        self.thread_accounting_interval = config.get("thread_accounting_interval", 2.0)
+        self._configure_thread_accounting()
+
+        # Input trace recording (empty path disables it)
+        self.input_record_path = config.get("input_record_path", "")
+
+        # Input hook watchdog parameters
+        self.input_watchdog_interval = config.get("input_watchdog_interval_ms", 1000)
+        self.input_watchdog.configure(config.get("input_stall_ms", 1000), config.get("input_hook_timeout_ms", 300))
+
+        # Logging parameters
+        self.log_level = str(config.get("log_level", "INFO")).upper()
+        self.log_file = config.get("log_file", "")
+        configure_logging(self.log_level, self.log_file)
+
+        # Undo/redo history parameters
+        self.config_history.set_limit(max(1, int(config.get("config_history_limit", 100))))
+        self.config_journal_enabled = config.get("config_journal_enabled", False)
+        self._configure_config_journal(config.get("config_journal_path", "config_history.jsonl"))
+
+    def _configure_state_export(self):
+        """Creates or closes the shared-memory state exporter to match the current settings."""
+        exporter = self.state_exporter
+        if exporter is not None and (not self.state_export_enabled or exporter.path != self.state_export_path):
+            exporter.close()
+            self.state_exporter = None
+        if self.state_export_enabled and self.state_exporter is None:
+            try:
+                self.state_exporter = SharedStateExporter(self.state_export_path)
+                logger.info("Publishing crosshair state to %s", self.state_export_path)
+            except OSError as e:
+                logger.error("Could not create shared state file %s: %s", self.state_export_path, e)
+                self.state_export_enabled = False
+
+    def _configure_adaptive_color(self, config):
+        """Starts, retunes or stops the adaptive color sampler to match the settings."""
+        region = int(config.get("adaptive_color_region", 96))
+        sampler = self.adaptive_color
+        if sampler is not None and (not self.adaptive_color_enabled or region != self.adaptive_color_region):
+            sampler.stop()
+            self.adaptive_color = None
+        if not self.adaptive_color_enabled:
+            if self.adaptive_colors is not None:
+                self.adaptive_colors = None
+                self._build_scene() # Back to the configured colors
+            return
+
+        palette = config.get("adaptive_color_palette") or [config["crosshair_color"], config["outline_color"]]
+        # Ignore the square the crosshair itself covers, in case the capture includes the overlay
+        extent = self.base_gap + self.base_segment_length + self.outline_thickness
+        exclude = min(extent, region // 2 - 8)
+        start = self.adaptive_color is None
+        if start:
+            x = self.screen_width // 2 - region // 2
+            y = self.screen_height // 2 - region // 2
+            self.adaptive_color = AdaptiveColorSampler(lambda: screen_grabber(x, y, region, region))
+            self.adaptive_color_region = region
+        self.adaptive_color.configure(palette, config.get("adaptive_color_hysteresis", 0.25),
+                                      config.get("adaptive_color_mode", "pick"),
+                                      config.get("adaptive_color_rate_hz", 4),
+                                      config.get("adaptive_color_cpu_budget", 0.02), exclude)
+        if start:
+            self.adaptive_color.start()
+
+    def _configure_session_stats(self):
+        """Starts collecting session statistics, or logs and stops the current session."""
+        if self.session_stats_enabled and self.session_stats is None:
+            self.set_session_stats(SessionStats())
+        elif not self.session_stats_enabled and self.session_stats is not None:
+            self._log_session()
+            self.set_session_stats(None)
+
+    def _log_session(self):
+        """Appends the current session to the session log, if anything happened in it."""
+        stats = self.session_stats
+        if stats is None or not self.session_log_path or not (stats.counter_strafes or stats.shots):
+            return
+        self.io_pool.append_text(self.session_log_path, json.dumps(stats.to_record(), separators=(",", ":")) + "\n")
+
+    def _configure_thread_accounting(self):
+        """Starts or stops sampling the per-thread counters."""
+        if self.thread_accounting_enabled and self.thread_accounting is None:
+            if self.thread_accounting_unavailable:
+                return # Already warned; every config apply would repeat it
+            accounting = ThreadAccounting()
+            if not accounting.available:
+                logger.warning("Thread accounting needs /proc or psutil; it is disabled.")
+                self.thread_accounting_unavailable = True
+                return
+            self.thread_accounting = accounting
+            self._sample_threads()
+        elif not self.thread_accounting_enabled and self.thread_accounting is not None:
+            self.root.after_cancel(self._thread_sample_job)
+            self._thread_sample_job = None
+            self.thread_accounting = None
+
+    def _sample_threads(self):
+        """Samples the thread counters on the I/O pool, then reschedules itself."""
+        self.io_pool.submit(self.thread_accounting.sample)
+        self._thread_sample_job = self.root.after(int(self.thread_accounting_interval * 1000), self._sample_threads)
+
+    def get_thread_stats(self):
+        """Returns the latest per-thread CPU and wakeup rows (busiest first), or None if disabled."""
+        return self.thread_accounting.rows if self.thread_accounting is not None else None
+
+    def load_session_log(self, callback):
+        """Reads the session log on the I/O pool; callback((summaries, overall)) runs on the Tk thread."""
+        self.io_pool.submit(read_session_log, self.session_log_path, callback=callback)
+
+    def _configure_mouse_tracking(self):
+        """Subscribes to mouse moves only while mouse spread is enabled."""
+        # With the capture process, moves arrive through the event ring instead
+        want_hook = self.mouse_spread_enabled and not self.input_process_enabled
+        has_hook = "mouse_move" in self.input_watchdog.channels
+        if want_hook and not has_hook:
+            self.input_watchdog.register("mouse_move", lambda wrap: mouse.Listener(
+                on_move=wrap(self._hook(self.mouse_tracker.on_move))))
+        elif has_hook and not want_hook:
+            self.input_watchdog.unregister("mouse_move")
+        if self.mouse_spread_enabled != self.mouse_tracking:
+            self.mouse_tracker.reset()
+            self.mouse_tracking = self.mouse_spread_enabled
+            self.mouse_spread_fraction = 0.0
+
+    def _configure_input_capture(self):
+        """Moves the keyboard and mouse hooks into or out of the capture process to match the settings."""
+        if self.input_process_enabled:
+            if self.input_ring is None:
+                self.input_watchdog.unregister("keyboard")
+                self.input_watchdog.unregister("mouse")
+                self.input_ring = EventRing(capacity=self.input_ring_capacity, create=True)
+                self.input_ring.set_sleeping(not self.visibility.visible)
+                self.ring_wake = start_wake_listener(self._wake_if_suspended)
+            # The process is (re)started when the move settings it was launched with change
+            options = (self.mouse_spread_enabled, self.mouse_coalesce_ms)
+            if options != self.input_process_options:
+                self.input_process_options = options
+                self.input_watchdog.unregister("input_process")
+                self.input_watchdog.register("input_process", lambda wrap: InputCaptureProcess(
+                    self.input_ring, *options, wake=self.ring_wake))
+                logger.info("Input capture moved to a separate process (ring %s).", self.input_ring.path)
+        elif self.input_ring is not None:
+            self.input_watchdog.unregister("input_process")
+            self.input_process_options = None
+            self.ring_wake.close() # Ends the wake listener thread
+            self.ring_wake = None
+            self.input_ring.close()
+            self.input_ring.unlink()
+            self.input_ring = None
+            self._setup_input_listeners()
+
+    def _toggle_profiler_capture(self):
+        """Starts a timed profiler capture, or ends the running one early."""
+        if self.profiler.active:
+            self._finish_profiler_capture()
+            return
+        self.profiler.start()
+        self._profiler_stop_job = self.root.after(int(self.profiler_duration * 1000), self._finish_profiler_capture)
+        logger.info("Profiling for %ss (press %s again to stop early).", self.profiler_duration,
+                    self.profiler_hotkey.upper())
+
+    def _finish_profiler_capture(self):
+        """Stops the capture and writes the results on the I/O pool."""
+        if not self.profiler.active:
+            return
+        self.root.after_cancel(self._profiler_stop_job)
+        stats = self.profiler.stop()
+        duration = time.time() - self.profiler.started_at
+        self.io_pool.submit(write_capture, stats, self.profiler_output_dir, self.profiler.started_at,
+                            duration, self.profiler.thread_count, self.profiler_top_n,
+                            callback=lambda path: logger.info("Profile written to %s", path))
+
+    def _configure_control_server(self):
+        """Starts or stops the control socket to match the current settings."""
+        # The menu process needs the socket too, even with control_socket_enabled off
+        wanted = self.control_socket_enabled or self.menu_process_enabled
+        server = self.control_server
+        if server is not None and (not wanted
+                                   or server.port != self.control_port
+                                   or (self.control_socket_path and server.path != self.control_socket_path)):
+            server.stop()
+            self.control_server = None
+        if wanted and self.control_server is None:
+            self.control_server = ControlServer(self.control_socket_path or None, self.control_port,
+                                                on_queued=self._wake_if_suspended)
+
+    def _configure_config_journal(self, path):
+        """Loads the undo journal when it is first enabled or moved, compacting it if it has grown."""
+        if not self.config_journal_enabled:
+            self.config_journal_path = None
+            return
+        if path == self.config_journal_path:
+            return
+        self.config_journal_path = path
+        # Read synchronously: it happens once, and the journal is kept small by compaction
+        try:
+            with open(path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.error("Error reading config journal %s: %s", path, e)
+            return
+        history = ConfigHistory(self.config_history.limit)
+        history.replay(lines)
+        self.config_history = history
+        if len(lines) > 4 * history.limit:
+            try:
+                with open(path, "w") as f:
+                    f.writelines(history.compacted_lines())
+            except OSError as e:
+                logger.error("Error compacting config journal %s: %s", path, e)
+
+    def _record_config_change(self, old, new):
+        """Adds the difference between two configs to the undo history (and the journal)."""
+        delta = self.config_history.record(old, new)
+        if delta is not None and self.config_journal_path:
+            self.io_pool.append_text(self.config_journal_path, ConfigHistory.encode("edit", delta))
+
+    def _step_config_history(self, op):
+        """Applies one undo or redo from the history. Returns False if there was nothing to apply."""
+        config = dict(self.config)
+        step = self.config_history.undo if op == "undo" else self.config_history.redo
+        if step(config) is None:
+            return False
+        if self.config_journal_path:
+            self.io_pool.append_text(self.config_journal_path, ConfigHistory.encode(op))
+        self.apply_config(config)
+        self._apply_clickthrough_setting()
+        self._update_target_spread()
+        self.io_pool.write_json(self.config_path, self.config)
+        return True
+
+    def undo_config(self):
+        """Reverts the last config edit in memory and on disk. Returns False if there is none."""
+        return self._step_config_history("undo")
+
+    def redo_config(self):
+        """Re-applies the last undone config edit. Returns False if there is none."""
+        return self._step_config_history("redo")
+
+    def _handle_control_command(self, command, args):
+        """Applies one control socket command on the Tk thread and returns its result."""
+        if command == "ping":
+            return "pong"
+        if command == "set":
+            if len(args) != 2:
+                raise ValueError("Usage: set <key> <value>")
+            key, value = args
+            self._set_config_value(key, value)
+            return {key: self.config[key]}
+        if command == "update":
+            if len(args) != 1 or not isinstance(args[0], dict):
+                raise ValueError('Usage: update {"changes": {...}, "removed": [...]}')
+            return self._update_config(args[0].get("changes", {}), args[0].get("removed", []))
+        if command == "get":
+            if not args:
+                return dict(self.config)
+            if args[0] not in self.config:
+                raise ValueError(f"Unknown parameter: {args[0]}")
+            return {args[0]: self.config[args[0]]}
+        if command == "presets":
+            return self.preset_store.search(args[0]) if args else self.preset_store.names()
+        if command == "preset":
+            if len(args) != 1:
+                raise ValueError("Usage: preset <name>")
+            self._select_preset(args[0])
+            return {"current_preset": args[0]}
+        if command == "state":
+            return self._get_live_state()
+        if command == "stats":
+            return self.get_stats()
+        if command == "session":
+            return self.session_stats.summary() if self.session_stats is not None else None
+        if command == "threads":
+            return self.get_thread_stats()
+        if command == "save":
+            self.io_pool.write_json(self.config_path, self.config)
+            return {"saved": self.config_path}
+        if command == "reload":
+            self.reload_config()
+            return {"reloading": self.config_path}
+        if command in ("undo", "redo"):
+            changed = self.undo_config() if command == "undo" else self.redo_config()
+            return {command: changed, "history": len(self.config_history.undo_stack)}
+        if command == "quit":
+            self.root.after(0, self.quit_overlay) # After this response has been sent
+            return {"quitting": True}
+        raise ValueError(f"Unknown command: {command}")
+
+    def _set_config_value(self, key, value):
+        """Changes a single config value in memory and applies it immediately."""
+        if key not in self.config or key == "current_preset":
+            raise ValueError(f"Unknown parameter: {key}")
+        if key not in CONTROL_SETTABLE_KEYS:
+            raise ValueError(f"{key} can only be changed in {self.config_path}")
+        current = self.config[key]
+        is_number = lambda v: isinstance(v, (int, float)) and not isinstance(v, bool)
+        if type(value) is not type(current) and not (is_number(current) and is_number(value)):
+            raise ValueError(f"{key} expects a {type(current).__name__}")
+        config = dict(self.config)
+        config[key] = value
+        self._record_config_change(self.config, config)
+        self.apply_config(config)
+        if key == "clickthrough_enabled":
+            self._apply_clickthrough_setting()
+        self._update_target_spread()
 
-    def _rgb_to_hex(self, rgb):
-        """Converts an RGB tuple to a Tkinter-compatible hex color string."""
-        return f'#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}'
+    def _update_config(self, changes, removed):
+        """Applies the keys a menu process changed as one edit, and writes config.json on the I/O pool."""
+        if "presets" in changes:
+            raise ValueError("Presets are saved to the preset store, not the config")
+        locked = sorted(key for key in (*changes, *removed) if key not in CONTROL_SETTABLE_KEYS and key != "current_preset")
+        if locked:
+            raise ValueError(f"{', '.join(locked)} can only be changed in {self.config_path}")
+        config = dict(self.config)
+        config.update(changes)
+        for key in removed:
+            config.pop(key, None)
+        self._record_config_change(self.config, config)
+        self.apply_config(config)
+        if "clickthrough_enabled" in changes:
+            self._apply_clickthrough_setting()
+        self._update_target_spread()
+        self.io_pool.write_json(self.config_path, self.config)
+        return {"changed": sorted(changes), "removed": list(removed)}
+
+    def _select_preset(self, name):
+        """Applies a preset from the preset store in memory."""
+        preset = self.preset_store.get(name)
+        if preset is None:
+            raise ValueError(f"Unknown preset: {name}")
+        config = dict(self.config)
+        config.update(preset)
+        if "layers" not in preset:
+            config.pop("layers", None) # Presets without layers use the classic cross
+        if "spread_curves" not in preset:
+            config.pop("spread_curves", None)
+        config["current_preset"] = name
+        self._record_config_change(self.config, config)
+        self.apply_config(config)
+        self._apply_clickthrough_setting()
+        self._update_target_spread()
+
+    def _get_live_state(self):
+        """Returns the current animated crosshair values and input state."""
+        return {
+            "current_gap": self.frame.current_gap,
+            "current_length": self.frame.current_length,
+            "current_spread_offset": self.frame.current_spread_offset,
+            "target_spread_offset": self.frame.target_spread_offset,
+            "recoil_offset": self.frame.recoil_offset,
+            "jitter_x": self.frame.jitter_x,
+            "jitter_y": self.frame.jitter_y,
+            "is_counter_strafing": self.is_counter_strafing,
+            "counter_strafe_quality": self.counter_strafe_quality,
+            "movement_speed": self.movement_model.speed,
+            "spread_settled": self.frame.spread_settled,
+            "keys": sorted(self.input_state['keys']),
+            "mouse": sorted(self.input_state['mouse'])
+        }
+
+    def get_stats(self):
+        """Returns frame timing statistics and other runtime counters."""
+        stats = {
+            "frame_interval": self.frame_intervals.summary(),
+            "frame_work": self.frame_work.summary()
+        }
+        if self.control_server is not None:
+            stats["control_handling"] = self.control_server.handle_times.summary()
+        stats.update(self.io_pool.get_stats())
+        stats["counter_strafe"] = self.strafe_timer.get_stats()
+        stats["movement_steps"] = self.movement_model.steps_run
+        if self.mouse_tracking:
+            stats["mouse_hook"] = self.mouse_tracker.get_stats()
+        stats["input_hooks"] = self.input_watchdog.get_stats()
+        stats["key_repeats_dropped"] = self.bindings.repeats
+        if self.session_stats is not None:
+            stats["session"] = self.session_stats.summary()
+        if self.input_ring is not None:
+            stats["input_ring"] = self.input_ring.get_stats()
+        if self.adaptive_color is not None:
+            stats["adaptive_color"] = self.adaptive_color.get_stats()
+        stats["visibility"] = self.visibility.get_stats()
+        if self.thread_accounting is not None:
+            stats["threads"] = self.thread_accounting.get_stats()
+        return stats
+
+    def _input_bitmask(self):
+        """Packs the current input state into the bitmask used by the shared state export."""
+        keys = self.input_state['keys']
+        buttons = self.input_state['mouse']
+        bits = 0
+        if 'forward' in keys:
+            bits |= INPUT_FORWARD
+        if 'back' in keys:
+            bits |= INPUT_BACKWARD
+        if 'moveleft' in keys:
+            bits |= INPUT_LEFT
+        if 'moveright' in keys:
+            bits |= INPUT_RIGHT
+        if 'crouch' in keys:
+            bits |= INPUT_CROUCH
+        if 'left' in buttons:
+            bits |= INPUT_MOUSE_LEFT
+        if 'right' in buttons:
+            bits |= INPUT_MOUSE_RIGHT
+        if self.is_counter_strafing:
+            bits |= INPUT_COUNTER_STRAFE
+        return bits
+
+    def _build_scene(self):
+        """Compiles the configured layers and creates their canvas items. Runs once per config."""
+        # Layers fall back to the top-level crosshair settings for anything they don't set
+        defaults = self.scene_defaults()
+        if self.adaptive_colors is not None:
+            crosshair_rgb, outline_rgb = self.adaptive_colors
+            defaults["color"] = self._rgb_to_hex(crosshair_rgb)
+            if outline_rgb is not None:
+                defaults["outline_color"] = self._rgb_to_hex(outline_rgb)
+        with_rects = self.linux_overlay is not None and self.linux_overlay.available
+        try:
+            self.scene = Scene(self.layers, defaults, with_rects)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error("Invalid crosshair layers, drawing the default cross: %s", e)
+            self.scene = Scene(DEFAULT_LAYERS, defaults, with_rects)
+        self.scene_view.build(self.scene)
+        self.frame.visible = False
 
     def draw_crosshair(self):
         """Draw the crosshair with current settings."""
-        if not self.game_running:
-            self.canvas.delete("all")
+        frame = self.frame
+        if not self.game_running or not self.visibility.visible:
+            if frame.visible:
+                self.scene_view.set_visible(False)
+                frame.visible = False
+                if self.linux_overlay is not None:
+                    self.linux_overlay.set_paint_rects(())
             return
 
-        self.canvas.delete("all")
-        center_x = self.screen_width // 2
-        center_y = self.screen_height // 2
-
-        # Apply recoil offset
-        center_y += self.recoil_offset
-
-        # Apply jitter offset
-        center_x += int(self.jitter_x)
-        center_y += int(self.jitter_y)
-
-        # Use lerped values for gap and length
-        current_gap = self.current_gap
-        current_length = self.current_length
-
-        # Calculate segment endpoints
-        outer_arm_end = current_gap + current_length
-        segments = [
-            ((center_x - outer_arm_end, center_y), (center_x - current_gap, center_y)),  # Left
-            ((center_x + current_gap, center_y), (center_x + outer_arm_end, center_y)),   # Right
-            ((center_x, center_y - outer_arm_end), (center_x, center_y - current_gap)), # Top
-            ((center_x, center_y + current_gap), (center_x, center_y + outer_arm_end))   # Bottom
-        ]
-
-        # Draw outline if enabled
-        if self.show_outline:
-            for start, end in segments:
-                self.canvas.create_line(*start, *end, 
-                                      fill=self.outline_color, 
-                                      width=self.outline_thickness)
-        
-        # Draw main crosshair
-        for start, end in segments:
-            self.canvas.create_line(*start, *end, 
-                                  fill=self.crosshair_color, 
-                                  width=self.line_thickness)
+        # Only layers whose position or spread changed get new coordinates
+        if self.scene.update(self.screen_width // 2, self.screen_height // 2, frame.recoil_offset,
+                             int(frame.jitter_x), int(frame.jitter_y), frame.current_spread_offset):
+            self.scene_view.apply()
 
-    def update_overlay(self):
-        """Redraws the crosshair and schedules the next update."""
-        # Determine the appropriate speed based on the current state
-        if self.is_counter_strafing and self.counter_strafe_enabled:
-            current_speed = self.counter_strafe_reduction_speed
-        elif self.click_spread_enabled and (
-            (self.click_spread_button == "both" and 
-             ("left" in self.input_state['mouse'] or 
-              "right" in self.input_state['mouse'])) or
-            (self.click_spread_button == "left" and 
-             "left" in self.input_state['mouse']) or
-            (self.click_spread_button == "right" and 
-             "right" in self.input_state['mouse'])
-        ):
-            current_speed = self.click_spread_speed
-        elif self.crouch_spread_enabled and ('ctrl' in self.input_state['keys'] or 
-                                            'ctrl_l' in self.input_state['keys'] or
-                                            'ctrl_r' in self.input_state['keys']):
-            current_speed = self.crouch_spread_speed
-        else:
-            current_speed = self.movement_spread_speed
-
-        # Calculate the lerp factor based on the current speed, clamp between 0 and 1
-        lerp_factor = min(current_speed * self.lerp_speed, 1.0)
-
-        # Update recoil if shooting
-        if self.click_spread_enabled and (
-            (self.click_spread_button == "both" and 
-             ("left" in self.input_state['mouse'] or 
-              "right" in self.input_state['mouse'])) or
-            (self.click_spread_button == "left" and 
-             "left" in self.input_state['mouse']) or
-            (self.click_spread_button == "right" and 
-             "right" in self.input_state['mouse'])
-        ):
-            self.target_recoil_offset = -self.recoil_amount
-        else:
-            self.target_recoil_offset = 0
-
-        # Apply recoil lerping
-        if self.target_recoil_offset < self.recoil_offset:
-            # Moving up (recoil)
-            self.recoil_offset = self._lerp(
-                self.recoil_offset,
-                self.target_recoil_offset,
-                self.recoil_speed
-            )
-        else:
-            # Moving down (recovery)
-            self.recoil_offset = self._lerp(
-                self.recoil_offset,
-                self.target_recoil_offset,
-                self.recoil_recovery_speed
-            )
-
-        # Update current_spread_offset with lerping
-        self.current_spread_offset = self._lerp(
-            self.current_spread_offset,
-            self.target_spread_offset,
-            lerp_factor
-        )
-
-        # Calculate target gap (base gap + current spread offset)
-        target_gap = self.base_gap + self.current_spread_offset
-        self.current_gap = self._lerp(
-            self.current_gap,
-            target_gap,
-            lerp_factor
-        )
-
-        # Update length based on dynamic_length_enabled setting
-        if self.dynamic_length_enabled:
-            self.current_length = self._lerp(
-                self.current_length,
-                self.base_segment_length + self.current_spread_offset,
-                lerp_factor
-            )
-        else:
-            self.current_length = self.base_segment_length
-
-        # Jitter animation update
-        if self.jitter_enabled and len(self.input_state['mouse']) > 0:
-            import math
-            # Increase jitter offset by jitter_speed, wrap around 2*pi
-            self.jitter_offset += self.jitter_speed
-            if self.jitter_offset > 2 * math.pi:
-                self.jitter_offset -= 2 * math.pi
-
-            # Calculate target jitter x and y offsets based on jitter_mode
-            if self.jitter_mode == "random":
-                target_jitter_x = self.random.uniform(-self.jitter_amount, self.jitter_amount)
-                target_jitter_y = self.random.uniform(-self.jitter_amount, self.jitter_amount)
-            elif self.jitter_mode == "up":
-                target_jitter_x = 0
-                target_jitter_y = self.jitter_amount * math.sin(self.jitter_offset)
-            elif self.jitter_mode == "sideways":
-                target_jitter_x = self.jitter_amount * math.sin(self.jitter_offset)
-                target_jitter_y = 0
-            else:
-                target_jitter_x = 0
-                target_jitter_y = 0
+            # On X11, only the crosshair pixels are part of the window shape
+            if self.linux_overlay is not None:
+                self.linux_overlay.set_paint_rects(self.scene.rects)
 
-            # Lerp jitter_x and jitter_y towards target values for smooth jitter
-            self.jitter_x = self._lerp(self.jitter_x, target_jitter_x, self.lerp_speed)
-            self.jitter_y = self._lerp(self.jitter_y, target_jitter_y, self.lerp_speed)
-        else:
-            self.jitter_x = 0
-            self.jitter_y = 0
+        if not frame.visible:
+            self.scene_view.set_visible(True)
+            frame.visible = True
+
+    def update_overlay(self):
+        """Redraws the crosshair and schedules the next update (unless the crosshair has been hidden)."""
+        self.frame_job = None
+        frame_start = time.perf_counter()
+        if self.last_frame_time is not None:
+            self.frame_intervals.add((frame_start - self.last_frame_time) * 1000)
+        self.last_frame_time = frame_start
+
+        # Apply queued control socket commands between frames
+        if self.control_server is not None:
+            self.control_server.drain(self._handle_control_command)
+
+        # Events written by the input capture process since the last frame
+        if self.input_ring is not None:
+            self.input_ring.drain(self._on_ring_event)
+
+        # Stop scheduling frames once the idle timeout runs out; any input restarts them
+        if self.visibility.idle_expired(frame_start):
+            self._set_hidden("idle", True)
+        if not self.visibility.visible:
+            return # Suspended; _on_visibility_changed() restarts the loop
+
+        # Mouse speed from the buckets the move hook closed since the last frame
+        mouse_speed = None
+        if self.mouse_tracking:
+            mouse_speed = self.mouse_tracker.sample(int(frame_start * 1_000_000_000))
+
+        # Spread, recoil and jitter for this frame (see crosshair_model.py)
+        self.advance(frame_start, mouse_speed)
+        frame = self.frame
+
+        # Publish the frame's state for external readers
+        if self.state_exporter is not None:
+            self.state_exporter.publish(frame.current_gap, frame.current_length, frame.current_spread_offset,
+                                        frame.recoil_offset, frame.jitter_x, frame.jitter_y,
+                                        self._input_bitmask())
+
+        # Colors chosen by the adaptive color sampler; the scene is rebuilt only when they change
+        if self.adaptive_color is not None:
+            colors = self.adaptive_color.colors
+            if colors != self.adaptive_colors:
+                self.adaptive_colors = colors
+                self._build_scene()
 
         self.draw_crosshair()
-        self.root.after(16, self.update_overlay)  # Aim for ~60 FPS
+        self.frame_work.add((time.perf_counter() - frame_start) * 1000)
+        if self.frame_job is None: # Not already restarted by an event handled this frame
+            self.frame_job = self.root.after(self.FRAME_INTERVAL_MS, self.update_overlay)
 
     def _toggle_customization_menu(self, event=None):
         """Opens or brings to the front the customization menu."""
+        if self.menu_process_enabled:
+            self._open_menu_process()
+            return
         if not self.menu_open:
             self.customization_menu = CustomizationMenu(self.root, self, self.config_path)
             self.menu_open = True
+            self._set_hidden("menu", self.visibility_hide_in_menu)
             # Ensure the menu is destroyed if the main window closes
             self.customization_menu.transient(self.root) # Make it a transient window of the root
             self.customization_menu.grab_set() # Make it modal (optional, but good for settings)
             self.root.wait_window(self.customization_menu) # Wait for menu to close
             self.menu_open = False # Reset flag after menu closes
+            self._set_hidden("menu", False)
         else:
             # If menu is already open, bring it to the front
             if self.customization_menu and self.customization_menu.winfo_exists():
@@ -626,144 +1134,72 @@ class CrosshairOverlay:
                 self.menu_open = False
                 self._toggle_customization_menu()
 
-    # This method is no longer strictly needed for WASD with pynput,
-    # but can be kept as a placeholder for other Tkinter-bound keys.
-    def rebind_keys(self):
-        """Placeholder for re-binding keys if needed. WASD/Mouse handled by pynput."""
-        print("Rebinding keys (WASD/Mouse handled by pynput).")
-        # No Tkinter unbind/bind for WASD/Mouse here anymore.
-
-    def _process_key_event(self, key_char, pressed):
-        """Process key events in the Tkinter main thread."""
-        modifier_keys = {'ctrl', 'ctrl_l', 'ctrl_r', 'shift', 'shift_l', 'shift_r', 'alt', 'alt_l', 'alt_r'}
-        if pressed:
-            self.input_state['keys'].add(key_char)
-            self.input_state['last_key'] = key_char
-            if key_char in modifier_keys:
-                self.input_state['modifiers'].add(key_char)
-        else:
-            self.input_state['keys'].discard(key_char)
-            if key_char in modifier_keys:
-                self.input_state['modifiers'].discard(key_char)
-        
-        # Handle specific key bindings
-        if key_char == str(self.key_bindings['toggle_menu']).replace('Key.', '').lower():
-            self._toggle_customization_menu()
-        elif key_char == str(self.key_bindings['quit']).replace('Key.', '').lower():
-            self.quit_overlay()
-        
-        # Update movement state
-        self._update_movement_state()
-
-    def _process_mouse_event(self, button_name, pressed):
-        """Process mouse events in the Tkinter main thread."""
-        if pressed:
-            self.input_state['mouse'].add(button_name)
-            self.input_state['last_mouse'] = button_name
-        else:
-            self.input_state['mouse'].discard(button_name)
-        
-        # Update target spread
-        self._update_target_spread()
-
-    def _update_movement_state(self):
-        """Update movement-related state based on current input."""
-        # Reset counter-strafe state
-        self.is_counter_strafing = False
-
-        #print(f"Keys pressed for movement state: {self.input_state['keys']}")
-
-        # Check for counter-strafe by directly checking opposite key pairs
-        if self.counter_strafe_enabled:
-            opposite_pairs = [('w', 's'), ('a', 'd')]
-            for key1, key2 in opposite_pairs:
-                if key1 in self.input_state['keys'] and key2 in self.input_state['keys']:
-                    self.is_counter_strafing = True
-                    print(f"Counter-strafing detected with keys: {key1} and {key2}")
-                    break
-        
-        #print(f"Counter-strafing state: {self.is_counter_strafing}")
-
-        # Update target spread
-        self._update_target_spread()
+    def _open_menu_process(self):
+        """Starts the menu in its own process, unless it is already open."""
+        if self.menu_process is not None and self.menu_process.is_alive():
+            return # Already open; its window is topmost
+        if self.control_server is None:
+            logger.error("The menu process needs the control socket, which is not running.")
+            return
+        self.menu_process = MenuProcess(self.control_server, self.config_path, self.PRESET_STORE_PATH,
+                                        on_exit=lambda: self.root.after(0, self._set_hidden, "menu", False))
+        self.menu_process.start()
+        self._set_hidden("menu", self.visibility_hide_in_menu)
+        logger.info("Customization menu opened in a separate process.")
 
-    def _update_target_spread(self):
-        """Enhanced target spread calculation."""
-        # Start with base gap as the minimum spread
-        current_spread = self.base_gap
-        
-        # Movement spread (adds to base gap)
-        movement_keys_pressed = any(
-            key_char in self.input_state['keys'] 
-            for key_char in self.movement_key_map
-        )
-        # Remove debug print for movement spread
-        # print(f"Movement spread enabled: {self.movement_spread_enabled}, Movement keys pressed: {movement_keys_pressed}")
-        if self.movement_spread_enabled and movement_keys_pressed:
-            if self.is_counter_strafing:
-                # Apply counter-strafe reduction
-                current_spread += max(
-                    self.movement_spread_amount - self.counter_strafe_reduction_speed,
-                    self.counter_strafe_min_spread
-                )
-            else:
-                current_spread += self.movement_spread_amount
-        
-        # Click spread (adds to current spread)
-        if self.click_spread_enabled:
-            trigger_button = self.click_spread_button
-            if (trigger_button == "both" and 
-                ("left" in self.input_state['mouse'] or 
-                 "right" in self.input_state['mouse'])):
-                current_spread = max(current_spread, self.base_gap + self.click_spread_amount)
-            elif (trigger_button == "left" and 
-                  "left" in self.input_state['mouse']):
-                current_spread = max(current_spread, self.base_gap + self.click_spread_amount)
-            elif (trigger_button == "right" and 
-                  "right" in self.input_state['mouse']):
-                current_spread = max(current_spread, self.base_gap + self.click_spread_amount)
-        
-        # Crouch spread (reduces from total spread) - apply after all other spreads
-        if self.crouch_spread_enabled and ('ctrl' in self.input_state['keys'] or 
-                                          'ctrl_l' in self.input_state['keys'] or
-                                          'ctrl_r' in self.input_state['keys']):
-            # Remove debug print for crouch spread
-            # print(f"Crouch spread active. Keys: {self.input_state['keys']}")
-            current_spread = max(current_spread - self.crouch_spread_amount, self.base_gap)
-        else:
-            # print(f"Crouch spread inactive. Keys: {self.input_state['keys']}")
-            pass
-        
-        # Calculate final spread offset (total spread minus base gap)
-        self.target_spread_offset = current_spread - self.base_gap
+    def rebind_keys(self):
+        """Compiles the key bindings into the dispatch table, releasing any action that was held."""
+        now = time.perf_counter_ns()
+        for action in list(self.input_state['keys']):
+            self.release_action(action, now)
+        self.bindings.compile(self.key_binding_config)
+        for action in HOLD_ACTIONS:
+            if action in self.visibility.held:
+                self._set_hold(action, False)
+        logger.debug("Key bindings compiled: %d keys bound.", len(self.bindings.table))
 
     def _apply_clickthrough_setting(self):
         """Apply the clickthrough window style based on current setting."""
         if sys.platform == "win32":
             self._setup_windows_overlay()
+        elif sys.platform.startswith("linux"):
+            self._setup_linux_overlay()
 
     def _get_current_input_state(self):
         """Get a snapshot of the current input state."""
         return {
             'keys': set(self.input_state['keys']),
             'mouse': set(self.input_state['mouse']),
-            'modifiers': set(self.input_state['modifiers']),
             'last_key': self.input_state['last_key'],
-            'last_mouse': self.input_state['last_mouse'],
-            'mouse_position': self.input_state['mouse_position']
+            'last_mouse': self.input_state['last_mouse']
         }
 
     def run(self):
-        self.update_overlay() # Start the drawing loop
+        if self.frame_job is None:
+            self.update_overlay() # Start the drawing loop
         self.root.mainloop()
 
     def quit_overlay(self):
         if self.customization_menu and self.customization_menu.winfo_exists():
             self.customization_menu.destroy() # Close the menu if open
-        self.keyboard_listener.stop() # Stop the pynput keyboard listener thread
-        self.mouse_listener.stop() # New: Stop the pynput mouse listener thread
-        if hasattr(self, 'global_keyboard_listener'):
-            self.global_keyboard_listener.stop() # Stop the global keyboard listener thread
+        if self.menu_process is not None:
+            self.menu_process.stop()
+        self.input_watchdog.stop_all() # Stop every pynput listener thread (and the capture process)
+        if self.input_ring is not None:
+            self.input_ring.close()
+            self.input_ring.unlink()
+        if self.linux_overlay is not None:
+            self.linux_overlay.close()
+        if self.adaptive_color is not None:
+            self.adaptive_color.stop()
+        if self.state_exporter is not None:
+            self.state_exporter.close()
+        if self.control_server is not None:
+            self.control_server.stop()
+        self._log_session()
+        self.io_pool.shutdown() # Let pending config writes finish
+        self.preset_store.close()
+        stop_logging() # Flush queued log records
         self.root.destroy()
         sys.exit()
 
@@ -1,15 +1,24 @@
 import tkinter as tk
 import tkinter.ttk as ttk
 from tkinter import colorchooser, simpledialog
+import copy
 import json
+import logging
 import os
 import sys
+import time
+
+from preset_store import PresetStore
+from response_curves import SpreadCurve, CURVE_EVENTS
+
+logger = logging.getLogger(__name__)
 
 class CustomizationMenu(tk.Toplevel):
     def __init__(self, master, overlay_instance, config_path="config.json"):
         super().__init__(master)
         self.overlay_instance = overlay_instance
         self.config_path = config_path
+        self.preset_store = overlay_instance.preset_store
         self.title("Crosshair Customization")
         self.resizable(True, True)
         self.attributes('-topmost', True)
@@ -64,33 +73,61 @@ class CustomizationMenu(tk.Toplevel):
         self.style.map('TNotebook.Tab', 
                      background=[('selected', '#1e1e1e')],
                      foreground=[('selected', 'white')])
+
+        # Configure the session table
+        self.style.configure('Treeview',
+                           background='#2e2e2e',
+                           fieldbackground='#2e2e2e',
+                           foreground='white')
+        self.style.configure('Treeview.Heading',
+                           background='#1e1e1e',
+                           foreground='white')
         
         self._load_config()
+        self._suspend_updates = False # Set while widgets are filled in bulk, so each write isn't saved separately
         self._setup_variables()
         self._create_widgets()
         self._update_widgets_from_config()
 
     def _load_config(self):
-        """Loads the current configuration from the JSON file."""
-        if not os.path.exists(self.config_path):
+        """Loads the current configuration, preferring the overlay's in-memory copy over the JSON file."""
+        overlay_config = getattr(self.overlay_instance, "config", None)
+        if overlay_config is None and not os.path.exists(self.config_path):
             # If config doesn't exist, create a default one (should be handled by overlay)
             # For menu, we'll just use default values if file is missing
             self.config = self._get_default_config()
         else:
-            with open(self.config_path, "r") as f:
-                self.config = json.load(f)
+            if overlay_config is not None:
+                # The overlay already holds the current config, so opening the menu doesn't touch the disk
+                self.config = copy.deepcopy(overlay_config)
+            else:
+                with open(self.config_path, "r") as f:
+                    self.config = json.load(f)
             # Ensure all default keys are present for backward compatibility
             default_config = self._get_default_config()
             for key, value in default_config.items():
-                if key not in self.config:
+                if key not in self.config and key != "presets":
                     self.config[key] = value
-            for preset_name, preset in default_config["presets"].items():
-                if preset_name not in self.config["presets"]:
-                    self.config["presets"][preset_name] = preset
 
-    def _get_default_config(self):
+        # Presets live in the preset store, which was seeded with the built-in ones when created.
+        # Move any left in an old config.json there without holding up the overlay's frame loop.
+        if "presets" in self.config:
+            presets = self.config.pop("presets")
+            io_pool = getattr(self.overlay_instance, "io_pool", None)
+            if io_pool is not None:
+                io_pool.submit(self.preset_store.import_presets, presets)
+            else:
+                self.preset_store.import_presets(presets)
+
+    @staticmethod
+    def default_presets():
+        """Returns the built-in presets the preset store is seeded with."""
+        return CustomizationMenu._get_default_config()["presets"]
+
+    @staticmethod
+    def _get_default_config():
         """Returns the default configuration dictionary with preset support."""
-        return {
+        config = {
             "current_preset": "Default",
             "presets": {
                 "Default": {
@@ -155,6 +192,14 @@ class CustomizationMenu(tk.Toplevel):
                 }
             }
         }
+        # Layered presets reuse the Default settings with a different set of shapes
+        presets = config["presets"]
+        presets["T-Style"] = dict(presets["Default"], layers=[{"type": "t"}])
+        presets["Dot & Ring"] = dict(presets["Default"], layers=[
+            {"type": "dot", "size": 3},
+            {"type": "circle", "radius": 12, "thickness": 1, "spread": 0.5}
+        ])
+        return config
 
     def _setup_variables(self):
         """Sets up Tkinter variables to hold configuration values."""
@@ -167,10 +212,14 @@ class CustomizationMenu(tk.Toplevel):
         self.show_outline_var = tk.BooleanVar(value=self.config["show_outline"])
         self.movement_spread_enabled_var = tk.BooleanVar(value=self.config["movement_spread_enabled"])
         self.movement_spread_amount_var = tk.IntVar(value=self.config["movement_spread_amount"])
+        self.mouse_spread_enabled_var = tk.BooleanVar(value=self.config.get("mouse_spread_enabled", False))
+        self.mouse_spread_amount_var = tk.IntVar(value=self.config.get("mouse_spread_amount", 6))
         self.movement_spread_speed_var = tk.IntVar(value=self.config["movement_spread_speed"])
         self.counter_strafe_enabled_var = tk.BooleanVar(value=self.config["counter_strafe_enabled"])
         self.counter_strafe_reduction_speed_var = tk.IntVar(value=self.config["counter_strafe_reduction_speed"])
         self.counter_strafe_min_spread_var = tk.IntVar(value=self.config["counter_strafe_min_spread"])
+        self.counter_strafe_window_ms_var = tk.IntVar(value=self.config.get("counter_strafe_window_ms", 100))
+        self.counter_strafe_perfect_ms_var = tk.IntVar(value=self.config.get("counter_strafe_perfect_ms", 10))
         self.click_spread_enabled_var = tk.BooleanVar(value=self.config["click_spread_enabled"])
         self.click_spread_amount_var = tk.IntVar(value=self.config["click_spread_amount"])
         self.click_spread_speed_var = tk.IntVar(value=self.config["click_spread_speed"])
@@ -184,6 +233,7 @@ class CustomizationMenu(tk.Toplevel):
         self.jitter_speed_var = tk.DoubleVar(value=self.config.get("jitter_speed", 0.1))
         self.jitter_offset_var = tk.IntVar(value=self.config.get("jitter_offset", 1))
         self.jitter_mode_var = tk.StringVar(value=self.config.get("jitter_mode", "random"))
+        self.jitter_seed_var = tk.IntVar(value=self.config.get("jitter_seed", 0))
         self.current_preset_var = tk.StringVar(value=self.config.get("current_preset", "Default"))
         self.clickthrough_enabled_var = tk.BooleanVar(value=self.config.get("clickthrough_enabled", True))
         self.dynamic_length_enabled_var = tk.BooleanVar(value=self.config.get("dynamic_length_enabled", True))
@@ -262,6 +312,10 @@ class CustomizationMenu(tk.Toplevel):
         create_spinbox(parent, "Spread Amount:", self.movement_spread_amount_var, from_=0, to_=50)
         create_spinbox(parent, "Spread Speed:", self.movement_spread_speed_var, from_=0.1, to_=10, increment=0.1)
 
+        ttk.Checkbutton(parent, text="Enable Mouse Speed Spread", variable=self.mouse_spread_enabled_var,
+                        command=self._update_and_save_config).pack(anchor=tk.W, pady=2, fill=tk.X)
+        create_spinbox(parent, "Mouse Spread Amount:", self.mouse_spread_amount_var, from_=0, to_=50)
+
     def _create_counter_strafe_tab(self, parent):
         """Create counter-strafe settings tab."""
         ttk.Checkbutton(parent, text="Enable Counter-Strafe", variable=self.counter_strafe_enabled_var,
@@ -278,6 +332,8 @@ class CustomizationMenu(tk.Toplevel):
             return spinbox
 
         create_spinbox(parent, "Min Spread:", self.counter_strafe_min_spread_var, from_=0, to_=10)
+        create_spinbox(parent, "Timing Window (ms):", self.counter_strafe_window_ms_var, from_=10, to_=500, increment=5)
+        create_spinbox(parent, "Perfect Timing (ms):", self.counter_strafe_perfect_ms_var, from_=0, to_=100)
 
     def _create_click_spread_tab(self, parent):
         """Create click spread settings tab."""
@@ -339,6 +395,7 @@ class CustomizationMenu(tk.Toplevel):
 
         create_jitter_spinbox(parent, "Jitter Amount (pixels):", self.jitter_amount_var, from_=0, to_=20)
         create_jitter_spinbox(parent, "Jitter Offset:", self.jitter_offset_var, from_=0, to_=10)
+        create_jitter_spinbox(parent, "Jitter Seed:", self.jitter_seed_var, from_=0, to_=9999)
         
         # Jitter mode dropdown
         mode_frame = ttk.Frame(parent)
@@ -351,12 +408,22 @@ class CustomizationMenu(tk.Toplevel):
 
     def _create_presets_tab(self, parent):
         """Create presets management tab."""
+        # Preset search (matches names and tags)
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(pady=5)
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+        self.preset_search_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.preset_search_var).pack(side=tk.RIGHT)
+        self.preset_search_var.trace_add('write', lambda *args: self._filter_presets())
+
         # Preset selection
         ttk.Label(parent, text="Select Preset:").pack(pady=5)
         self.preset_combobox = ttk.Combobox(parent, textvariable=self.current_preset_var, 
-                                            values=list(self.config["presets"].keys()))
+                                            values=self.preset_store.names())
         self.preset_combobox.pack(pady=5)
         self.preset_combobox.bind("<<ComboboxSelected>>", lambda e: self._apply_preset())
+        self.preset_tags_label = ttk.Label(parent, text="")
+        self.preset_tags_label.pack(pady=5)
         
         # Save preset button
         ttk.Button(parent, text="Save Current as Preset", command=self._save_preset).pack(pady=5)
@@ -385,6 +452,207 @@ class CustomizationMenu(tk.Toplevel):
         create_spinbox(parent, "Recoil Speed:", self.recoil_speed_var, from_=0.01, to_=5, increment=0.01)
         create_spinbox(parent, "Recoil Recovery Speed:", self.recoil_recovery_speed_var, from_=0.01, to_=5, increment=0.01)
 
+    CURVE_WIDTH = 420
+    CURVE_HEIGHT = 220
+    CURVE_MARGIN = 30
+    CURVE_MAX_MS = 1000 # Time shown by the curve editor
+    CURVE_MAX_PX = 30 # Extra spread shown by the curve editor
+
+    def _create_curves_tab(self, parent):
+        """Create the spread curve editor (extra spread over time after each kind of event)."""
+        top_frame = ttk.Frame(parent)
+        top_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(top_frame, text="Event:").pack(side=tk.LEFT)
+        self.curve_event_var = tk.StringVar(value=CURVE_EVENTS[0])
+        event_dropdown = ttk.Combobox(top_frame, textvariable=self.curve_event_var, values=CURVE_EVENTS,
+                                      state="readonly")
+        event_dropdown.pack(side=tk.LEFT, padx=5)
+        event_dropdown.bind("<<ComboboxSelected>>", lambda e: self._draw_curve())
+        ttk.Button(top_frame, text="Clear", command=self._clear_curve).pack(side=tk.RIGHT)
+
+        self.curve_canvas = tk.Canvas(parent, width=self.CURVE_WIDTH, height=self.CURVE_HEIGHT,
+                                      bg='#2e2e2e', highlightthickness=0)
+        self.curve_canvas.pack(pady=5)
+        self.curve_canvas.bind("<Button-1>", self._curve_press)
+        self.curve_canvas.bind("<B1-Motion>", self._curve_drag)
+        self.curve_canvas.bind("<ButtonRelease-1>", lambda e: self._curve_release())
+        self.curve_canvas.bind("<Button-3>", self._curve_delete)
+        ttk.Label(parent, text="Click to add a keyframe, drag to move it, right-click to delete it.").pack(pady=5)
+        self._curve_point = None # Keyframe being dragged
+
+    def _curve_keyframes(self):
+        """Returns the keyframe list of the selected event's curve."""
+        return self.config.setdefault("spread_curves", {}).setdefault(self.curve_event_var.get(), [])
+
+    def _curve_to_canvas(self, t_ms, spread):
+        m = self.CURVE_MARGIN
+        x = m + t_ms / self.CURVE_MAX_MS * (self.CURVE_WIDTH - 2 * m)
+        y = self.CURVE_HEIGHT - m - spread / self.CURVE_MAX_PX * (self.CURVE_HEIGHT - 2 * m)
+        return x, y
+
+    def _canvas_to_curve(self, x, y):
+        m = self.CURVE_MARGIN
+        t_ms = (x - m) / (self.CURVE_WIDTH - 2 * m) * self.CURVE_MAX_MS
+        spread = (self.CURVE_HEIGHT - m - y) / (self.CURVE_HEIGHT - 2 * m) * self.CURVE_MAX_PX
+        return (int(min(max(t_ms, 0), self.CURVE_MAX_MS)),
+                round(min(max(spread, 0), self.CURVE_MAX_PX), 1))
+
+    def _curve_point_at(self, x, y):
+        """Returns the keyframe drawn within a few pixels of (x, y), or None."""
+        for point in self.config.get("spread_curves", {}).get(self.curve_event_var.get(), []):
+            px, py = self._curve_to_canvas(*point)
+            if abs(px - x) <= 6 and abs(py - y) <= 6:
+                return point
+        return None
+
+    def _curve_press(self, event):
+        """Starts dragging the keyframe under the pointer, adding one if there is none."""
+        point = self._curve_point_at(event.x, event.y)
+        if point is None:
+            point = list(self._canvas_to_curve(event.x, event.y))
+            keyframes = self._curve_keyframes()
+            keyframes.append(point)
+            keyframes.sort()
+        self._curve_point = point
+        self._draw_curve()
+
+    def _curve_drag(self, event):
+        if self._curve_point is None:
+            return
+        self._curve_point[:] = self._canvas_to_curve(event.x, event.y)
+        self._curve_keyframes().sort()
+        self._draw_curve()
+
+    def _curve_release(self):
+        if self._curve_point is not None:
+            self._curve_point = None
+            self._save_curves()
+
+    def _curve_delete(self, event):
+        point = self._curve_point_at(event.x, event.y)
+        if point is not None:
+            self._curve_keyframes().remove(point)
+            self._save_curves()
+
+    def _clear_curve(self):
+        self.config.get("spread_curves", {}).pop(self.curve_event_var.get(), None)
+        self._save_curves()
+
+    def _save_curves(self):
+        """Drops empty curves and saves the config, which recompiles the curves in the overlay."""
+        curves = {event: keyframes for event, keyframes in self.config.get("spread_curves", {}).items() if keyframes}
+        if curves:
+            self.config["spread_curves"] = curves
+        else:
+            self.config.pop("spread_curves", None)
+        self._draw_curve()
+        self._update_and_save_config()
+
+    def _draw_curve(self):
+        """Redraws the selected curve, sampled through the same lookup table the overlay uses."""
+        canvas = self.curve_canvas
+        canvas.delete("all")
+        m = self.CURVE_MARGIN
+        left, bottom = self._curve_to_canvas(0, 0)
+        right, top = self._curve_to_canvas(self.CURVE_MAX_MS, self.CURVE_MAX_PX)
+        canvas.create_line(left, top, left, bottom, right, bottom, fill='#808080')
+        canvas.create_text(left, bottom + m / 2, text="0", fill='white')
+        canvas.create_text(right, bottom + m / 2, text=f"{self.CURVE_MAX_MS} ms", fill='white', anchor=tk.E)
+        canvas.create_text(left - 4, top, text=f"{self.CURVE_MAX_PX}px", fill='white', anchor=tk.E)
+        keyframes = self.config.get("spread_curves", {}).get(self.curve_event_var.get())
+        if not keyframes:
+            return
+        curve = SpreadCurve(keyframes)
+        coords = []
+        for x in range(int(left), int(right) + 1, 2):
+            t_ms = self._canvas_to_curve(x, 0)[0]
+            coords.extend(self._curve_to_canvas(t_ms, min(curve.evaluate(t_ms), self.CURVE_MAX_PX)))
+        canvas.create_line(*coords, fill='#00ff00', width=2)
+        for point in keyframes:
+            x, y = self._curve_to_canvas(*point)
+            canvas.create_oval(x - 4, y - 4, x + 4, y + 4, fill='white', outline='')
+
+    def _create_stats_tab(self, parent):
+        """Create the session statistics tab (counter-strafe timing, settling and shots)."""
+        ttk.Label(parent, text="This session:").pack(anchor=tk.W, pady=5)
+        self.current_session_label = ttk.Label(parent, text="", justify=tk.LEFT)
+        self.current_session_label.pack(anchor=tk.W, padx=10)
+
+        ttk.Label(parent, text="Past sessions:").pack(anchor=tk.W, pady=5)
+        columns = ("session", "length", "strafes", "perfect", "gap", "settle", "moving")
+        headings = ("Session", "Length", "Counter-strafes", "Perfect", "Gap p50/p90", "Settle p50", "Moving shots")
+        self.session_tree = ttk.Treeview(parent, columns=columns, show="headings", height=8)
+        for column, heading in zip(columns, headings):
+            self.session_tree.heading(column, text=heading)
+            self.session_tree.column(column, width=95, anchor=tk.CENTER)
+        self.session_tree.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(parent, text="Overlay threads:").pack(anchor=tk.W, pady=5)
+        columns = ("thread", "cpu", "cpu_time", "wakeups", "preemptions")
+        headings = ("Thread", "CPU", "CPU time", "Wakeups/s", "Preempted/s")
+        self.thread_tree = ttk.Treeview(parent, columns=columns, show="headings", height=6)
+        for column, heading in zip(columns, headings):
+            self.thread_tree.heading(column, text=heading)
+            self.thread_tree.column(column, width=95, anchor=tk.CENTER)
+        self.thread_tree.column("thread", width=160, anchor=tk.W)
+        self.thread_tree.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Button(parent, text="Refresh", command=self._refresh_stats).pack(pady=5)
+        self._refresh_stats()
+
+    def _refresh_stats(self):
+        self._refresh_session_stats()
+        self._refresh_thread_stats()
+
+    def _refresh_thread_stats(self):
+        """Shows the overlay's latest per-thread CPU and wakeup sample (see thread_accounting.py)."""
+        self.thread_tree.delete(*self.thread_tree.get_children())
+        rows = self.overlay_instance.get_thread_stats()
+        if rows is None:
+            self.thread_tree.insert("", tk.END, values=("Thread accounting is disabled.", "", "", "", ""))
+            return
+        unknown = lambda value: "-" if value is None else value # Not reported on this platform
+        for row in rows:
+            self.thread_tree.insert("", tk.END, values=(
+                row["thread"], f"{row['cpu_pct']}%", f"{row['cpu_s']} s",
+                unknown(row["wakeups_per_s"]), unknown(row["preemptions_per_s"])))
+
+    @staticmethod
+    def _session_row(label, summary):
+        """Formats a session summary (see session_stats.py) as a table row."""
+        strafes = summary["counter_strafes"]
+        return (label,
+                f"{summary['duration_s'] // 60}m {summary['duration_s'] % 60}s",
+                strafes,
+                f"{summary['perfect_strafes'] / strafes:.0%}" if strafes else "-",
+                f"{summary['gap_p50_ms']} / {summary['gap_p90_ms']} ms" if strafes else "-",
+                f"{summary['settle_p50_ms']} ms",
+                f"{summary['moving_shot_ratio']:.0%} of {summary['shots']}")
+
+    def _refresh_session_stats(self):
+        """Shows the live session, and reads the session log in the background."""
+        stats = self.overlay_instance.session_stats
+        if stats is None:
+            self.current_session_label.config(text="Session statistics are disabled.")
+        else:
+            row = self._session_row("", stats.summary())
+            self.current_session_label.config(
+                text=f"{row[2]} counter-strafes ({row[3]} perfect), gap {row[4]}, settle {row[5]}, "
+                     f"moving shots {row[6]}")
+        self.overlay_instance.load_session_log(self._show_session_log)
+
+    def _show_session_log(self, result):
+        """Fills the session table from read_session_log()'s (summaries, overall)."""
+        if not self.winfo_exists():
+            return # The menu was closed while the log was being read
+        summaries, overall = result
+        self.session_tree.delete(*self.session_tree.get_children())
+        if overall is not None:
+            self.session_tree.insert("", tk.END, values=self._session_row("All sessions", overall))
+        for summary in summaries:
+            label = time.strftime("%Y-%m-%d %H:%M", time.localtime(summary["started"]))
+            self.session_tree.insert("", tk.END, values=self._session_row(label, summary))
+
     def _create_widgets(self):
         """Creates and lays out the widgets in the menu with tabs."""
         main_frame = ttk.Frame(self, padding="10")
@@ -404,6 +672,8 @@ class CustomizationMenu(tk.Toplevel):
         recoil_tab = ttk.Frame(self.notebook)
         presets_tab = ttk.Frame(self.notebook)
         settings_tab = ttk.Frame(self.notebook)  # New settings tab
+        curves_tab = ttk.Frame(self.notebook)
+        stats_tab = ttk.Frame(self.notebook)
         
         self.notebook.add(crosshair_tab, text="Crosshair")
         self.notebook.add(movement_tab, text="Movement Spread")
@@ -412,8 +682,10 @@ class CustomizationMenu(tk.Toplevel):
         #self.notebook.add(crouch_spread_tab, text="Crouch Spread")
         self.notebook.add(jitter_tab, text="Jitter")
         self.notebook.add(recoil_tab, text="Recoil")
+        self.notebook.add(curves_tab, text="Curves")
         self.notebook.add(presets_tab, text="Presets")
         self.notebook.add(settings_tab, text="Settings")  # Add settings tab
+        self.notebook.add(stats_tab, text="Stats")
         
         # Crosshair tab
         self._create_crosshair_tab(crosshair_tab)
@@ -435,25 +707,43 @@ class CustomizationMenu(tk.Toplevel):
         
         # Recoil tab
         self._create_recoil_tab(recoil_tab)
+
+        # Spread curves tab
+        self._create_curves_tab(curves_tab)
         
         # Presets tab
         self._create_presets_tab(presets_tab)
         
         # Settings tab
         self._create_settings_tab(settings_tab)
+
+        # Stats tab
+        self._create_stats_tab(stats_tab)
     
         # Bottom buttons
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="Undo", command=self._undo).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Redo", command=self._redo).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Close Menu", command=self._on_close).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Close App", command=self._close_app).pack(side=tk.RIGHT, padx=5)
+        self.bind("<Control-z>", lambda e: self._undo())
+        self.bind("<Control-y>", lambda e: self._redo())
+
+    def _filter_presets(self):
+        """Updates the preset dropdown with presets matching the search text."""
+        self.preset_combobox["values"] = self.preset_store.search(self.preset_search_var.get())
 
     def _apply_preset(self):
         """Apply selected preset to current configuration."""
         preset_name = self.current_preset_var.get()
-        if preset_name in self.config["presets"]:
-            preset = self.config["presets"][preset_name]
-            # Update all variables from the preset
+        preset = self.preset_store.get(preset_name) # Loaded on demand
+        if preset is not None:
+            self.config["current_preset"] = preset_name
+            tags = self.preset_store.get_tags(preset_name)
+            self.preset_tags_label.config(text=f"Tags: {', '.join(tags)}" if tags else "")
+            # Update all variables from the preset, then save once
+            self._suspend_updates = True
             self.crosshair_color_var.set(self._rgb_to_hex(preset["crosshair_color"][:3]))
             self.outline_color_var.set(self._rgb_to_hex(preset["outline_color"][:3]))
             self.line_thickness_var.set(preset["line_thickness"])
@@ -463,10 +753,14 @@ class CustomizationMenu(tk.Toplevel):
             self.show_outline_var.set(preset["show_outline"])
             self.movement_spread_enabled_var.set(preset["movement_spread_enabled"])
             self.movement_spread_amount_var.set(preset["movement_spread_amount"])
+            self.mouse_spread_enabled_var.set(preset.get("mouse_spread_enabled", False))
+            self.mouse_spread_amount_var.set(preset.get("mouse_spread_amount", 6))
             self.movement_spread_speed_var.set(preset["movement_spread_speed"])
             self.counter_strafe_enabled_var.set(preset["counter_strafe_enabled"])
             self.counter_strafe_reduction_speed_var.set(preset["counter_strafe_reduction_speed"])
             self.counter_strafe_min_spread_var.set(preset["counter_strafe_min_spread"])
+            self.counter_strafe_window_ms_var.set(preset.get("counter_strafe_window_ms", 100))
+            self.counter_strafe_perfect_ms_var.set(preset.get("counter_strafe_perfect_ms", 10))
             self.click_spread_enabled_var.set(preset["click_spread_enabled"])
             self.click_spread_amount_var.set(preset["click_spread_amount"])
             self.click_spread_speed_var.set(preset["click_spread_speed"])
@@ -479,9 +773,20 @@ class CustomizationMenu(tk.Toplevel):
             self.jitter_speed_var.set(preset["jitter_speed"])
             self.jitter_offset_var.set(preset["jitter_offset"])
             self.jitter_mode_var.set(preset["jitter_mode"])
+            self.jitter_seed_var.set(preset.get("jitter_seed", 0))
             self.clickthrough_enabled_var.set(preset["clickthrough_enabled"])
             self.dynamic_length_enabled_var.set(preset["dynamic_length_enabled"])
             self.lerp_speed_var.set(preset["lerp_speed"])
+            if "layers" in preset:
+                self.config["layers"] = copy.deepcopy(preset["layers"])
+            else:
+                self.config.pop("layers", None) # Classic cross
+            if "spread_curves" in preset:
+                self.config["spread_curves"] = copy.deepcopy(preset["spread_curves"])
+            else:
+                self.config.pop("spread_curves", None)
+            self._draw_curve()
+            self._suspend_updates = False
             
             self._update_color_previews()
             self._update_and_save_config()
@@ -490,6 +795,7 @@ class CustomizationMenu(tk.Toplevel):
         """Save current configuration as a new preset."""
         name = simpledialog.askstring("Save Preset", "Enter a name for this preset:")
         if name and name.strip() != "":
+            tags = simpledialog.askstring("Save Preset", "Tags (comma separated, optional):") or ""
             # Collect current settings from variables
             current_config = {
                 "crosshair_color": list(self._hex_to_rgb(self.crosshair_color_var.get())) + [self.config["crosshair_color"][3]],
@@ -501,10 +807,14 @@ class CustomizationMenu(tk.Toplevel):
                 "show_outline": self.show_outline_var.get(),
                 "movement_spread_enabled": self.movement_spread_enabled_var.get(),
                 "movement_spread_amount": self.movement_spread_amount_var.get(),
+                "mouse_spread_enabled": self.mouse_spread_enabled_var.get(),
+                "mouse_spread_amount": self.mouse_spread_amount_var.get(),
                 "movement_spread_speed": self.movement_spread_speed_var.get(),
                 "counter_strafe_enabled": self.counter_strafe_enabled_var.get(),
                 "counter_strafe_reduction_speed": self.counter_strafe_reduction_speed_var.get(),
                 "counter_strafe_min_spread": self.counter_strafe_min_spread_var.get(),
+                "counter_strafe_window_ms": self.counter_strafe_window_ms_var.get(),
+                "counter_strafe_perfect_ms": self.counter_strafe_perfect_ms_var.get(),
                 "click_spread_enabled": self.click_spread_enabled_var.get(),
                 "click_spread_amount": self.click_spread_amount_var.get(),
                 "click_spread_speed": self.click_spread_speed_var.get(),
@@ -517,29 +827,35 @@ class CustomizationMenu(tk.Toplevel):
                 "jitter_speed": self.jitter_speed_var.get(),
                 "jitter_offset": self.jitter_offset_var.get(),
                 "jitter_mode": self.jitter_mode_var.get(),
+                "jitter_seed": self.jitter_seed_var.get(),
                 "clickthrough_enabled": self.clickthrough_enabled_var.get(),
                 "dynamic_length_enabled": self.dynamic_length_enabled_var.get(),
                 "lerp_speed": self.lerp_speed_var.get()
             }
             
-            # Save to presets
-            self.config["presets"][name] = current_config
+            if "layers" in self.config:
+                current_config["layers"] = copy.deepcopy(self.config["layers"])
+            if self.config.get("spread_curves"):
+                current_config["spread_curves"] = copy.deepcopy(self.config["spread_curves"])
+
+            # Save only this preset to the preset store
+            self.overlay_instance.save_preset(name, current_config, tags)
             self.config["current_preset"] = name
             
             # Update UI
             self.current_preset_var.set(name)
-            self.preset_combobox["values"] = list(self.config["presets"].keys())
+            values = list(self.preset_combobox["values"])
+            if name not in values:
+                self.preset_combobox["values"] = sorted(values + [name], key=str.lower)
             
-            # Save to file
-            with open(self.config_path, "w") as f:
-                json.dump(self.config, f, indent=4)
-                
-            self.overlay_instance.load_config()
+            # Apply and save to file in the background
+            self.overlay_instance.save_config(self.config)
             self.overlay_instance._apply_clickthrough_setting()  # Apply clickthrough setting
             self.overlay_instance.draw_crosshair()
 
     def _update_widgets_from_config(self):
         """Updates the widget values based on the current config."""
+        self._suspend_updates = True
         self.crosshair_color_var.set(self._rgb_to_hex(self.config["crosshair_color"][:3]))
         self.outline_color_var.set(self._rgb_to_hex(self.config["outline_color"][:3]))
         self.line_thickness_var.set(self.config["line_thickness"])
@@ -549,10 +865,14 @@ class CustomizationMenu(tk.Toplevel):
         self.show_outline_var.set(self.config["show_outline"])
         self.movement_spread_enabled_var.set(self.config["movement_spread_enabled"])
         self.movement_spread_amount_var.set(self.config["movement_spread_amount"])
+        self.mouse_spread_enabled_var.set(self.config.get("mouse_spread_enabled", False))
+        self.mouse_spread_amount_var.set(self.config.get("mouse_spread_amount", 6))
         self.movement_spread_speed_var.set(self.config["movement_spread_speed"])
         self.counter_strafe_enabled_var.set(self.config["counter_strafe_enabled"])
         self.counter_strafe_reduction_speed_var.set(self.config["counter_strafe_reduction_speed"])
         self.counter_strafe_min_spread_var.set(self.config["counter_strafe_min_spread"])
+        self.counter_strafe_window_ms_var.set(self.config.get("counter_strafe_window_ms", 100))
+        self.counter_strafe_perfect_ms_var.set(self.config.get("counter_strafe_perfect_ms", 10))
         self.click_spread_enabled_var.set(self.config["click_spread_enabled"])
         self.click_spread_amount_var.set(self.config["click_spread_amount"])
         self.click_spread_speed_var.set(self.config["click_spread_speed"])
@@ -565,12 +885,15 @@ class CustomizationMenu(tk.Toplevel):
         self.jitter_speed_var.set(self.config.get("jitter_speed", 0.1))
         self.jitter_offset_var.set(self.config.get("jitter_offset", 1))
         self.jitter_mode_var.set(self.config.get("jitter_mode", "random"))
+        self.jitter_seed_var.set(self.config.get("jitter_seed", 0))
         self.current_preset_var.set(self.config.get("current_preset", "Default"))
         self.clickthrough_enabled_var.set(self.config.get("clickthrough_enabled", True))
         self.dynamic_length_enabled_var.set(self.config.get("dynamic_length_enabled", True))
         self.lerp_speed_var.set(self.config.get("lerp_speed", 0.2))
+        self._suspend_updates = False
         
         self._update_color_previews()
+        self._draw_curve()
 
     def _update_color_previews(self):
         """Updates the color preview labels."""
@@ -600,6 +923,8 @@ class CustomizationMenu(tk.Toplevel):
 
     def _update_and_save_config(self, *args):
         """Updates config dictionary from Tkinter variables, saves to file, and tells overlay to update."""
+        if self._suspend_updates:
+            return
         # Ensure integer values from spinboxes are correctly parsed
         try:
             self.config["line_thickness"] = self.line_thickness_var.get()
@@ -608,20 +933,25 @@ class CustomizationMenu(tk.Toplevel):
             self.config["length"] = self.spread_var.get() # This still maps to 'length' in config
             # Movement Spread values
             self.config["movement_spread_amount"] = self.movement_spread_amount_var.get()
+            self.config["mouse_spread_amount"] = self.mouse_spread_amount_var.get()
             self.config["movement_spread_speed"] = self.movement_spread_speed_var.get()
             # Counter-strafe values
             self.config["counter_strafe_reduction_speed"] = self.counter_strafe_reduction_speed_var.get()
             self.config["counter_strafe_min_spread"] = self.counter_strafe_min_spread_var.get()
+            self.config["counter_strafe_window_ms"] = self.counter_strafe_window_ms_var.get()
+            self.config["counter_strafe_perfect_ms"] = self.counter_strafe_perfect_ms_var.get()
             # Click Spread values
             self.config["click_spread_amount"] = self.click_spread_amount_var.get()
             self.config["click_spread_speed"] = self.click_spread_speed_var.get()
+            # Jitter seed
+            self.config["jitter_seed"] = self.jitter_seed_var.get()
             # Remove crouch spread values as per user request
             # self.config["crouch_spread_enabled"] = self.crouch_spread_enabled_var.get()
             # self.config["crouch_spread_amount"] = self.crouch_spread_amount_var.get()
             # self.config["crouch_spread_speed"] = self.crouch_spread_speed_var.get()
         except tk.TclError:
             # This can happen if the spinbox content is not a valid integer (e.g., empty string)
-            print("Invalid numeric input detected. Skipping update.")
+            logger.warning("Invalid numeric input detected. Skipping update.")
             return
 
         # Update color values (already handled by _pick_color, but ensure consistency)
@@ -638,6 +968,7 @@ class CustomizationMenu(tk.Toplevel):
         self.config["show_outline"] = self.show_outline_var.get()
         # Movement Spread boolean
         self.config["movement_spread_enabled"] = self.movement_spread_enabled_var.get()
+        self.config["mouse_spread_enabled"] = self.mouse_spread_enabled_var.get()
         # Counter-strafe boolean
         self.config["counter_strafe_enabled"] = self.counter_strafe_enabled_var.get()
         # Click Spread boolean and button
@@ -657,15 +988,26 @@ class CustomizationMenu(tk.Toplevel):
         self.config["dynamic_length_enabled"] = self.dynamic_length_enabled_var.get()
         self.config["lerp_speed"] = self.lerp_speed_var.get()
 
-        # Save to file
-        with open(self.config_path, "w") as f:
-            json.dump(self.config, f, indent=4)
-        
-        # Tell the overlay instance to reload its config and redraw
-        self.overlay_instance.load_config() # This will now call rebind_keys internally
+        # Tell the overlay instance to apply the config and save it to file in the background
+        self.overlay_instance.save_config(self.config)
         self.overlay_instance._apply_clickthrough_setting()  # Apply clickthrough setting
         self.overlay_instance.draw_crosshair() # Force redraw immediately
 
+    def _undo(self):
+        """Reverts the last configuration change and refreshes the widgets."""
+        if self.overlay_instance.undo_config():
+            self._reload_from_overlay()
+
+    def _redo(self):
+        """Re-applies the last undone configuration change and refreshes the widgets."""
+        if self.overlay_instance.redo_config():
+            self._reload_from_overlay()
+
+    def _reload_from_overlay(self):
+        """Copies the overlay's config back into the menu without saving it again."""
+        self.config = copy.deepcopy(self.overlay_instance.config)
+        self._update_widgets_from_config()
+
     def _on_close(self):
         """Handles the menu closing event."""
         self.overlay_instance.menu_open = False # Inform the overlay that the menu is closed
@@ -708,6 +1050,8 @@ if __name__ == "__main__":
             self.clickthrough_enabled = True
             self.dynamic_length_enabled = True
             self.lerp_speed = 0.2
+            self.preset_store = PresetStore(defaults=CustomizationMenu.default_presets())
+            self.session_stats = None
             print("DummyOverlay initialized.")
 
         def load_config(self):
@@ -735,6 +1079,29 @@ if __name__ == "__main__":
             print(f"  Lerp Speed: {self.lerp_speed}")
             self.rebind_keys() # Call rebind_keys on dummy too
 
+        def save_config(self, config):
+            print("DummyOverlay: Config saved.")
+            self.load_config()
+
+        def save_preset(self, name, preset, tags=None):
+            self.preset_store.put(name, preset, tags)
+            print(f"DummyOverlay: Preset '{name}' saved.")
+
+        def load_session_log(self, callback):
+            callback(([], None))
+
+        def get_thread_stats(self):
+            return [{"thread": "MainThread", "cpu_pct": 1.5, "cpu_s": 0.4, "wakeups_per_s": 62.0,
+                     "preemptions_per_s": 0.5}]
+
+        def undo_config(self):
+            print("DummyOverlay: Nothing to undo.")
+            return False
+
+        def redo_config(self):
+            print("DummyOverlay: Nothing to redo.")
+            return False
+
         def draw_crosshair(self):
             print("DummyOverlay: Crosshair redrawn.")
 
@@ -0,0 +1,100 @@
+import sys
+import tracemalloc
+
+class FrameState:
+    """Per-frame crosshair state in fixed slots, so the frame loop never grows an instance dict.
+
+    The geometry itself lives in the scene layers (see scene.py), which rewrite their
+    coordinate lists in place and skip frames where they don't move.
+    """
+
+    __slots__ = (
+        'current_gap', 'current_length', 'current_spread_offset', 'target_spread_offset',
+        'recoil_offset', 'target_recoil_offset', 'jitter_x', 'jitter_y', 'spread_settled',
+        'visible'
+    )
+
+    def __init__(self):
+        self.current_gap = 0
+        self.current_length = 0
+        self.current_spread_offset = 0
+        self.target_spread_offset = 0
+        self.recoil_offset = 0
+        self.target_recoil_offset = 0
+        self.jitter_x = 0
+        self.jitter_y = 0
+        self.spread_settled = True # True once spread and recoil have exactly reached their targets
+        self.visible = False # Whether the canvas items are currently shown
+
+def measure_frame_allocations(step, frames=10000, warmup=200):
+    """Runs step() repeatedly under tracemalloc and returns (net bytes per frame, peak bytes).
+
+    Net growth shows memory retained per frame; the peak shows the largest transient allocation.
+    """
+    for _ in range(warmup):
+        step()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        for _ in range(frames):
+            step()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (after - before) / frames, peak - before
+
+# Allocation budget check for the Tk-free part of the frame: CrosshairModel.advance() and
+# the scene update draw_crosshair() runs (run `python frame_state.py`)
+if __name__ == "__main__":
+    import copy
+    from crosshair_model import CrosshairModel, CROSSHAIR_DEFAULTS
+    from scene import Scene
+
+    NET_BYTES_PER_FRAME_BUDGET = 1.0
+    PEAK_BYTES_BUDGET = 4096
+
+    config = copy.deepcopy(CROSSHAIR_DEFAULTS)
+    config.update({
+        "movement_spread_enabled": True,
+        "mouse_spread_enabled": True,
+        "click_spread_enabled": True,
+        "crouch_spread_enabled": True,
+        "layers": [{"type": "cross"}, {"type": "dot"}, {"type": "circle"}],
+        "spread_curves": {"shot": [[0, 4], [80, 6], [300, 0]], "move_stop": [[0, 2], [150, 0]]}
+    })
+    model = CrosshairModel()
+    model.apply_crosshair_config(config)
+    scene = Scene(model.layers, model.scene_defaults(), with_rects=True)
+    frame = model.frame
+    clock = [0.0]
+    FRAME_S = 0.016
+
+    def step():
+        clock[0] += FRAME_S
+        now = clock[0]
+        # Strafe, counter-strafe, shoot and crouch on a cycle so nothing ever settles
+        phase = int(now * 4) % 8
+        if phase != int((now - FRAME_S) * 4) % 8:
+            t_ns = int(now * 1_000_000_000)
+            if phase == 0:
+                model.press_action("moveleft", t_ns)
+            elif phase == 2:
+                model.release_action("moveleft", t_ns)
+                model.press_action("moveright", t_ns)
+            elif phase == 4:
+                model.release_action("moveright", t_ns)
+                model.set_mouse_button("left", True, now)
+            elif phase == 5:
+                model.set_mouse_button("left", False, now)
+                model.press_action("crouch", t_ns)
+            elif phase == 6:
+                model.release_action("crouch", t_ns)
+        model.advance(now, 1500.0 if phase < 4 else 0.0)
+        scene.update(960, 540, frame.recoil_offset, int(frame.jitter_x), int(frame.jitter_y),
+                     frame.current_spread_offset)
+
+    net, peak = measure_frame_allocations(step)
+    print(f"Net allocation per frame: {net:.3f} bytes (budget {NET_BYTES_PER_FRAME_BUDGET})")
+    print(f"Peak transient allocation: {peak} bytes (budget {PEAK_BYTES_BUDGET})")
+    sys.exit(0 if net <= NET_BYTES_PER_FRAME_BUDGET and peak <= PEAK_BYTES_BUDGET else 1)
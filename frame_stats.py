@@ -0,0 +1,48 @@
+import bisect
+
+class FrameTimeHistogram:
+    """Fixed-bucket histogram of durations in milliseconds. Memory use is constant."""
+
+    BOUNDS_MS = (0.5, 1, 2, 4, 8, 12, 16, 17, 20, 25, 33, 50, 100, 250, 1000)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Clears all recorded samples."""
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        """Records one duration in milliseconds."""
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, fraction):
+        """Returns the upper bound of the bucket holding the given fraction (0-1) of samples."""
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        running = 0
+        for i, bucket_count in enumerate(self.counts):
+            running += bucket_count
+            if running >= threshold:
+                return self.BOUNDS_MS[i] if i < len(self.BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self):
+        """Returns a JSON-serialisable summary of the histogram."""
+        labels = [f"<={bound}" for bound in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "histogram": {label: count for label, count in zip(labels, self.counts) if count}
+        }
@@ -0,0 +1,258 @@
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from frame_stats import FrameTimeHistogram
+from key_bindings import key_code
+
+# Fixed little-endian layout of the event ring file.
+# Header: magic, layout version, slot count, events written so far (the writer's head)
+HEADER = struct.Struct('<4sHHQ')
+# Slot: sequence (index + 1, written last), timestamp (perf_counter_ns), kind,
+# a (float: bucket distance), b (int: key code or bucket duration in ns), name (button, or a key without a code)
+EVENT = struct.Struct('<QqB7xdq24s')
+MAGIC = b'CHIR'
+VERSION = 1
+HEAD_OFFSET = 8
+SLEEP_OFFSET = 16 # One byte, set by the reader while its frame loop is suspended
+SLOTS_OFFSET = 64
+
+# Event kinds
+KEY_DOWN = 0
+KEY_UP = 1
+BUTTON_DOWN = 2
+BUTTON_UP = 3
+MOVE_BUCKET = 4 # A closed MouseTracker bucket: a = distance (px), b = duration (ns)
+
+def default_ring_path():
+    """Returns the default location of the event ring file (RAM-backed where available)."""
+    if sys.platform.startswith("linux") and os.path.isdir("/dev/shm"):
+        return f"/dev/shm/crosshair_input_{os.getpid()}"
+    return os.path.join(tempfile.gettempdir(), f"crosshair_input_{os.getpid()}.bin")
+
+class EventRing:
+    """Single-producer, single-consumer ring of timestamped input events in a memory-mapped file.
+
+    The writer (the capture process) fills a slot, stamps it with its sequence number, then
+    advances the head. The reader (the overlay's Tk thread) consumes slots up to the head
+    and stops at any slot whose sequence doesn't match, so it never sees a half-written
+    event. If the reader falls more than `capacity` events behind, the oldest are dropped.
+    """
+
+    def __init__(self, path=None, capacity=1024, create=False):
+        self.path = path or default_ring_path()
+        size = SLOTS_OFFSET + capacity * EVENT.size
+        if create:
+            with open(self.path, "wb") as f:
+                f.write(b'\0' * size)
+        self._file = open(self.path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), size)
+        if create:
+            HEADER.pack_into(self._map, 0, MAGIC, VERSION, capacity, 0)
+        else:
+            magic, version, slots, _ = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION or slots != capacity:
+                self.close()
+                raise ValueError(f"{self.path} is not a crosshair event ring ({capacity} slots)")
+        self.capacity = capacity
+        self.head = struct.unpack_from('<Q', self._map, HEAD_OFFSET)[0] # Writer side
+        self.read = self.head # Reader side
+        self.dropped = 0
+        self.delivered = 0
+        self.delays = FrameTimeHistogram() # Event timestamp to delivery (ms)
+
+    def write(self, kind, t_ns, a=0.0, b=0, name=""):
+        """Appends one event. Only the capture process calls this."""
+        index = self.head
+        offset = SLOTS_OFFSET + (index % self.capacity) * EVENT.size
+        EVENT.pack_into(self._map, offset, index + 1, t_ns, kind, a, b, name.encode("utf-8")[:24])
+        self.head = index + 1
+        struct.pack_into('<Q', self._map, HEAD_OFFSET, self.head)
+
+    def drain(self, handler):
+        """Calls handler(kind, t_ns, a, b, name) for each new event, in order. Returns the count."""
+        head = struct.unpack_from('<Q', self._map, HEAD_OFFSET)[0]
+        if head - self.read > self.capacity:
+            self.dropped += head - self.read - self.capacity
+            self.read = head - self.capacity # The writer lapped us
+        now = time.perf_counter_ns()
+        count = 0
+        while self.read < head:
+            index = self.read
+            seq, t_ns, kind, a, b, name = EVENT.unpack_from(self._map, SLOTS_OFFSET + (index % self.capacity) * EVENT.size)
+            if seq != index + 1:
+                break # Not fully written yet, or already overwritten; picked up next frame
+            self.read = index + 1
+            self.delays.add((now - t_ns) / 1_000_000)
+            handler(kind, t_ns, a, b, name.rstrip(b'\0').decode("utf-8", "replace"))
+            count += 1
+        self.delivered += count
+        return count
+
+    def set_sleeping(self, sleeping):
+        """Tells the writer whether to send a wake for each event (the reader isn't polling the ring)."""
+        self._map[SLEEP_OFFSET] = 1 if sleeping else 0
+
+    def reader_sleeping(self):
+        return self._map[SLEEP_OFFSET] != 0
+
+    def get_stats(self):
+        return {
+            "events": self.delivered,
+            "dropped": self.dropped,
+            "delivery_delay": self.delays.summary()
+        }
+
+    def close(self):
+        """Unmaps and closes the ring file."""
+        self._map.close()
+        self._file.close()
+
+    def unlink(self):
+        """Deletes the ring file. Only the creator calls this."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+def start_wake_listener(callback):
+    """Starts a thread calling callback() for each wake the capture process sends.
+
+    Returns the sending end of the pipe, for InputCaptureProcess. The thread exits once
+    every copy of it has been closed.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    threading.Thread(target=_wait_for_wakes, args=(receiver, callback), name="input-ring-wake", daemon=True).start()
+    return sender
+
+def _wait_for_wakes(receiver, callback):
+    try:
+        while True:
+            receiver.recv_bytes()
+            callback()
+    except (EOFError, OSError):
+        pass
+    finally:
+        receiver.close()
+
+def _capture_main(path, capacity, track_moves, coalesce_ms, wake):
+    """Entry point of the capture process: pynput listeners writing into the event ring."""
+    from pynput import keyboard, mouse
+    from mouse_tracker import MouseTracker
+
+    ring = EventRing(path, capacity)
+    perf_counter_ns = time.perf_counter_ns
+
+    def write(*event):
+        ring.write(*event)
+        if wake is not None and ring.reader_sleeping():
+            wake.send_bytes(b'\0') # The overlay's frame loop is suspended and won't drain the ring itself
+
+    def write_key(kind, key):
+        t_ns = perf_counter_ns()
+        code = key_code(key)
+        if isinstance(code, int):
+            write(kind, t_ns, b=code)
+        elif code:
+            write(kind, t_ns, name=code)
+
+    def on_press(key):
+        write_key(KEY_DOWN, key)
+
+    def on_release(key):
+        write_key(KEY_UP, key)
+
+    def on_click(x, y, button, pressed):
+        write(BUTTON_DOWN if pressed else BUTTON_UP, perf_counter_ns(), name=str(button).replace('Button.', ''))
+
+    # Moves are coalesced here, so only one event per bucket crosses the ring
+    tracker = MouseTracker(coalesce_ms=coalesce_ms)
+    def on_move(x, y):
+        head = tracker.head
+        tracker.on_move(x, y)
+        if tracker.head != head:
+            i = head & tracker.MASK
+            write(MOVE_BUCKET, tracker._bucket_start, tracker.distances[i], tracker.durations[i])
+
+    listeners = [keyboard.Listener(on_press=on_press, on_release=on_release),
+                 mouse.Listener(on_click=on_click, on_move=on_move if track_moves else None)]
+    for listener in listeners:
+        listener.start()
+    try:
+        multiprocessing.parent_process().join() # Exit with the overlay, even if it crashes
+    finally:
+        for listener in listeners:
+            listener.stop()
+        ring.close()
+
+class InputCaptureProcess:
+    """Runs the pynput hooks in a separate process that only writes events into an EventRing.
+
+    The hooks then never wait for the overlay's GIL (Tk drawing, the menu, JSON I/O, GC),
+    so their latency stays flat whatever the UI is doing. The process is spawned rather than
+    forked, as a fork of the threaded overlay could inherit locks held by its other threads.
+    Has the start()/stop()/is_alive()
+    interface InputWatchdog supervises. `wake` is the sending end of a pipe, written to
+    for each event while the reader has marked itself sleeping (see start_wake_listener()).
+    """
+
+    def __init__(self, ring, track_moves=False, coalesce_ms=2.0, wake=None):
+        self.ring = ring
+        self.track_moves = track_moves
+        self.coalesce_ms = coalesce_ms
+        self.wake = wake
+        self.process = None
+
+    def start(self):
+        context = multiprocessing.get_context("spawn") # Forking the threaded overlay can deadlock the child
+        self.process = context.Process(
+            target=_capture_main,
+            args=(self.ring.path, self.ring.capacity, self.track_moves, self.coalesce_ms, self.wake),
+            name="input-capture", daemon=True)
+        self.process.start()
+
+    def stop(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1.0)
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+def _demo_writer(path, capacity, count):
+    ring = EventRing(path, capacity)
+    for i in range(count):
+        ring.write(KEY_DOWN if i % 2 == 0 else KEY_UP, time.perf_counter_ns(), name="a")
+    ring.close()
+
+if __name__ == "__main__":
+    # Round-trip events through the ring from another process (no input hooks needed)
+    ring = EventRing(capacity=64, create=True)
+    try:
+        writer = multiprocessing.get_context("spawn").Process(target=_demo_writer, args=(ring.path, ring.capacity, 50))
+        writer.start()
+        writer.join()
+        received = []
+        ring.drain(lambda kind, t_ns, a, b, name: received.append((kind, name)))
+        assert received == [(KEY_DOWN if i % 2 == 0 else KEY_UP, "a") for i in range(50)], received
+        writer = multiprocessing.get_context("spawn").Process(target=_demo_writer, args=(ring.path, ring.capacity, 100))
+        writer.start()
+        writer.join()
+        assert ring.drain(lambda *event: None) == 64 and ring.dropped == 36
+        ring.set_sleeping(True)
+        assert ring.reader_sleeping() and EventRing(ring.path, ring.capacity).reader_sleeping()
+        woken = threading.Event()
+        sender = start_wake_listener(woken.set)
+        sender.send_bytes(b'\0')
+        assert woken.wait(1.0)
+        sender.close()
+        print(ring.get_stats())
+        print("Event ring checks passed.")
+    finally:
+        ring.close()
+        ring.unlink()
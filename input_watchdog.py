@@ -0,0 +1,231 @@
+import inspect
+import logging
+import sys
+import threading
+import time
+
+from frame_stats import FrameTimeHistogram
+
+logger = logging.getLogger(__name__)
+
+def callback_arity(handler):
+    """Returns how many positional arguments handler accepts, or None if it takes *args.
+
+    pynput passes callbacks that take *args every argument its backend has, including
+    the `injected` flag added in pynput 1.8, so wrappers trim to what the handler accepts.
+    """
+    try:
+        params = inspect.signature(handler).parameters.values()
+    except (TypeError, ValueError):
+        return None # No introspectable signature; pass everything through
+    if any(param.kind == param.VAR_POSITIONAL for param in params):
+        return None
+    return len(params)
+
+class HookChannel:
+    """One supervised listener, the factory that recreates it, and its callback counters."""
+
+    __slots__ = ('name', 'factory', 'listener', 'generation', 'calls', 'errors', 'slow_calls',
+                 'restarts', 'latency', 'busy_since', 'last_call', 'last_restart', 'suspect')
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.listener = None
+        self.generation = 0 # Bumped on restart; callbacks from older listeners are ignored
+        self.calls = 0
+        self.errors = 0
+        self.slow_calls = 0 # Callbacks slower than the OS hook timeout
+        self.restarts = 0
+        self.latency = FrameTimeHistogram() # Callback durations (ms)
+        self.busy_since = 0 # perf_counter_ns() when the running callback started, 0 when idle
+        self.last_call = 0 # perf_counter_ns() when the last callback finished (heartbeat)
+        self.last_restart = 0
+        self.suspect = False # A slow callback may have made the OS drop the hook
+
+class InputWatchdog:
+    """Supervises pynput listeners and restarts them when they die or stall.
+
+    Each listener is created by a factory(wrap) that wraps its callbacks with wrap().
+    The wrapper times every callback, counts errors instead of letting them stop the
+    listener, and records a heartbeat. check(), run periodically on the Tk thread,
+    restarts a listener whose thread has died, whose callback has been running for more
+    than stall_ms, or (on Windows, where the system silently removes low-level hooks
+    whose callbacks exceed LowLevelHooksTimeout) that had a callback slower than
+    hook_timeout_ms.
+
+    Anything with start(), stop() and is_alive() can be supervised, e.g. FakeListener.
+    """
+
+    def __init__(self, stall_ms=1000, hook_timeout_ms=300, min_restart_interval=2.0,
+                 restart_on_slow=sys.platform == "win32", clock=time.perf_counter_ns):
+        self.channels = {}
+        self.clock = clock
+        self.restart_on_slow = restart_on_slow
+        self.min_restart_ns = int(min_restart_interval * 1_000_000_000)
+        self.configure(stall_ms, hook_timeout_ms)
+
+    def configure(self, stall_ms, hook_timeout_ms):
+        self.stall_ns = int(stall_ms * 1_000_000)
+        self.hook_timeout_ns = int(hook_timeout_ms * 1_000_000)
+
+    def register(self, name, factory):
+        """Creates and starts a supervised listener. factory(wrap) must return it unstarted."""
+        channel = HookChannel(name, factory)
+        self.channels[name] = channel
+        self._start(channel)
+
+    def unregister(self, name):
+        """Stops a listener and stops supervising it."""
+        channel = self.channels.pop(name, None)
+        if channel is not None and channel.listener is not None:
+            channel.listener.stop()
+
+    def _start(self, channel):
+        generation = channel.generation
+        channel.busy_since = 0
+        channel.suspect = False
+        channel.listener = channel.factory(lambda handler: self._wrap(channel, generation, handler))
+        if isinstance(channel.listener, threading.Thread):
+            channel.listener.name = f"hook-{channel.name}" # Shows up in thread_accounting.py
+        channel.listener.start()
+
+    def _wrap(self, channel, generation, handler):
+        """Returns handler timed and guarded for the given listener generation."""
+        clock = self.clock
+        arity = callback_arity(handler)
+        def callback(*args):
+            if channel.generation != generation:
+                return None # A replaced listener that came back to life
+            start = clock()
+            channel.busy_since = start
+            try:
+                return handler(*args[:arity])
+            except Exception as e:
+                # pynput stops a listener whose callback raises, so keep it alive instead
+                channel.errors += 1
+                logger.error("Error in %s hook callback: %s", channel.name, e)
+                return None
+            finally:
+                end = clock()
+                channel.busy_since = 0
+                channel.last_call = end
+                channel.calls += 1
+                elapsed = end - start
+                channel.latency.add(elapsed / 1_000_000)
+                if elapsed > self.hook_timeout_ns:
+                    channel.slow_calls += 1
+                    channel.suspect = True
+        return callback
+
+    def _restart(self, channel, now):
+        channel.generation += 1
+        channel.restarts += 1
+        channel.last_restart = now
+        try:
+            channel.listener.stop()
+        except Exception as e:
+            logger.debug("Stopping the old %s listener failed: %s", channel.name, e)
+        self._start(channel)
+
+    def check(self):
+        """Restarts dead or stalled listeners. Returns the names of the restarted ones."""
+        now = self.clock()
+        restarted = []
+        for channel in list(self.channels.values()):
+            busy_since = channel.busy_since
+            if not channel.listener.is_alive():
+                reason = "died"
+            elif busy_since and now - busy_since > self.stall_ns:
+                reason = "stalled in a callback"
+            elif channel.suspect and self.restart_on_slow:
+                reason = "had a callback slower than the hook timeout"
+            else:
+                continue
+            if channel.restarts and now - channel.last_restart < self.min_restart_ns:
+                continue # Don't thrash if the listener can't stay up
+            logger.warning("The %s listener %s; restarting it.", channel.name, reason)
+            self._restart(channel, now)
+            restarted.append(channel.name)
+        return restarted
+
+    def stop_all(self):
+        for name in list(self.channels):
+            self.unregister(name)
+
+    def get_stats(self):
+        """Returns per-listener callback counters and latency summaries."""
+        now = self.clock()
+        return {
+            name: {
+                "alive": channel.listener.is_alive(),
+                "calls": channel.calls,
+                "errors": channel.errors,
+                "slow_calls": channel.slow_calls,
+                "restarts": channel.restarts,
+                "idle_s": round((now - channel.last_call) / 1_000_000_000, 1) if channel.last_call else None,
+                "latency": channel.latency.summary()
+            }
+            for name, channel in self.channels.items()
+        }
+
+class FakeListener:
+    """Stand-in for a pynput listener, for exercising InputWatchdog without input hooks."""
+
+    def __init__(self, **callbacks):
+        self.callbacks = callbacks
+        self.alive = False
+
+    def start(self):
+        self.alive = True
+
+    def stop(self):
+        self.alive = False
+
+    def is_alive(self):
+        return self.alive
+
+    def emit(self, name, *args):
+        """Delivers one event, like the hook thread would."""
+        return self.callbacks[name](*args)
+
+if __name__ == "__main__":
+    # Drive the watchdog with fake listeners and a fake clock
+    now = [0]
+    watchdog = InputWatchdog(stall_ms=1000, hook_timeout_ms=300, min_restart_interval=0,
+                             restart_on_slow=True, clock=lambda: now[0])
+    events = []
+    def slow_handler(key):
+        now[0] += 400_000_000 # Takes 400 ms
+        events.append(key)
+    def failing_handler(key):
+        raise RuntimeError("boom")
+    watchdog.register("keyboard", lambda wrap: FakeListener(on_press=wrap(events.append), on_slow=wrap(slow_handler),
+                                                            on_fail=wrap(failing_handler)))
+    keyboard = watchdog.channels["keyboard"].listener
+
+    keyboard.emit("on_press", "a")
+    keyboard.emit("on_fail", "b")
+    assert events == ["a"] and watchdog.channels["keyboard"].errors == 1
+    assert watchdog.check() == []
+
+    keyboard.emit("on_slow", "c") # Slower than the hook timeout
+    assert watchdog.check() == ["keyboard"]
+    old, keyboard = keyboard, watchdog.channels["keyboard"].listener
+    assert old is not keyboard and not old.alive
+    old.emit("on_press", "stale") # Ignored: the listener was replaced
+    assert events == ["a", "c"]
+
+    keyboard.stop() # Dies
+    assert watchdog.check() == ["keyboard"]
+
+    def stuck_handler():
+        now[0] += 2_000_000_000 # Still running when the watchdog looks
+        assert watchdog.check() == ["mouse"]
+    watchdog.register("mouse", lambda wrap: FakeListener(on_click=wrap(stuck_handler)))
+    watchdog.channels["mouse"].listener.emit("on_click")
+
+    stats = watchdog.get_stats()["keyboard"]
+    assert stats["restarts"] == 2 and stats["alive"] and stats["slow_calls"] == 1
+    print(stats)
+    print("Watchdog checks passed.")
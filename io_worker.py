@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from frame_stats import FrameTimeHistogram
+
+logger = logging.getLogger(__name__)
+
+def _skip(result):
+    """Stands in for the callback of a task that failed."""
+
+class IOWorkerPool:
+    """Runs blocking disk and process-table work on worker threads.
+
+    Results are queued and their callbacks are run on the Tk thread by a short
+    root.after poll, so Tk is never touched from a worker. The poll only runs while a
+    task with a callback is in flight, so an idle pool never wakes Tk.
+    """
+
+    def __init__(self, root, max_workers=2, poll_interval=10):
+        self.root = root
+        self.poll_interval = poll_interval # ms between checks for finished work
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="io-worker")
+        self.results = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._pending_writes = {} # path -> latest serialized contents not yet on disk
+        self._pending_appends = {} # path -> text chunks waiting to be appended, in order
+        self.task_times = FrameTimeHistogram() # Time spent in workers
+        self.callback_times = FrameTimeHistogram() # Time spent on the Tk thread handling results
+        self._closed = False
+        self._awaiting = 0 # Tasks whose callback hasn't run yet (Tk thread only)
+        self._poll_job = None
+
+    def submit(self, fn, *args, callback=None):
+        """Runs fn(*args) on a worker. callback(result) is later called on the Tk thread.
+
+        Tasks without a callback may be submitted from any thread; tasks with one must be
+        submitted from the Tk thread.
+        """
+        if self._closed:
+            return
+        if callback is not None:
+            self._awaiting += 1
+            if self._poll_job is None:
+                self._poll_job = self.root.after(self.poll_interval, self._poll)
+        self.executor.submit(self._run, fn, args, callback)
+
+    def _run(self, fn, args, callback):
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            logger.error("Background I/O task %s failed: %s", getattr(fn, '__name__', fn), e)
+            callback = None if callback is None else _skip # Still lets the poll count it as done
+            result = None
+        finally:
+            with self._lock:
+                self.task_times.add((time.perf_counter() - start) * 1000)
+        if callback is not None:
+            self.results.put((callback, result))
+
+    def _poll(self):
+        """Runs finished-task callbacks on the Tk thread, re-arming while more are in flight."""
+        self._poll_job = None
+        while True:
+            try:
+                callback, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self._awaiting -= 1
+            if callback is _skip:
+                continue
+            start = time.perf_counter()
+            try:
+                callback(result)
+            except Exception as e:
+                logger.error("Error handling background I/O result: %s", e)
+            self.callback_times.add((time.perf_counter() - start) * 1000)
+        if self._awaiting and not self._closed and self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_interval, self._poll)
+
+    def write_json(self, path, data):
+        """Writes data as JSON in the background. Rapid successive writes to one path are coalesced."""
+        text = json.dumps(data, indent=4) # Serialize now so later edits to data can't race the write
+        with self._lock:
+            scheduled = path in self._pending_writes
+            self._pending_writes[path] = text
+        if not scheduled:
+            self.submit(self._flush_writes, path)
+
+    def _flush_writes(self, path):
+        """Writes the latest pending contents for path until no newer version is queued."""
+        try:
+            while True:
+                with self._lock:
+                    text = self._pending_writes[path]
+                temp_path = path + ".tmp"
+                with open(temp_path, "w") as f:
+                    f.write(text)
+                os.replace(temp_path, path) # Readers never see a half-written file
+                with self._lock:
+                    if self._pending_writes[path] is text:
+                        del self._pending_writes[path]
+                        return
+        except Exception:
+            with self._lock:
+                self._pending_writes.pop(path, None) # Let the next write schedule a fresh flush
+            raise
+
+    def append_text(self, path, text):
+        """Appends text to a file in the background. Appends queued while a write is running are batched."""
+        with self._lock:
+            chunks = self._pending_appends.get(path)
+            if chunks is not None:
+                chunks.append(text)
+                return
+            self._pending_appends[path] = [text]
+        self.submit(self._flush_appends, path)
+
+    def _flush_appends(self, path):
+        """Appends the pending chunks for path, in order, until none are left."""
+        try:
+            while True:
+                with self._lock:
+                    chunks = self._pending_appends[path]
+                    if not chunks:
+                        del self._pending_appends[path]
+                        return
+                    self._pending_appends[path] = []
+                with open(path, "a") as f:
+                    f.write("".join(chunks))
+        except Exception:
+            with self._lock:
+                self._pending_appends.pop(path, None) # Let the next append schedule a fresh flush
+            raise
+
+    def get_stats(self):
+        """Returns worker and Tk-thread timing histograms."""
+        with self._lock:
+            return {
+                "io_tasks": self.task_times.summary(),
+                "io_callbacks": self.callback_times.summary()
+            }
+
+    def shutdown(self):
+        """Waits for pending work (including queued writes) and stops the workers."""
+        self._closed = True
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,70 @@
+import array
+import math
+import random
+
+class JitterNoise:
+    """Precomputed, seeded jitter tables. Each frame costs one array read per axis.
+
+    "random" mode uses smooth periodic value noise; "up" and "sideways" use a sine table.
+    The same seed and settings always produce the same sequence of offsets.
+    """
+
+    TABLE_SIZE = 4096 # Samples per table (power of two so the cursor wraps with a mask)
+    TABLE_MASK = TABLE_SIZE - 1
+    LATTICE_SPACING = 4 # Samples between random lattice points in "random" mode
+
+    def __init__(self):
+        self.table_x = array.array('f', bytes(4 * self.TABLE_SIZE))
+        self.table_y = array.array('f', bytes(4 * self.TABLE_SIZE))
+        self.cursor = 0.0
+        self.step = 1.0
+        self._built_for = None
+
+    def configure(self, mode, amount, speed, seed=0):
+        """Rebuilds the tables if the mode, amount or seed changed, and sets the playback speed."""
+        if mode in ("up", "sideways"):
+            # jitter_speed is in radians per frame, one table spans 2*pi
+            self.step = speed * self.TABLE_SIZE / (2 * math.pi)
+        else:
+            self.step = 1.0
+        key = (mode, amount, seed)
+        if key == self._built_for:
+            return
+        self._built_for = key
+        self._build(mode, amount, seed)
+        self.reset()
+
+    def _build(self, mode, amount, seed):
+        size = self.TABLE_SIZE
+        for i in range(size):
+            self.table_x[i] = 0.0
+            self.table_y[i] = 0.0
+
+        if mode == "random":
+            rng = random.Random(seed)
+            for table in (self.table_x, self.table_y):
+                lattice = [rng.uniform(-1.0, 1.0) for _ in range(size // self.LATTICE_SPACING)]
+                for i in range(size):
+                    k, frac = divmod(i, self.LATTICE_SPACING)
+                    a = lattice[k]
+                    b = lattice[(k + 1) % len(lattice)] # Wrap so the table loops seamlessly
+                    t = frac / self.LATTICE_SPACING
+                    t = t * t * (3 - 2 * t) # Smoothstep
+                    table[i] = amount * (a + (b - a) * t)
+        elif mode in ("up", "sideways"):
+            table = self.table_y if mode == "up" else self.table_x
+            for i in range(size):
+                table[i] = amount * math.sin(2 * math.pi * i / size)
+
+    def reset(self):
+        """Restarts playback from the beginning of the tables."""
+        self.cursor = 0.0
+
+    def advance_into(self, state):
+        """Advances one frame and stores the jitter offset in state.jitter_x / state.jitter_y."""
+        i = int(self.cursor) & self.TABLE_MASK
+        self.cursor += self.step
+        if self.cursor >= self.TABLE_SIZE:
+            self.cursor %= self.TABLE_SIZE
+        state.jitter_x = self.table_x[i]
+        state.jitter_y = self.table_y[i]
@@ -0,0 +1,166 @@
+import ctypes
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Actions the crosshair model reacts to, named after the CS2 commands they mirror
+MOVEMENT_ACTIONS = ("forward", "back", "moveleft", "moveright")
+MODEL_ACTIONS = frozenset(MOVEMENT_ACTIONS + ("crouch",))
+# Actions the overlay handles itself
+COMMAND_ACTIONS = ("toggle_menu", "quit", "profiler")
+# Actions that hide the crosshair while held (see visibility.py)
+HOLD_ACTIONS = ("hide",)
+
+# Key names are pynput's: a character, a Key member name ("ctrl_l", "f1", "space"), or "vk:<code>"
+DEFAULT_KEY_BINDINGS = {
+    "forward": "w",
+    "back": "s",
+    "moveleft": "a",
+    "moveright": "d",
+    "crouch": ["ctrl", "ctrl_l", "ctrl_r"],
+    "toggle_menu": "f1",
+    "quit": "esc",
+    "profiler": "f9",
+    "hide": []
+}
+
+_X11 = sys.platform.startswith("linux")
+
+if sys.platform == "win32":
+    # VkKeyScanW returns a SHORT: -1 only compares equal once ctypes knows it is signed 16-bit
+    user32 = ctypes.windll.user32
+    user32.VkKeyScanW.restype = ctypes.c_short
+    user32.VkKeyScanW.argtypes = [ctypes.c_wchar]
+
+def key_code(key):
+    """Returns the layout-resolved virtual key code of a pynput key, or its character without one.
+
+    On X11 pynput reports keysyms, which differ for shifted letters, so letters are folded
+    to lower case there; a key released after Shift then matches its press.
+    """
+    key = getattr(key, "value", key) # Key members wrap a KeyCode
+    vk = getattr(key, "vk", None)
+    if vk is None:
+        char = getattr(key, "char", None)
+        return char.lower() if char else None
+    if _X11 and 0x41 <= vk <= 0x5A:
+        return vk + 0x20
+    return vk
+
+def resolve_key(name):
+    """Returns the code key_code() reports for the key with this name, or None if it's unknown."""
+    if isinstance(name, int):
+        return name
+    name = str(name).strip().lower()
+    if name.startswith("vk:"):
+        return int(name[3:], 0)
+    if len(name) == 1:
+        if sys.platform == "win32":
+            if ord(name) > 0xFFFF:
+                return None # Outside the UTF-16 unit VkKeyScanW takes
+            vk = user32.VkKeyScanW(name)
+            return vk & 0xFF if vk != -1 else None # Virtual key for this character on the active layout
+        if _X11 and ord(name) < 0x100:
+            return ord(name) # Latin-1 keysyms equal their code points
+        from pynput.keyboard import KeyCode
+        return key_code(KeyCode.from_char(name))
+    from pynput.keyboard import Key
+    try:
+        return key_code(Key[name])
+    except KeyError:
+        return None
+
+class KeyBindings:
+    """Key bindings compiled into a {key code: action} table, with edge-triggered actions.
+
+    Bindings map each action to one key name or a list of them. compile() resolves the
+    names once, so handling an event is a dict lookup on the key's code. press() returns
+    an action only when the first of its keys goes down, and release() only when the last
+    one comes up, so OS autorepeat and a second key bound to a held action are dropped.
+    """
+
+    def __init__(self, resolver=resolve_key):
+        self.resolver = resolver
+        self.table = {} # key code -> action
+        self.names = {} # key name -> action, for traces recorded with key names
+        self.down = set() # Codes of bound keys currently held
+        self.held = {} # action -> number of its keys currently held
+        self.repeats = 0 # Presses dropped as autorepeat
+
+    def compile(self, bindings):
+        """Builds the dispatch table from {action: key name or [names]}. Returns the unresolved names."""
+        table = {}
+        names = {}
+        unresolved = []
+        for action, keys in bindings.items():
+            for name in keys if isinstance(keys, (list, tuple)) else [keys]:
+                try:
+                    code = self.resolver(name)
+                except (ValueError, OSError, ImportError) as e:
+                    logger.debug("Could not resolve key %r: %s", name, e)
+                    code = None
+                if code is None:
+                    unresolved.append(name)
+                    continue
+                if code in table and table[code] != action:
+                    logger.warning("Key %r is bound to both %s and %s; using %s.", name, table[code], action, action)
+                table[code] = action
+                names[str(name).lower()] = action
+        if unresolved:
+            logger.warning("Unknown keys in key_bindings: %s", ", ".join(map(str, unresolved)))
+        self.table = table
+        self.names = names
+        self.down.clear()
+        self.held.clear()
+        return unresolved
+
+    def press(self, code):
+        """Returns the action a key press starts, or None (unbound, autorepeat, or already held)."""
+        action = self.table.get(code)
+        if action is None:
+            return None
+        if code in self.down:
+            self.repeats += 1
+            return None
+        self.down.add(code)
+        count = self.held.get(action, 0)
+        self.held[action] = count + 1
+        return action if count == 0 else None
+
+    def release(self, code):
+        """Returns the action a key release ends, or None."""
+        if code not in self.down:
+            return None
+        self.down.discard(code)
+        action = self.table[code]
+        count = self.held[action] - 1
+        self.held[action] = count
+        return action if count == 0 else None
+
+    def action_for(self, name):
+        """Returns the action for a key name or action name (as found in input traces), or None."""
+        name = str(name).lower()
+        if name in MODEL_ACTIONS or name in COMMAND_ACTIONS or name in HOLD_ACTIONS:
+            return name
+        return self.names.get(name)
+
+if __name__ == "__main__":
+    # Resolve with a stand-in table so the checks don't depend on the platform's layout
+    codes = {"w": 87, "s": 83, "a": 65, "d": 68, "z": 90, "ctrl_l": 162, "ctrl_r": 163, "f1": 112}
+    bindings = KeyBindings(resolver=codes.get)
+    assert bindings.compile({"forward": "z", "back": "s", "moveleft": "a", "moveright": "d",
+                             "crouch": ["ctrl_l", "ctrl_r"], "toggle_menu": "f1", "quit": "nope"}) == ["nope"]
+
+    assert bindings.press(90) == "forward"
+    assert bindings.press(90) is None and bindings.repeats == 1 # Autorepeat
+    assert bindings.press(87) is None # W isn't bound
+    assert bindings.release(90) == "forward"
+    assert bindings.release(90) is None
+
+    # Crouch stays held until both of its keys are up
+    assert bindings.press(162) == "crouch" and bindings.press(163) is None
+    assert bindings.release(162) is None and bindings.release(163) == "crouch"
+
+    assert bindings.action_for("Z") == "forward" and bindings.action_for("moveleft") == "moveleft"
+    print("Key binding checks passed.")
@@ -0,0 +1,149 @@
+import ctypes
+import ctypes.util
+import logging
+
+logger = logging.getLogger(__name__)
+
+# X Shape extension constants (from X11/extensions/shape.h)
+SHAPE_BOUNDING = 0
+SHAPE_INPUT = 2
+SHAPE_SET = 0
+UNSORTED = 0
+
+class XRectangle(ctypes.Structure):
+    _fields_ = [
+        ("x", ctypes.c_short),
+        ("y", ctypes.c_short),
+        ("width", ctypes.c_ushort),
+        ("height", ctypes.c_ushort),
+    ]
+
+class LinuxOverlay:
+    """Makes the overlay click-through and shapes it to the crosshair pixels using the X Shape extension."""
+
+    MAX_RECTS = 256 # Upper bound on shape rectangles per update (circle layers use 32 each)
+
+    def __init__(self, root):
+        self.root = root
+        self.available = False
+        self.display = None
+        self.window = None
+        self._last_rects = None
+        self._rect_buffer = (XRectangle * self.MAX_RECTS)()
+
+        x11_path = ctypes.util.find_library("X11")
+        xext_path = ctypes.util.find_library("Xext")
+        if not x11_path or not xext_path:
+            logger.warning("libX11/libXext not found. Linux overlay backend disabled.")
+            return
+
+        self.xlib = ctypes.cdll.LoadLibrary(x11_path)
+        self.xext = ctypes.cdll.LoadLibrary(xext_path)
+
+        self.xlib.XOpenDisplay.restype = ctypes.c_void_p
+        self.xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self.xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        self.xlib.XFlush.argtypes = [ctypes.c_void_p]
+        self.xlib.XFree.argtypes = [ctypes.c_void_p]
+        self.xext.XShapeQueryExtension.restype = ctypes.c_int
+        self.xext.XShapeQueryExtension.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)]
+        self.xext.XShapeCombineRectangles.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+            ctypes.POINTER(XRectangle), ctypes.c_int, ctypes.c_int, ctypes.c_int
+        ]
+        self.xext.XShapeCombineMask.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_ulong, ctypes.c_int
+        ]
+        self.xext.XShapeGetRectangles.restype = ctypes.POINTER(XRectangle)
+        self.xext.XShapeGetRectangles.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)
+        ]
+
+        # Use a dedicated connection so we never interfere with Tk's own Xlib state
+        self.display = self.xlib.XOpenDisplay(None)
+        if not self.display:
+            logger.warning("Could not open X display. Linux overlay backend disabled.")
+            return
+
+        event_base = ctypes.c_int()
+        error_base = ctypes.c_int()
+        if not self.xext.XShapeQueryExtension(self.display, ctypes.byref(event_base), ctypes.byref(error_base)):
+            logger.warning("X server has no Shape extension. Linux overlay backend disabled.")
+            self.close()
+            return
+
+        # The shape has to be applied to Tk's wrapper window, not the inner widget window
+        self.root.update_idletasks()
+        self.window = int(self.root.wm_frame(), 16)
+        self.available = True
+
+        # Start fully transparent until the first crosshair is drawn
+        self.set_paint_rects([])
+
+    def set_clickthrough(self, enabled):
+        """Empties the input shape (click-through) or restores it to the painted crosshair area."""
+        if not self.available:
+            return
+        if enabled:
+            self.xext.XShapeCombineRectangles(self.display, self.window, SHAPE_INPUT, 0, 0,
+                                              None, 0, SHAPE_SET, UNSORTED)
+        else:
+            # A None mask resets the input shape; the server clips it to the bounding shape
+            self.xext.XShapeCombineMask(self.display, self.window, SHAPE_INPUT, 0, 0, 0, SHAPE_SET)
+        self.xlib.XFlush(self.display)
+
+    def set_paint_rects(self, rects):
+        """Limits the painted (bounding) shape to the given (x, y, width, height) rectangles."""
+        if not self.available or rects == self._last_rects:
+            return
+        count = min(len(rects), self.MAX_RECTS)
+        for i in range(count):
+            x, y, width, height = rects[i]
+            rect = self._rect_buffer[i]
+            rect.x = int(x)
+            rect.y = int(y)
+            rect.width = max(int(width), 0)
+            rect.height = max(int(height), 0)
+        self.xext.XShapeCombineRectangles(self.display, self.window, SHAPE_BOUNDING, 0, 0,
+                                          self._rect_buffer, count, SHAPE_SET, UNSORTED)
+        self.xlib.XFlush(self.display)
+        self._last_rects = [list(rect) for rect in rects] # Callers may reuse and mutate their rect lists
+
+    def get_shape_rects(self, kind=SHAPE_BOUNDING):
+        """Returns the server's current shape rectangles for the window (used for verification)."""
+        if not self.available:
+            return []
+        count = ctypes.c_int()
+        ordering = ctypes.c_int()
+        rects = self.xext.XShapeGetRectangles(self.display, self.window, kind,
+                                              ctypes.byref(count), ctypes.byref(ordering))
+        result = [(rects[i].x, rects[i].y, rects[i].width, rects[i].height) for i in range(count.value)]
+        if rects:
+            self.xlib.XFree(rects)
+        return result
+
+    def close(self):
+        """Closes the dedicated X display connection."""
+        if self.display:
+            self.xlib.XCloseDisplay(self.display)
+            self.display = None
+        self.available = False
+
+# Example usage (for checking the backend independently, e.g. under `xvfb-run python linux_overlay.py`)
+if __name__ == "__main__":
+    import tkinter as tk
+
+    root = tk.Tk()
+    root.geometry("200x200+0+0")
+    root.overrideredirect(True)
+    root.update()
+
+    backend = LinuxOverlay(root)
+    if backend.available:
+        backend.set_clickthrough(True)
+        backend.set_paint_rects([(60, 99, 80, 2), (99, 60, 2, 80)])
+        root.update()
+        print(f"Bounding shape: {backend.get_shape_rects(SHAPE_BOUNDING)}")
+        print(f"Input shape: {backend.get_shape_rects(SHAPE_INPUT)}")
+        backend.close()
+    root.destroy()
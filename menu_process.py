@@ -0,0 +1,200 @@
+import copy
+import json
+import logging
+import multiprocessing
+import threading
+import tkinter as tk
+
+from crosshair_ctl import ControlClient
+from preset_store import PresetStore
+from session_stats import read_session_log
+
+logger = logging.getLogger(__name__)
+
+PARENT_POLL_MS = 500 # How often the menu checks that the overlay is still running
+
+class _SessionSummary:
+    """Stands in for the overlay's SessionStats with the summary it reported."""
+
+    def __init__(self, summary):
+        self._summary = summary
+
+    def summary(self):
+        return self._summary
+
+class RemoteOverlay:
+    """The part of the overlay CustomizationMenu uses, forwarded over the control socket.
+
+    save_config() sends only the keys that changed since the last config the overlay
+    reported, as one `update` command, so the overlay applies a small dict between frames
+    and records it as a single undo step. Presets are read and written directly in the
+    shared preset store (SQLite allows several processes), and the session log is read here.
+    """
+
+    def __init__(self, client, preset_store_path):
+        self.client = client
+        self.config = client.call("get")
+        self.preset_store = PresetStore(preset_store_path)
+        self.menu_open = True
+
+    def save_config(self, config):
+        """Sends the changed and removed keys of config to the overlay."""
+        changes = {key: value for key, value in config.items() if self.config.get(key) != value}
+        removed = [key for key in self.config if key not in config]
+        if not changes and not removed:
+            return
+        update = json.dumps({"changes": changes, "removed": removed}, separators=(",", ":"))
+        self.client.call("update " + update) # One line per command, so no newlines in the JSON
+        self.config = copy.deepcopy(config)
+
+    def save_preset(self, name, preset, tags=None):
+        self.preset_store.put(name, dict(preset), tags)
+
+    def undo_config(self):
+        return self._step_history("undo")
+
+    def redo_config(self):
+        return self._step_history("redo")
+
+    def _step_history(self, op):
+        changed = self.client.call(op)[op]
+        if changed:
+            self.config = self.client.call("get")
+        return changed
+
+    @property
+    def session_stats(self):
+        summary = self.client.call("session")
+        return _SessionSummary(summary) if summary is not None else None
+
+    def get_thread_stats(self):
+        return self.client.call("threads")
+
+    def load_session_log(self, callback):
+        # This process has no frame loop to protect, so the log is read in place
+        callback(read_session_log(self.config.get("session_log_path", "sessions.jsonl")))
+
+    def draw_crosshair(self):
+        pass # The overlay redraws on its next frame
+
+    def _apply_clickthrough_setting(self):
+        pass # Applied by the overlay's `update` command
+
+    def quit_overlay(self):
+        self.client.call("quit")
+
+    def close(self):
+        self.client.close()
+        self.preset_store.close()
+
+def _menu_main(socket_path, port, config_path, preset_store_path):
+    """Entry point of the menu process: a Tk root holding only the customization menu."""
+    from app_logging import start_logging, stop_logging
+    from customization_menu import CustomizationMenu
+
+    start_logging()
+    try:
+        overlay = RemoteOverlay(ControlClient(socket_path, port), preset_store_path)
+    except (OSError, ValueError) as e:
+        logger.error("Menu process could not reach the overlay: %s", e)
+        stop_logging()
+        return
+    root = tk.Tk()
+    root.withdraw()
+    menu = CustomizationMenu(root, overlay, config_path)
+    parent = multiprocessing.parent_process()
+
+    def watch_parent():
+        if parent is not None and not parent.is_alive():
+            menu.destroy() # The overlay exited without closing us
+        elif menu.winfo_exists():
+            root.after(PARENT_POLL_MS, watch_parent)
+    root.after(PARENT_POLL_MS, watch_parent)
+    try:
+        root.wait_window(menu)
+    finally:
+        overlay.close()
+        root.destroy()
+        stop_logging()
+
+class MenuProcess:
+    """Runs CustomizationMenu in its own process, talking to the overlay's control server.
+
+    The menu's widgets, color pickers and dialogs then run on another interpreter's Tk
+    loop, so nothing the menu does delays the overlay's frames. The process is spawned
+    rather than forked, as a forked child would inherit the overlay's Tk state.
+    """
+
+    def __init__(self, control_server, config_path, preset_store_path, on_exit=None):
+        self.args = (control_server.path, control_server.port, config_path, preset_store_path)
+        self.on_exit = on_exit # Called on a watcher thread once the menu process has exited
+        self.process = None
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(target=_menu_main, args=self.args, name="customization-menu", daemon=True)
+        self.process.start()
+        if self.on_exit is not None:
+            threading.Thread(target=self._wait, name="menu-process-watch", daemon=True).start()
+
+    def _wait(self):
+        self.process.join()
+        on_exit = self.on_exit
+        if on_exit is not None:
+            on_exit()
+
+    def stop(self):
+        """Terminates the menu (the overlay is shutting down, so on_exit isn't called)."""
+        self.on_exit = None
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1.0)
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+if __name__ == "__main__":
+    # Drive RemoteOverlay against a stand-in control client (no overlay or display needed)
+    import os
+    import tempfile
+
+    class FakeClient:
+        def __init__(self):
+            self.config = {"gap": 5, "length": 40, "layers": [], "current_preset": "Default"}
+            self.sent = []
+
+        def call(self, line):
+            self.sent.append(line)
+            if line == "get":
+                return dict(self.config)
+            if line == "session":
+                return None
+            if line.startswith("update "):
+                update = json.loads(line[len("update "):])
+                self.config.update(update["changes"])
+                for key in update["removed"]:
+                    self.config.pop(key, None)
+                return {"changed": sorted(update["changes"]) + update["removed"]}
+            raise ValueError(line)
+
+        def close(self):
+            pass
+
+    path = os.path.join(tempfile.gettempdir(), "menu_process_check.db")
+    client = FakeClient()
+    overlay = RemoteOverlay(client, path)
+    config = copy.deepcopy(overlay.config)
+    overlay.save_config(config)
+    assert client.sent == ["get"] # Nothing changed, nothing sent
+    config["gap"] = 8
+    del config["layers"]
+    overlay.save_config(config)
+    assert client.sent[-1] == 'update {"changes":{"gap":8},"removed":["layers"]}', client.sent[-1]
+    assert client.config == config and overlay.session_stats is None
+    overlay.save_preset("Check", {"gap": 8})
+    assert overlay.preset_store.get("Check") == {"gap": 8}
+    overlay.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    print("Menu process checks passed.")
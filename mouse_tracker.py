@@ -0,0 +1,114 @@
+import array
+import math
+import time
+
+class MouseTracker:
+    """Mouse speed from raw move reports, cheap enough for 4-8 kHz polling.
+
+    on_move() runs on the pynput hook thread. It only accumulates the delta from the previous
+    report; once per coalesce interval it closes a bucket (distance, duration) into a
+    fixed-size ring buffer. sample() runs on the Tk thread, folds new buckets into an
+    exponentially weighted moving average of the speed, and decays it while the mouse is still.
+
+    The hook thread is the only writer of the ring and `head`; the reader never writes them.
+    """
+
+    SLOTS = 256 # Ring size (power of two); at 2 ms buckets this covers half a second
+    MASK = SLOTS - 1
+
+    def __init__(self, coalesce_ms=2.0, half_life_ms=60.0, max_jump=400):
+        self.coalesce_ns = int(coalesce_ms * 1_000_000)
+        self.tau_ns = half_life_ms * 1_000_000 / math.log(2)
+        self.max_jump = max_jump # Larger jumps are cursor warps (e.g. re-centering), not movement
+        self.distances = array.array('d', bytes(8 * self.SLOTS))
+        self.durations = array.array('q', bytes(8 * self.SLOTS))
+        self.head = 0 # Buckets written so far
+        self.read = 0 # Buckets folded into the average so far
+        self.speed = 0.0 # Smoothed speed in pixels per second
+        self._last_x = None
+        self._last_y = None
+        self._pending = 0.0
+        self._bucket_start = 0
+        self._last_sample_ns = None
+        # Hook cost accounting
+        self.reports = 0
+        self.cost_ns = 0
+        self.max_cost_ns = 0
+
+    def configure(self, coalesce_ms, half_life_ms):
+        self.coalesce_ns = int(coalesce_ms * 1_000_000)
+        self.tau_ns = half_life_ms * 1_000_000 / math.log(2)
+
+    def reset(self):
+        """Forgets the last position, e.g. when the move listener is restarted."""
+        self._last_x = None
+        self._last_y = None
+        self._pending = 0.0
+        self.speed = 0.0
+        self.read = self.head
+
+    def on_move(self, x, y):
+        """pynput on_move callback."""
+        t = time.perf_counter_ns()
+        last_x = self._last_x
+        last_y = self._last_y
+        self._last_x = x
+        self._last_y = y
+        if last_x is None:
+            self._bucket_start = t
+        else:
+            dx = x - last_x
+            dy = y - last_y
+            if -self.max_jump < dx < self.max_jump and -self.max_jump < dy < self.max_jump:
+                self._pending += math.hypot(dx, dy)
+            elapsed = t - self._bucket_start
+            if elapsed >= self.coalesce_ns:
+                i = self.head & self.MASK
+                self.distances[i] = self._pending
+                self.durations[i] = elapsed
+                self.head += 1
+                self._pending = 0.0
+                self._bucket_start = t
+        cost = time.perf_counter_ns() - t
+        self.reports += 1
+        self.cost_ns += cost
+        if cost > self.max_cost_ns:
+            self.max_cost_ns = cost
+
+    def add_bucket(self, distance, duration, end_ns):
+        """Adds a bucket closed by another process's tracker (see input_process.py)."""
+        i = self.head & self.MASK
+        self.distances[i] = distance
+        self.durations[i] = duration
+        self._bucket_start = end_ns
+        self.head += 1
+
+    def sample(self, now_ns):
+        """Folds new buckets into the moving average and returns the speed in pixels per second."""
+        head = self.head
+        if head - self.read > self.SLOTS:
+            self.read = head - self.SLOTS # Reader fell behind; the oldest buckets were overwritten
+        speed = self.speed
+        folded = head != self.read
+        while self.read < head:
+            i = self.read & self.MASK
+            duration = self.durations[i]
+            alpha = 1.0 - math.exp(-duration / self.tau_ns)
+            speed += (self.distances[i] * 1e9 / duration - speed) * alpha
+            self.read += 1
+        if not folded and self._last_sample_ns is not None and now_ns - self._bucket_start > 2 * self.coalesce_ns:
+            # The mouse has stopped reporting, so let the speed decay towards zero
+            speed *= math.exp(-(now_ns - self._last_sample_ns) / self.tau_ns)
+        self._last_sample_ns = now_ns
+        self.speed = speed
+        return speed
+
+    def get_stats(self):
+        """Returns hook cost counters (microseconds per report)."""
+        return {
+            "reports": self.reports,
+            "buckets": self.head,
+            "mean_cost_us": round(self.cost_ns / self.reports / 1000, 3) if self.reports else 0.0,
+            "max_cost_us": round(self.max_cost_ns / 1000, 3),
+            "speed_px_s": round(self.speed, 1)
+        }
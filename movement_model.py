@@ -0,0 +1,110 @@
+import math
+
+class MovementModel:
+    """Ground movement velocity integrated at a fixed step, independent of the frame rate.
+
+    Uses Source-style acceleration and friction (sv_accelerate, sv_friction, sv_stopspeed)
+    on a 2D velocity, with the wish direction taken from the held movement keys. advance()
+    runs as many fixed steps as have elapsed (up to max_steps, so a long hitch can't stall
+    the frame) and interpolates between the last two steps for rendering. Once the velocity
+    stops changing, the remaining steps are skipped.
+    """
+
+    def __init__(self, max_speed=250.0, accelerate=5.5, friction=5.2, stop_speed=80.0,
+                 step=1 / 128, max_steps=32):
+        self.max_speed = max_speed
+        self.accelerate = accelerate
+        self.friction = friction
+        self.stop_speed = stop_speed
+        self.step = step
+        self.max_steps = max_steps
+        self.wish_x = 0 # -1, 0 or 1 (left/right)
+        self.wish_y = 0 # -1, 0 or 1 (back/forward)
+        self.vx = 0.0
+        self.vy = 0.0
+        self.prev_speed = 0.0 # Speed before the last step, for interpolation
+        self.speed = 0.0 # Interpolated speed at the last advance()
+        self.steps_run = 0 # Fixed steps actually integrated (for stats)
+        self._last_time = None
+        self._accumulator = 0.0
+
+    def configure(self, max_speed, accelerate, friction, stop_speed):
+        self.max_speed = max_speed
+        self.accelerate = accelerate
+        self.friction = friction
+        self.stop_speed = stop_speed
+
+    def set_wish(self, wish_x, wish_y):
+        """Sets the wish direction from the held keys."""
+        self.wish_x = wish_x
+        self.wish_y = wish_y
+
+    def reset(self):
+        self.vx = self.vy = 0.0
+        self.prev_speed = self.speed = 0.0
+        self._last_time = None
+        self._accumulator = 0.0
+
+    def _step(self):
+        """Integrates one fixed step. Returns False if the velocity didn't change."""
+        dt = self.step
+        vx = self.vx
+        vy = self.vy
+
+        # Friction
+        speed = math.hypot(vx, vy)
+        if speed > 0.0:
+            control = speed if speed > self.stop_speed else self.stop_speed
+            new_speed = max(speed - control * self.friction * dt, 0.0)
+            scale = new_speed / speed
+            vx *= scale
+            vy *= scale
+
+        # Acceleration towards the wish direction
+        wx = self.wish_x
+        wy = self.wish_y
+        if wx or wy:
+            norm = math.hypot(wx, wy)
+            wx /= norm
+            wy /= norm
+            add_speed = self.max_speed - (vx * wx + vy * wy)
+            if add_speed > 0.0:
+                accel_speed = min(self.accelerate * dt * self.max_speed, add_speed)
+                vx += accel_speed * wx
+                vy += accel_speed * wy
+
+        changed = vx != self.vx or vy != self.vy
+        self.vx = vx
+        self.vy = vy
+        return changed
+
+    def advance(self, now):
+        """Runs the fixed steps due by now (seconds) and returns the interpolated speed."""
+        if self._last_time is None:
+            self._last_time = now
+            return self.speed
+        self._accumulator += now - self._last_time
+        self._last_time = now
+        steps = int(self._accumulator / self.step)
+        if steps:
+            self._accumulator -= steps * self.step
+            if steps > self.max_steps:
+                steps = self.max_steps
+                self._accumulator = 0.0 # Drop the rest of a long hitch
+            for _ in range(steps):
+                self.prev_speed = math.hypot(self.vx, self.vy)
+                self.steps_run += 1
+                if not self._step():
+                    self.prev_speed = math.hypot(self.vx, self.vy) # Settled; later steps change nothing
+                    break
+        current = math.hypot(self.vx, self.vy)
+        alpha = self._accumulator / self.step
+        self.speed = self.prev_speed + (current - self.prev_speed) * alpha
+        return self.speed
+
+    def spread_fraction(self, accurate_fraction=0.34):
+        """Maps the speed to 0-1: 0 at or below the accurate speed, 1 at max speed."""
+        accurate_speed = self.max_speed * accurate_fraction
+        if self.speed <= accurate_speed:
+            return 0.0
+        return min((self.speed - accurate_speed) / (self.max_speed - accurate_speed), 1.0)
@@ -0,0 +1,402 @@
+"""Renders crosshair previews offline by replaying an input trace through CrosshairModel.
+
+Examples:
+    python offline_render.py -o preview.gif
+    python offline_render.py --preset T-Style --trace session.jsonl -o t_style.gif
+    python offline_render.py --all-presets -o previews
+    python offline_render.py --preset Default --format png -o default_frames
+
+A trace is a JSON Lines file of timestamped input events (the overlay writes one when
+"input_record_path" is set):
+    {"t": 0.0, "key": "moveright", "down": true}
+    {"t": 12.5, "button": "left", "down": true}
+    {"t": 40.0, "mouse_speed": 1800}
+Times are in milliseconds. Keys are actions (see key_bindings.py); traces recorded with
+key names use the default bindings. Without --trace a built-in synthetic trace is used.
+
+The spread animation is simulated in this process; the frames are drawn and encoded
+(GIF or a PNG sequence, both with the standard library only) on a process pool, so a
+whole preset library renders in one batch.
+"""
+import argparse
+import json
+import math
+import os
+import re
+import struct
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from crosshair_model import CrosshairModel, CROSSHAIR_DEFAULTS
+from key_bindings import KeyBindings, DEFAULT_KEY_BINDINGS, MODEL_ACTIONS
+from preset_store import PresetStore
+from scene import Scene
+
+FRAMES_PER_TASK = 25 # Frames drawn and encoded per pool task
+
+def synthetic_trace():
+    """Returns a short trace covering strafing, a counter-strafe, a spray and a mouse flick."""
+    events = []
+    def key(t, name, down):
+        events.append({"t": t, "key": name, "down": down})
+    def button(t, name, down):
+        events.append({"t": t, "button": name, "down": down})
+    key(200, "moveright", True) # Strafe right
+    key(900, "moveright", False) # Counter-strafe, well timed
+    key(905, "moveleft", True)
+    key(990, "moveleft", False)
+    button(1300, "left", True) # Standing spray
+    button(1900, "left", False)
+    key(2300, "forward", True) # Run and gun
+    button(2700, "left", True)
+    button(2900, "left", False)
+    key(3100, "forward", False)
+    for i, speed in enumerate((800, 2500, 4000, 2500, 800, 0)): # Mouse flick
+        events.append({"t": 3500 + 40 * i, "mouse_speed": speed})
+    return events
+
+def load_trace(path):
+    """Reads a JSON Lines trace, skipping malformed lines. Returns events sorted by time."""
+    events = []
+    with open(path) as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+                event["t"] = float(event["t"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            events.append(event)
+    events.sort(key=lambda event: event["t"])
+    if events:
+        start = events[0]["t"]
+        for event in events:
+            event["t"] -= start
+    return events
+
+def simulate(model, events, fps, duration):
+    """Replays events through a configured CrosshairModel. Returns (recoil, jitter x, jitter y, spread) per frame."""
+    model.spread_spring.snap(0.0, 0.0) # Simulated time starts at zero
+    model.recoil_spring.snap(0.0, 0.0)
+    frames = []
+    mouse_speed = 0.0 if model.mouse_spread_enabled else None
+    bindings = KeyBindings(resolver=lambda name: name) # Only maps key names to actions
+    bindings.compile(DEFAULT_KEY_BINDINGS)
+    i = 0
+    for n in range(int(duration * fps)):
+        now = n / fps
+        while i < len(events) and events[i]["t"] <= now * 1000:
+            event = events[i]
+            i += 1
+            t_ns = int(event["t"] * 1_000_000)
+            if "key" in event:
+                action = bindings.action_for(event["key"])
+                if action is None or action not in MODEL_ACTIONS:
+                    continue
+                if event.get("down", True):
+                    model.press_action(action, t_ns)
+                else:
+                    model.release_action(action, t_ns)
+            elif "button" in event:
+                model.set_mouse_button(event["button"], event.get("down", True), t_ns / 1_000_000_000)
+            elif "mouse_speed" in event and mouse_speed is not None:
+                mouse_speed = float(event["mouse_speed"])
+        model.advance(now, mouse_speed)
+        frame = model.frame
+        frames.append((frame.recoil_offset, int(frame.jitter_x), int(frame.jitter_y), frame.current_spread_offset))
+    return frames
+
+def _hex_to_rgb(color):
+    """Converts "#rrggbb" to bytes. Tk color names aren't known here and render white."""
+    if isinstance(color, str) and len(color) == 7 and color[0] == "#":
+        return bytes.fromhex(color[1:])
+    return b"\xff\xff\xff"
+
+def _fill_rect(buf, width, height, x0, y0, x1, y1, rgb):
+    """Fills the pixels in [x0, x1) x [y0, y1), clipped to the image."""
+    x0 = max(x0, 0)
+    y0 = max(y0, 0)
+    x1 = min(x1, width)
+    y1 = min(y1, height)
+    if x0 >= x1:
+        return
+    span = rgb * (x1 - x0)
+    for y in range(y0, y1):
+        start = (y * width + x0) * 3
+        buf[start:start + len(span)] = span
+
+def _draw_segment(buf, width, height, x0, y0, x1, y1, stroke, rgb):
+    """Draws a line segment of the given width with butt caps, like a Tk canvas line."""
+    half = stroke / 2
+    if y0 == y1:
+        _fill_rect(buf, width, height, round(min(x0, x1)), round(y0 - half),
+                   round(max(x0, x1)), round(y0 - half) + stroke, rgb)
+        return
+    if x0 == x1:
+        _fill_rect(buf, width, height, round(x0 - half), round(min(y0, y1)),
+                   round(x0 - half) + stroke, round(max(y0, y1)), rgb)
+        return
+    dx = x1 - x0
+    dy = y1 - y0
+    length_sq = dx * dx + dy * dy
+    for y in range(max(int(min(y0, y1) - half), 0), min(int(max(y0, y1) + half) + 1, height)):
+        py = y + 0.5
+        for x in range(max(int(min(x0, x1) - half), 0), min(int(max(x0, x1) + half) + 1, width)):
+            px = x + 0.5
+            t = ((px - x0) * dx + (py - y0) * dy) / length_sq
+            if 0.0 <= t <= 1.0:
+                ex = px - x0 - t * dx
+                ey = py - y0 - t * dy
+                if ex * ex + ey * ey <= half * half:
+                    start = (y * width + x) * 3
+                    buf[start:start + 3] = rgb
+
+def _draw_ring(buf, width, height, cx, cy, radius, stroke, rgb):
+    """Draws a circle outline of the given width."""
+    half = stroke / 2
+    outer = radius + half
+    for y in range(max(int(cy - outer), 0), min(int(cy + outer) + 1, height)):
+        py = y + 0.5 - cy
+        for x in range(max(int(cx - outer), 0), min(int(cx + outer) + 1, width)):
+            if abs(math.hypot(x + 0.5 - cx, py) - radius) <= half:
+                start = (y * width + x) * 3
+                buf[start:start + 3] = rgb
+
+def _draw_layer(buf, width, height, layer, outline):
+    """Draws one layer's primitives the way CanvasSceneView's canvas items would look."""
+    options = layer.item_options(outline)
+    for shape in layer.shapes:
+        if layer.canvas_type == "line":
+            rgb = _hex_to_rgb(options["fill"])
+            for i in range(0, len(shape) - 2, 2):
+                _draw_segment(buf, width, height, shape[i], shape[i + 1], shape[i + 2], shape[i + 3],
+                              options["width"], rgb)
+        elif layer.canvas_type == "rectangle":
+            x0, y0, x1, y1 = (round(v) for v in shape)
+            if options.get("fill"):
+                _fill_rect(buf, width, height, x0, y0, x1, y1, _hex_to_rgb(options["fill"]))
+            if options.get("outline"):
+                rgb = _hex_to_rgb(options["outline"])
+                w = options["width"]
+                h = w // 2
+                _fill_rect(buf, width, height, x0 - h, y0 - h, x1 + w - h, y0 + w - h, rgb)
+                _fill_rect(buf, width, height, x0 - h, y1 - h, x1 + w - h, y1 + w - h, rgb)
+                _fill_rect(buf, width, height, x0 - h, y0 - h, x0 + w - h, y1 + w - h, rgb)
+                _fill_rect(buf, width, height, x1 - h, y0 - h, x1 + w - h, y1 + w - h, rgb)
+        elif layer.canvas_type == "oval" and options.get("outline"):
+            x0, y0, x1, y1 = shape
+            _draw_ring(buf, width, height, (x0 + x1) / 2, (y0 + y1) / 2, (x1 - x0) / 2,
+                       options["width"], _hex_to_rgb(options["outline"]))
+
+def _encode_png(buf, width, height):
+    """Encodes an RGB buffer as a PNG file."""
+    row = width * 3
+    raw = b"".join(b"\x00" + buf[y * row:(y + 1) * row] for y in range(height))
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b""))
+
+def _lzw_encode(indices, min_code_size):
+    """GIF-flavoured LZW compression of palette indices."""
+    clear = 1 << min_code_size
+    end = clear + 1
+    size = min_code_size + 1
+    next_code = end + 1
+    table = {}
+    out = bytearray()
+    bits = 0
+    nbits = 0
+
+    def emit(code):
+        nonlocal bits, nbits
+        bits |= code << nbits
+        nbits += size
+        while nbits >= 8:
+            out.append(bits & 0xFF)
+            bits >>= 8
+            nbits -= 8
+
+    emit(clear)
+    prefix = indices[0]
+    for k in indices[1:]:
+        key = (prefix << 8) | k
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        emit(prefix)
+        if next_code < 4096:
+            table[key] = next_code
+            if next_code == 1 << size and size < 12:
+                size += 1
+            next_code += 1
+        else:
+            emit(clear) # Table full; start over
+            table.clear()
+            size = min_code_size + 1
+            next_code = end + 1
+        prefix = k
+    emit(prefix)
+    emit(end)
+    if nbits:
+        out.append(bits & 0xFF)
+    return bytes(out)
+
+def _encode_gif_frame(buf, width, height):
+    """Returns (color table, min code size, LZW data) for one frame with its own palette."""
+    palette = {}
+    indices = bytearray(width * height)
+    for i in range(width * height):
+        rgb = bytes(buf[3 * i:3 * i + 3])
+        index = palette.get(rgb)
+        if index is None:
+            if len(palette) == 256:
+                index = 0 # More colors than a GIF frame can hold; shouldn't happen for crosshairs
+            else:
+                index = palette[rgb] = len(palette)
+        indices[i] = index
+    table_bits = max(1, (len(palette) - 1).bit_length())
+    colors = b"".join(palette) + b"\x00" * (3 * ((1 << table_bits) - len(palette)))
+    min_code_size = max(2, table_bits)
+    return colors, table_bits, min_code_size, _lzw_encode(indices, min_code_size)
+
+def render_frames(layers, defaults, size, background, frames, image_format):
+    """Pool task: draws frames (see simulate()) and returns them encoded."""
+    scene = Scene(layers, defaults)
+    blank = bytearray(_hex_to_rgb(background) * (size * size))
+    center = size // 2
+    encoded = []
+    for recoil, jitter_x, jitter_y, spread in frames:
+        scene.update(center, center, recoil, jitter_x, jitter_y, spread)
+        buf = bytearray(blank)
+        for layer in scene.layers:
+            if layer.outline:
+                _draw_layer(buf, size, size, layer, True)
+            _draw_layer(buf, size, size, layer, False)
+        if image_format == "png":
+            encoded.append(_encode_png(buf, size, size))
+        else:
+            encoded.append(_encode_gif_frame(buf, size, size))
+    return encoded
+
+def write_gif(path, encoded, size, fps):
+    """Writes encoded frames as a looping animated GIF."""
+    delay = max(round(100 / fps), 2) # Hundredths of a second; most viewers clamp lower values
+    with open(path, "wb") as f:
+        f.write(b"GIF89a" + struct.pack("<HHBBB", size, size, 0, 0, 0))
+        f.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00") # Loop forever
+        for colors, table_bits, min_code_size, data in encoded:
+            f.write(b"\x21\xf9\x04\x00" + struct.pack("<H", delay) + b"\x00\x00")
+            f.write(b"\x2c" + struct.pack("<HHHHB", 0, 0, size, size, 0x80 | (table_bits - 1)))
+            f.write(colors + bytes((min_code_size,)))
+            for i in range(0, len(data), 255):
+                block = data[i:i + 255]
+                f.write(bytes((len(block),)) + block)
+            f.write(b"\x00")
+        f.write(b"\x3b")
+
+def write_png_sequence(directory, encoded):
+    """Writes encoded frames as frame_0000.png, frame_0001.png, ... in a directory."""
+    os.makedirs(directory, exist_ok=True)
+    for i, data in enumerate(encoded):
+        with open(os.path.join(directory, f"frame_{i:04d}.png"), "wb") as f:
+            f.write(data)
+
+def preset_config(base, preset):
+    """Applies a preset on top of a base config, the way the overlay selects presets."""
+    config = dict(base)
+    config.update(preset)
+    if "layers" not in preset:
+        config.pop("layers", None) # Presets without layers use the classic cross
+    return config
+
+def render_batch(jobs, events, output, image_format="gif", fps=50, duration=None, size=160,
+                 background="#303030", workers=None):
+    """Renders each (name, config) job to its own output. Returns the paths written.
+
+    All jobs share one process pool, so frames of different presets render in parallel.
+    """
+    if duration is None:
+        duration = (events[-1]["t"] / 1000 + 0.5) if events else 2.0
+    single = len(jobs) == 1
+    if not single:
+        os.makedirs(output, exist_ok=True)
+    pending = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name, config in jobs:
+            model = CrosshairModel()
+            model.apply_crosshair_config(config)
+            frames = simulate(model, events, fps, duration)
+            futures = [pool.submit(render_frames, model.layers, model.scene_defaults(), size, background,
+                                   frames[i:i + FRAMES_PER_TASK], image_format)
+                       for i in range(0, len(frames), FRAMES_PER_TASK)]
+            if single:
+                path = output
+            else:
+                safe_name = re.sub(r"[^\w\-]+", "_", name).strip("_") or "preset"
+                path = os.path.join(output, safe_name + (".gif" if image_format == "gif" else ""))
+            pending.append((path, futures))
+        written = []
+        for path, futures in pending:
+            encoded = [frame for future in futures for frame in future.result()]
+            if image_format == "gif":
+                write_gif(path, encoded, size, fps)
+            else:
+                write_png_sequence(path, encoded)
+            written.append(path)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Render crosshair previews from an input trace.")
+    parser.add_argument("--config", default="config.json", help="Base config (defaults are used if missing)")
+    parser.add_argument("--presets-db", default="presets.db", help="Preset library")
+    parser.add_argument("--preset", action="append", default=[], help="Preset to render (repeatable)")
+    parser.add_argument("--all-presets", action="store_true", help="Render every preset in the library")
+    parser.add_argument("--trace", help="JSON Lines input trace (default: built-in synthetic trace)")
+    parser.add_argument("--format", choices=("gif", "png"), default="gif", help="Animated GIF or PNG sequence")
+    parser.add_argument("--fps", type=int, default=50, help="Frames per second")
+    parser.add_argument("--duration", type=float, help="Seconds to render (default: trace length + 0.5 s)")
+    parser.add_argument("--size", type=int, default=160, help="Image width and height in pixels")
+    parser.add_argument("--background", default="#303030", help="Background color")
+    parser.add_argument("--workers", type=int, help="Render processes (default: CPU count)")
+    parser.add_argument("-o", "--output", help="Output file or directory")
+    args = parser.parse_args()
+
+    base = dict(CROSSHAIR_DEFAULTS)
+    if os.path.exists(args.config):
+        with open(args.config) as f:
+            base.update(json.load(f))
+
+    jobs = []
+    if args.preset or args.all_presets:
+        store = PresetStore(args.presets_db)
+        try:
+            names = store.names() if args.all_presets else args.preset
+            for name in names:
+                preset = store.get(name)
+                if preset is None:
+                    print(f"Unknown preset: {name}", file=sys.stderr)
+                    return 1
+                jobs.append((name, preset_config(base, preset)))
+        finally:
+            store.close()
+        if not jobs:
+            print("No presets to render.", file=sys.stderr)
+            return 1
+    else:
+        jobs.append(("config", base))
+
+    events = load_trace(args.trace) if args.trace else synthetic_trace()
+    output = args.output
+    if output is None:
+        output = "preview.gif" if len(jobs) == 1 and args.format == "gif" else "previews"
+    for path in render_batch(jobs, events, output, args.format, args.fps, args.duration, args.size,
+                             args.background, args.workers):
+        print(path)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import json
+import sqlite3
+import threading
+import time
+
+class PresetStore:
+    """SQLite-backed preset library.
+
+    Saving a preset writes only that row, listing and searching never parse preset
+    bodies, and a body is only decoded when that preset is applied. `defaults` ({name: body})
+    are imported the first time a database is opened with them, tracked by its user_version.
+    """
+
+    SEEDED_VERSION = 1 # user_version once the default presets have been imported
+
+    def __init__(self, path="presets.db", defaults=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL") # WAL commits without an fsync per write
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS presets ("
+                " name TEXT PRIMARY KEY,"
+                " tags TEXT NOT NULL DEFAULT '',"
+                " body TEXT NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+            if defaults and self._conn.execute("PRAGMA user_version").fetchone()[0] < self.SEEDED_VERSION:
+                self._insert_missing(defaults)
+                self._conn.execute(f"PRAGMA user_version = {self.SEEDED_VERSION}")
+
+    @staticmethod
+    def _normalize_tags(tags):
+        """Stores tags as ',tag1,tag2,' so single tags can be matched exactly."""
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        cleaned = sorted({tag.strip().lower() for tag in tags or [] if tag.strip()})
+        return f",{','.join(cleaned)}," if cleaned else ""
+
+    def names(self):
+        """Returns all preset names in alphabetical order."""
+        with self._lock:
+            rows = self._conn.execute("SELECT name FROM presets ORDER BY name COLLATE NOCASE").fetchall()
+        return [row[0] for row in rows]
+
+    def get(self, name):
+        """Loads one preset body, or returns None if it doesn't exist."""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM presets WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_tags(self, name):
+        """Returns the tags of a preset as a list."""
+        with self._lock:
+            row = self._conn.execute("SELECT tags FROM presets WHERE name = ?", (name,)).fetchone()
+        return [tag for tag in row[0].split(",") if tag] if row else []
+
+    def put(self, name, preset, tags=None):
+        """Inserts or replaces one preset. Existing tags are kept when tags is None."""
+        body = json.dumps(preset)
+        with self._lock, self._conn:
+            if tags is None:
+                self._conn.execute(
+                    "INSERT INTO presets (name, body, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET body = excluded.body, updated = excluded.updated",
+                    (name, body, time.time()))
+            else:
+                self._conn.execute(
+                    "INSERT INTO presets (name, tags, body, updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET tags = excluded.tags, body = excluded.body, "
+                    "updated = excluded.updated",
+                    (name, self._normalize_tags(tags), body, time.time()))
+
+    def delete(self, name):
+        """Removes a preset."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM presets WHERE name = ?", (name,))
+
+    def import_presets(self, presets):
+        """Adds presets from a {name: body} dict, leaving presets that already exist untouched."""
+        with self._lock, self._conn:
+            self._insert_missing(presets)
+
+    def _insert_missing(self, presets):
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO presets (name, body, updated) VALUES (?, ?, ?)",
+            [(name, json.dumps(body), now) for name, body in presets.items()])
+
+    def search(self, query, limit=200):
+        """Returns preset names whose name contains query or that have a tag starting with it."""
+        query = query.strip().lower()
+        if not query:
+            return self.names()[:limit]
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM presets WHERE name LIKE ? ESCAPE '\\' OR tags LIKE ? ESCAPE '\\' "
+                "ORDER BY name COLLATE NOCASE LIMIT ?",
+                (f"%{escaped}%", f"%,{escaped}%", limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,81 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+
+class ProfilerCapture:
+    """On-demand cProfile capture of the Tk thread and the pynput hook threads.
+
+    The Tk thread (frame loop, drawing, menu handlers) is profiled with enable()/disable().
+    Hook callbacks run on pynput threads, so each one is run through a per-thread profile
+    with runcall() while a capture is active. When idle, the only cost is checking `active`.
+    From Python 3.12 cProfile runs on sys.monitoring, which allows one profile per
+    interpreter: the enable() profile then sees every thread and runcall() just calls through.
+    """
+
+    PER_THREAD = sys.version_info < (3, 12)
+
+    def __init__(self):
+        self.active = False
+        self.started_at = None
+        self._main_profile = None
+        self._thread_profiles = {} # thread ident -> cProfile.Profile
+        self.thread_count = 0 # Threads that contributed to the last capture
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts a capture. Must be called on the Tk thread."""
+        if self.active:
+            return
+        self._thread_profiles = {}
+        self._main_profile = cProfile.Profile()
+        self.started_at = time.time()
+        self._main_profile.enable()
+        self.active = True
+
+    def runcall(self, fn, *args):
+        """Runs a hook callback under the calling thread's profile."""
+        if not self.PER_THREAD:
+            return fn(*args) # Already seen by the interpreter-wide profile
+        ident = threading.get_ident()
+        profile = self._thread_profiles.get(ident)
+        if profile is None:
+            with self._lock:
+                profile = self._thread_profiles.setdefault(ident, cProfile.Profile())
+        return profile.runcall(fn, *args)
+
+    def stop(self):
+        """Ends the capture and returns the merged pstats.Stats. Must be called on the Tk thread."""
+        self.active = False
+        self._main_profile.disable()
+        stats = pstats.Stats(self._main_profile)
+        with self._lock:
+            thread_profiles = list(self._thread_profiles.values())
+            self._thread_profiles = {}
+        for profile in thread_profiles:
+            try:
+                stats.add(profile)
+            except TypeError:
+                pass # A profile that never recorded a call
+        self.thread_count = 1 + len(thread_profiles) if self.PER_THREAD else threading.active_count()
+        return stats
+
+def write_capture(stats, output_dir, started_at, duration, thread_count, top_n=30):
+    """Writes the capture as a .pstats file plus a text top-N summary. Returns the .pstats path."""
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, time.strftime("crosshair-%Y%m%d-%H%M%S", time.localtime(started_at)))
+    stats.dump_stats(base + ".pstats")
+
+    summary = io.StringIO()
+    summary.write(f"Crosshair overlay profile: {duration:.1f}s, {thread_count} thread(s)\n\n")
+    stats.stream = summary
+    summary.write(f"Top {top_n} by cumulative time\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+    summary.write(f"\nTop {top_n} by internal time\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top_n)
+    with open(base + ".txt", "w") as f:
+        f.write(summary.getvalue())
+    return base + ".pstats"
@@ -0,0 +1,157 @@
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Events a spread curve can respond to
+CURVE_EVENTS = ("shot", "counter_strafe", "move_start", "move_stop", "crouch")
+
+MAX_TABLE_SIZE = 4096 # Longer curves are evaluated by bisecting their keyframes instead
+
+class SpreadCurve:
+    """A piecewise-linear curve of extra spread (px) versus time since its event (ms).
+
+    The keyframes are [time_ms, spread_px] pairs. Before the first keyframe the curve holds
+    its first value and after the last one its last value. At compile time the curve is
+    sampled every `resolution_ms` into a dense table, so evaluating it is one index
+    computation however many keyframes it has; curves too long for MAX_TABLE_SIZE
+    entries fall back to a bisect over the keyframes.
+    """
+
+    __slots__ = ('times', 'values', 'duration', 'end_value', 'inv_resolution', 'table')
+
+    def __init__(self, keyframes, resolution_ms=1.0):
+        points = sorted((float(t), float(v)) for t, v in keyframes)
+        if not points or points[0][0] < 0:
+            raise ValueError("a spread curve needs keyframes at non-negative times")
+        self.times = [t for t, _ in points]
+        self.values = [v for _, v in points]
+        self.duration = self.times[-1]
+        self.end_value = self.values[-1]
+        self.inv_resolution = 1.0 / resolution_ms
+        steps = int(self.duration * self.inv_resolution) + 1
+        if steps <= MAX_TABLE_SIZE:
+            self.table = [self.interpolate(i * resolution_ms) for i in range(steps)]
+        else:
+            self.table = None
+
+    def interpolate(self, t_ms):
+        """Evaluates the curve from its keyframes (O(log n))."""
+        times = self.times
+        i = bisect.bisect_right(times, t_ms)
+        if i == 0:
+            return self.values[0]
+        if i == len(times):
+            return self.end_value
+        t0, t1 = times[i - 1], times[i]
+        v0, v1 = self.values[i - 1], self.values[i]
+        return v0 + (v1 - v0) * (t_ms - t0) / (t1 - t0)
+
+    def evaluate(self, t_ms):
+        """Returns the spread t_ms after the event (O(1) for tabled curves)."""
+        if t_ms >= self.duration:
+            return self.end_value
+        if t_ms < 0:
+            return self.values[0]
+        if self.table is not None:
+            return self.table[int(t_ms * self.inv_resolution)]
+        return self.interpolate(t_ms)
+
+class SpreadCurves:
+    """The compiled curves of a config and the events currently driving them.
+
+    trigger() restarts an event's curve; sample() adds up the active curves. A curve stops
+    being sampled once it has run past its last keyframe with a final value of zero.
+    trigger() runs on the input hook threads while sample() runs on the Tk thread, so
+    sample() iterates over a snapshot of the active events and never assumes they stay.
+    """
+
+    def __init__(self):
+        self.curves = {} # event -> SpreadCurve
+        self.active = {} # event -> time (s) it last fired
+
+    def compile(self, spec, resolution_ms=1.0):
+        """Compiles {event: [[time_ms, spread_px], ...]}. Invalid curves are skipped and logged."""
+        curves = {}
+        for event, keyframes in spec.items():
+            if event not in CURVE_EVENTS:
+                logger.error("Unknown spread curve event %r (expected one of %s).", event, ", ".join(CURVE_EVENTS))
+                continue
+            try:
+                curves[event] = SpreadCurve(keyframes, resolution_ms)
+            except (TypeError, ValueError) as e:
+                logger.error("Invalid spread curve for %s: %s", event, e)
+        self.curves = curves
+        self.active = {}
+
+    def trigger(self, event, now):
+        """Starts (or restarts) the curve for an event at time now (seconds)."""
+        if event in self.curves:
+            self.active[event] = now
+
+    def sample(self, now):
+        """Returns the total extra spread from the active curves at time now (seconds)."""
+        total = 0.0
+        finished = None
+        curves = self.curves
+        for event, start in tuple(self.active.items()):
+            curve = curves.get(event)
+            if curve is None:
+                continue # Recompiled since the snapshot
+            t_ms = (now - start) * 1000
+            if t_ms < 0:
+                continue # Fired after this frame's timestamp
+            total += curve.evaluate(t_ms)
+            if t_ms >= curve.duration and not curve.end_value:
+                finished = finished or []
+                finished.append(event)
+        if finished:
+            active = self.active
+            for event in finished:
+                start = active.get(event)
+                # Leave it if a hook thread re-fired it since the snapshot
+                if start is not None and (now - start) * 1000 >= curves[event].duration:
+                    active.pop(event, None)
+        return total
+
+if __name__ == "__main__":
+    curve = SpreadCurve([[0, 8], [50, 12], [400, 0]])
+    assert curve.table is not None and len(curve.table) == 401
+    for t in (0, 10, 49.5, 50, 123.4, 399.9, 400, 1000):
+        assert abs(curve.evaluate(t) - curve.interpolate(t)) < 0.05, t
+    assert curve.evaluate(25) == 10.0 and curve.evaluate(-5) == 8.0 and curve.evaluate(500) == 0.0
+
+    long_curve = SpreadCurve([[0, 4], [10_000, 0]]) # Too long to table
+    assert long_curve.table is None and long_curve.evaluate(5_000) == 2.0
+
+    curves = SpreadCurves()
+    curves.compile({"shot": [[0, 8], [50, 12], [400, 0]], "move_stop": [[0, 3], [100, 3]], "jump": [[0, 1]]})
+    assert sorted(curves.curves) == ["move_stop", "shot"]
+    curves.trigger("shot", 1.0)
+    curves.trigger("move_stop", 1.0)
+    curves.trigger("crouch", 1.0) # No curve for it
+    assert abs(curves.sample(1.025) - 13.0) < 0.1 # Within one table step
+    assert curves.sample(2.0) == 3.0 and list(curves.active) == ["move_stop"] # The shot curve ended at zero
+
+    import threading
+    curves.compile({"shot": [[0, 8], [5, 0]], "crouch": [[0, 2], [5, 0]]})
+    errors = []
+    stop = threading.Event()
+    def fire():
+        t = 0.0
+        while not stop.is_set():
+            t += 0.001
+            curves.trigger("shot", t)
+            curves.trigger("crouch", t)
+    firing = threading.Thread(target=fire)
+    firing.start()
+    try:
+        for i in range(50_000):
+            curves.sample(i * 0.01)
+    except RuntimeError as e:
+        errors.append(e)
+    finally:
+        stop.set()
+        firing.join()
+    assert not errors, errors
+    print("Spread curve checks passed.")
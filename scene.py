@@ -0,0 +1,370 @@
+import math
+
+DEFAULT_LAYERS = [{"type": "cross"}] # Used when a config or preset defines no layers
+
+RING_RECTS = 32 # Squares approximating a circle layer in the X11 window shape
+_RING_COS = tuple(math.cos(2 * math.pi * i / RING_RECTS) for i in range(RING_RECTS))
+_RING_SIN = tuple(math.sin(2 * math.pi * i / RING_RECTS) for i in range(RING_RECTS))
+
+def color_to_hex(color, default):
+    """Converts an [R, G, B(, A)] list to a Tk color string. Strings are passed through."""
+    if color is None:
+        return default
+    if isinstance(color, str):
+        return color
+    return f'#{int(color[0]):02x}{int(color[1]):02x}{int(color[2]):02x}'
+
+def _segment_rect(segment, rect, stroke):
+    """Stores the (x, y, width, height) rectangle covering an axis-aligned segment's stroke in rect."""
+    x0, y0, x1, y1 = segment
+    half = stroke // 2
+    if y0 == y1:
+        rect[0] = int(min(x0, x1))
+        rect[1] = int(y0) - half
+        rect[2] = int(abs(x1 - x0)) + 1
+        rect[3] = stroke + 1
+    else:
+        rect[0] = int(x0) - half
+        rect[1] = int(min(y0, y1))
+        rect[2] = stroke + 1
+        rect[3] = int(abs(y1 - y0)) + 1
+
+class Layer:
+    """One declarative crosshair layer compiled into a fixed set of primitives.
+
+    Each primitive's coordinates live in a list that is rewritten in place, and the
+    layer remembers the inputs it was last computed for, so a frame that doesn't move
+    this layer costs one comparison. Subclasses fill in compute() and compute_rects().
+
+    Common spec keys: color, thickness, outline, outline_color, outline_thickness,
+    spread (multiplier on the animated spread offset), follow_recoil, follow_jitter,
+    and offset ([dx, dy] from the screen center).
+    """
+
+    canvas_type = "line" # Canvas item type used for each primitive
+    default_spread = 1.0
+
+    __slots__ = ('color', 'thickness', 'outline', 'outline_color', 'outline_thickness', 'stroke',
+                 'spread', 'follow_recoil', 'follow_jitter', 'offset_x', 'offset_y',
+                 'shapes', 'rects', 'dirty', '_x', '_y', '_s')
+
+    def __init__(self, spec, defaults):
+        self.color = color_to_hex(spec.get("color"), defaults["color"])
+        self.thickness = int(spec.get("thickness", defaults["thickness"]))
+        self.outline = bool(spec.get("outline", defaults["outline"]))
+        self.outline_color = color_to_hex(spec.get("outline_color"), defaults["outline_color"])
+        self.outline_thickness = int(spec.get("outline_thickness", defaults["outline_thickness"]))
+        # Pixels covered by the widest stroke, used for the X11 window shape
+        self.stroke = max(self.thickness, self.outline_thickness) if self.outline else self.thickness
+        self.spread = float(spec.get("spread", self.default_spread))
+        self.follow_recoil = bool(spec.get("follow_recoil", True))
+        self.follow_jitter = bool(spec.get("follow_jitter", True))
+        offset = spec.get("offset", (0, 0))
+        self.offset_x = offset[0]
+        self.offset_y = offset[1]
+        self.shapes = [[0.0] * size for size in self._shape_sizes()]
+        self.rects = [[0, 0, 0, 0] for _ in range(self._rect_count())]
+        self.dirty = False # Set when the geometry changed and the canvas items need new coords
+        self.invalidate()
+
+    def _shape_sizes(self):
+        """Returns the number of coordinates of each primitive."""
+        raise NotImplementedError
+
+    def _rect_count(self):
+        """Returns the number of shape rectangles the layer produces."""
+        return len(self.shapes)
+
+    def invalidate(self):
+        """Forces the next update() to recompute the geometry."""
+        self._x = None
+        self._y = None
+        self._s = None
+
+    def update(self, center_x, center_y, recoil, jitter_x, jitter_y, spread_offset, with_rects=False):
+        """Recomputes the geometry if this layer's inputs changed. Returns True if it did."""
+        x = center_x + self.offset_x
+        y = center_y + self.offset_y
+        if self.follow_recoil:
+            y += recoil
+        if self.follow_jitter:
+            x += jitter_x
+            y += jitter_y
+        s = self.spread * spread_offset
+        if x == self._x and y == self._y and s == self._s:
+            return False
+        self._x = x
+        self._y = y
+        self._s = s
+        self.compute(x, y, s)
+        if with_rects:
+            self.compute_rects()
+        self.dirty = True
+        return True
+
+    def compute(self, x, y, spread):
+        raise NotImplementedError
+
+    def compute_rects(self):
+        raise NotImplementedError
+
+    def item_options(self, outline):
+        """Returns the canvas item options for the main primitives or their outline."""
+        if outline:
+            return {"fill": self.outline_color, "width": self.outline_thickness}
+        return {"fill": self.color, "width": self.thickness}
+
+class CrossLayer(Layer):
+    """Classic four-arm cross. Spec keys: gap, length, dynamic_length."""
+
+    ARMS = ((-1, 0), (1, 0), (0, -1), (0, 1)) # Left, right, top, bottom
+
+    __slots__ = ('gap', 'length', 'dynamic_length')
+
+    def __init__(self, spec, defaults):
+        self.gap = spec.get("gap", defaults["gap"])
+        self.length = spec.get("length", defaults["length"])
+        self.dynamic_length = bool(spec.get("dynamic_length", defaults["dynamic_length"]))
+        super().__init__(spec, defaults)
+
+    def _shape_sizes(self):
+        return [4] * len(self.ARMS)
+
+    def compute(self, x, y, spread):
+        gap = self.gap + spread
+        outer = gap + (self.length + spread if self.dynamic_length else self.length)
+        for segment, (dx, dy) in zip(self.shapes, self.ARMS):
+            segment[0] = x + dx * gap
+            segment[1] = y + dy * gap
+            segment[2] = x + dx * outer
+            segment[3] = y + dy * outer
+
+    def compute_rects(self):
+        for segment, rect in zip(self.shapes, self.rects):
+            _segment_rect(segment, rect, self.stroke)
+
+class TLayer(CrossLayer):
+    """T-style cross without the top arm."""
+
+    ARMS = ((-1, 0), (1, 0), (0, 1)) # Left, right, bottom
+
+    __slots__ = ()
+
+class DotLayer(Layer):
+    """Filled square center dot. Spec key: size. Doesn't spread unless spread is set."""
+
+    canvas_type = "rectangle"
+    default_spread = 0.0
+
+    __slots__ = ('size',)
+
+    def __init__(self, spec, defaults):
+        self.size = spec.get("size", 2)
+        super().__init__(spec, defaults)
+
+    def _shape_sizes(self):
+        return [4]
+
+    def compute(self, x, y, spread):
+        half = (self.size + spread) / 2
+        box = self.shapes[0]
+        box[0] = x - half
+        box[1] = y - half
+        box[2] = x + half
+        box[3] = y + half
+
+    def compute_rects(self):
+        x0, y0, x1, y1 = self.shapes[0]
+        pad = self.outline_thickness // 2 + 1 if self.outline else 0
+        rect = self.rects[0]
+        rect[0] = int(x0) - pad
+        rect[1] = int(y0) - pad
+        rect[2] = int(x1 - x0) + 2 * pad + 1
+        rect[3] = int(y1 - y0) + 2 * pad + 1
+
+    def item_options(self, outline):
+        if outline:
+            return {"fill": "", "outline": self.outline_color, "width": self.outline_thickness}
+        return {"fill": self.color, "outline": ""}
+
+class CircleLayer(Layer):
+    """Ring around the center. Spec key: radius.
+
+    The X11 shape can only be built from rectangles, so the ring is covered by
+    RING_RECTS small squares placed along its circumference.
+    """
+
+    canvas_type = "oval"
+
+    __slots__ = ('radius',)
+
+    def __init__(self, spec, defaults):
+        self.radius = spec.get("radius", 8)
+        super().__init__(spec, defaults)
+
+    def _shape_sizes(self):
+        return [4]
+
+    def _rect_count(self):
+        return RING_RECTS
+
+    def compute(self, x, y, spread):
+        r = max(self.radius + spread, 0)
+        box = self.shapes[0]
+        box[0] = x - r
+        box[1] = y - r
+        box[2] = x + r
+        box[3] = y + r
+
+    def compute_rects(self):
+        x0, y0, x1, y1 = self.shapes[0]
+        cx = (x0 + x1) / 2
+        cy = (y0 + y1) / 2
+        r = (x1 - x0) / 2
+        # Each square spans its share of the circumference plus the stroke width
+        side = max(self.stroke, int(2 * math.pi * r / RING_RECTS) + 1) + 1
+        half = side // 2
+        for rect, c, s in zip(self.rects, _RING_COS, _RING_SIN):
+            rect[0] = int(cx + r * c) - half
+            rect[1] = int(cy + r * s) - half
+            rect[2] = side
+            rect[3] = side
+
+    def item_options(self, outline):
+        if outline:
+            return {"outline": self.outline_color, "width": self.outline_thickness, "fill": ""}
+        return {"outline": self.color, "width": self.thickness, "fill": ""}
+
+class PolylineLayer(Layer):
+    """Custom polyline. Spec keys: points ([[dx, dy], ...] from the center), closed.
+
+    Spread pushes each point away from the center along its own direction.
+    """
+
+    SUBDIVISIONS = 4 # Shape rectangles per segment, so diagonal segments are covered tightly
+
+    __slots__ = ('points', 'directions', 'closed')
+
+    def __init__(self, spec, defaults):
+        points = [(float(px), float(py)) for px, py in spec["points"]]
+        if len(points) < 2:
+            raise ValueError("a polyline layer needs at least two points")
+        self.closed = bool(spec.get("closed", False))
+        if self.closed:
+            points.append(points[0])
+        self.points = tuple(points)
+        self.directions = tuple((px / math.hypot(px, py), py / math.hypot(px, py)) if px or py else (0.0, 0.0)
+                                for px, py in points)
+        super().__init__(spec, defaults)
+
+    def _shape_sizes(self):
+        return [2 * len(self.points)]
+
+    def _rect_count(self):
+        return (len(self.points) - 1) * self.SUBDIVISIONS
+
+    def compute(self, x, y, spread):
+        flat = self.shapes[0]
+        i = 0
+        for (px, py), (ux, uy) in zip(self.points, self.directions):
+            flat[i] = x + px + ux * spread
+            flat[i + 1] = y + py + uy * spread
+            i += 2
+
+    def compute_rects(self):
+        flat = self.shapes[0]
+        half = self.stroke // 2
+        n = self.SUBDIVISIONS
+        for segment in range(len(self.points) - 1):
+            x0, y0, x1, y1 = flat[2 * segment:2 * segment + 4]
+            for k in range(n):
+                ax = x0 + (x1 - x0) * k / n
+                ay = y0 + (y1 - y0) * k / n
+                bx = x0 + (x1 - x0) * (k + 1) / n
+                by = y0 + (y1 - y0) * (k + 1) / n
+                rect = self.rects[segment * n + k]
+                rect[0] = int(min(ax, bx)) - half
+                rect[1] = int(min(ay, by)) - half
+                rect[2] = int(abs(bx - ax)) + self.stroke + 1
+                rect[3] = int(abs(by - ay)) + self.stroke + 1
+
+LAYER_TYPES = {
+    "cross": CrossLayer,
+    "t": TLayer,
+    "dot": DotLayer,
+    "circle": CircleLayer,
+    "polyline": PolylineLayer
+}
+
+class Scene:
+    """The compiled list of layers for one config, drawn in order (later layers on top).
+
+    `rects` holds every layer's shape rectangles; the inner lists are the layers' own,
+    so it always reflects the latest geometry without being rebuilt.
+    """
+
+    def __init__(self, specs, defaults, with_rects=False):
+        self.layers = []
+        if not isinstance(specs, (list, tuple)):
+            raise ValueError(f"layers must be a list, not {type(specs).__name__}")
+        for spec in specs:
+            if not isinstance(spec, dict):
+                raise ValueError(f"each layer must be an object, not {spec!r}")
+            layer_type = LAYER_TYPES.get(spec.get("type", "cross"))
+            if layer_type is None:
+                raise ValueError(f"unknown layer type {spec.get('type')!r}")
+            self.layers.append(layer_type(spec, defaults))
+        self.with_rects = with_rects
+        self.rects = [rect for layer in self.layers for rect in layer.rects]
+
+    def invalidate(self):
+        """Forces every layer to recompute on the next update."""
+        for layer in self.layers:
+            layer.invalidate()
+
+    def update(self, center_x, center_y, recoil, jitter_x, jitter_y, spread_offset):
+        """Updates the layers whose inputs changed. Returns True if any of them did."""
+        changed = False
+        for layer in self.layers:
+            if layer.update(center_x, center_y, recoil, jitter_x, jitter_y, spread_offset, self.with_rects):
+                changed = True
+        return changed
+
+class CanvasSceneView:
+    """Draws a Scene on a Tk canvas. Items are created once per scene and then only moved."""
+
+    def __init__(self, canvas, tag="crosshair"):
+        self.canvas = canvas
+        self.tag = tag
+        self._bindings = [] # (layer, outline item ids, main item ids)
+
+    def build(self, scene):
+        """Replaces the canvas items with hidden ones for the given scene."""
+        self.canvas.delete(self.tag)
+        self._bindings = []
+        for layer in scene.layers:
+            create = getattr(self.canvas, "create_" + layer.canvas_type)
+            outline_items = ()
+            if layer.outline:
+                options = layer.item_options(True)
+                outline_items = tuple(create(0, 0, 0, 0, state="hidden", tags=self.tag, **options)
+                                      for _ in layer.shapes)
+            options = layer.item_options(False)
+            items = tuple(create(0, 0, 0, 0, state="hidden", tags=self.tag, **options) for _ in layer.shapes)
+            self._bindings.append((layer, outline_items, items))
+        scene.invalidate()
+
+    def apply(self):
+        """Moves the items of layers whose geometry changed since the last call."""
+        coords = self.canvas.coords
+        for layer, outline_items, items in self._bindings:
+            if not layer.dirty:
+                continue
+            layer.dirty = False
+            for item, shape in zip(outline_items, layer.shapes):
+                coords(item, *shape)
+            for item, shape in zip(items, layer.shapes):
+                coords(item, *shape)
+
+    def set_visible(self, visible):
+        self.canvas.itemconfigure(self.tag, state="normal" if visible else "hidden")
@@ -0,0 +1,247 @@
+import json
+import time
+
+class LogLinearHistogram:
+    """HDR-style histogram of non-negative integers with bounded relative error and fixed memory.
+
+    Values below 2**sub_bits get a bucket each; above that, every power-of-two range is split
+    into 2**(sub_bits - 1) equal buckets, so any value is known to within 2**-(sub_bits - 1)
+    of itself (about 6% with the default 5 bits). Values past 2**max_bits - 1 are clamped.
+    Recording is a bit_length() and a list increment.
+    """
+
+    def __init__(self, sub_bits=5, max_bits=32):
+        self.sub_bits = sub_bits
+        self.max_bits = max_bits
+        self.sub_count = 1 << sub_bits
+        self.half = self.sub_count >> 1
+        self.max_value = (1 << max_bits) - 1
+        self.counts = [0] * (self.sub_count + (max_bits - sub_bits) * self.half)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        if value < self.sub_count:
+            return value
+        shift = value.bit_length() - self.sub_bits
+        return self.sub_count + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def _bucket_range(self, index):
+        """Returns the (lowest, highest) value a bucket holds."""
+        if index < self.sub_count:
+            return index, index
+        shift = (index - self.sub_count) // self.half + 1
+        low = ((index - self.sub_count) % self.half + self.half) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value):
+        value = min(max(int(value), 0), self.max_value)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """Returns a value (the middle of its bucket) at the given fraction (0-1) of samples, or 0."""
+        if not self.count:
+            return 0
+        threshold = max(fraction * self.count, 1)
+        running = 0
+        for index, bucket_count in enumerate(self.counts):
+            running += bucket_count
+            if running >= threshold:
+                low, high = self._bucket_range(index)
+                return min(max((low + high) // 2, self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other):
+        """Adds another histogram with the same layout into this one."""
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def encode(self):
+        """Returns a compact JSON-serialisable form holding only the non-empty buckets."""
+        return {
+            "bits": [self.sub_bits, self.max_bits],
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "buckets": [[index, bucket_count] for index, bucket_count in enumerate(self.counts) if bucket_count]
+        }
+
+    @classmethod
+    def decode(cls, data):
+        histogram = cls(*data["bits"])
+        for index, bucket_count in data["buckets"]:
+            histogram.counts[index] = bucket_count
+            histogram.count += bucket_count
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+class SessionStats:
+    """Counter-strafe and movement statistics for one session, in constant memory.
+
+    Fed from the input stream and the animation loop (see CrosshairModel.set_session_stats):
+    - strafe gaps: release-to-opposite-press time of each counter-strafe (microseconds),
+      and overlaps, where the new key went down before the old one came up
+    - settle times: from the spread target dropping back to its minimum until the drawn
+      spread gets within `settle_px` of it (milliseconds)
+    - shots: left clicks, and how many of them were made while moving
+    """
+
+    HISTOGRAMS = ("strafe_gaps", "strafe_overlaps", "settle_times")
+
+    def __init__(self, settle_px=0.5, clock=time.time):
+        self.started = clock()
+        self.clock = clock
+        self.settle_px = settle_px
+        self.strafe_gaps = LogLinearHistogram() # us
+        self.strafe_overlaps = LogLinearHistogram() # us
+        self.settle_times = LogLinearHistogram() # ms
+        self.counter_strafes = 0
+        self.perfect_strafes = 0
+        self.shots = 0
+        self.shots_moving = 0
+        self._settle_start = None
+        self._last_target = 0.0
+
+    def record_strafe(self, gap_ns, quality):
+        """Records one counter-strafe; a negative gap is an overlap."""
+        self.counter_strafes += 1
+        if quality >= 1.0:
+            self.perfect_strafes += 1
+        if gap_ns >= 0:
+            self.strafe_gaps.record(gap_ns // 1000)
+        else:
+            self.strafe_overlaps.record(-gap_ns // 1000)
+
+    def record_shot(self, moving):
+        self.shots += 1
+        if moving:
+            self.shots_moving += 1
+
+    def on_frame(self, now, target, current):
+        """Tracks the time the spread takes to settle at its minimum; now is in seconds."""
+        if target != self._last_target:
+            self._settle_start = now if target <= 0 < self._last_target else None
+            self._last_target = target
+        if self._settle_start is not None and current - target <= self.settle_px:
+            self.settle_times.record((now - self._settle_start) * 1000)
+            self._settle_start = None
+
+    def summary(self):
+        return summarize(self.started, self.clock() - self.started, self.counter_strafes, self.perfect_strafes,
+                         self.shots, self.shots_moving, self.strafe_gaps, self.strafe_overlaps, self.settle_times)
+
+    def to_record(self):
+        """Returns the session as one session log entry (a precomputed summary plus the histograms)."""
+        record = self.summary()
+        for name in self.HISTOGRAMS:
+            record[name] = getattr(self, name).encode()
+        return record
+
+def summarize(started, duration, counter_strafes, perfect_strafes, shots, shots_moving,
+              strafe_gaps, strafe_overlaps, settle_times):
+    """Returns the summary shown by the session viewer (times in milliseconds)."""
+    return {
+        "started": round(started),
+        "duration_s": round(duration),
+        "counter_strafes": counter_strafes,
+        "perfect_strafes": perfect_strafes,
+        "overlaps": strafe_overlaps.count,
+        "gap_p50_ms": round(strafe_gaps.percentile(0.5) / 1000, 1),
+        "gap_p90_ms": round(strafe_gaps.percentile(0.9) / 1000, 1),
+        "settle_p50_ms": settle_times.percentile(0.5),
+        "shots": shots,
+        "shots_moving": shots_moving,
+        "moving_shot_ratio": round(shots_moving / shots, 3) if shots else 0.0
+    }
+
+def read_session_log(path):
+    """Reads a session log. Returns (summaries, newest first; summary of all sessions or None)."""
+    summaries = []
+    totals = {name: LogLinearHistogram() for name in SessionStats.HISTOGRAMS}
+    counters = dict.fromkeys(("duration_s", "counter_strafes", "perfect_strafes", "shots", "shots_moving"), 0)
+    try:
+        with open(path) as f:
+            lines = f.readlines()
+    except OSError:
+        return [], None
+    for line in lines:
+        try:
+            record = json.loads(line)
+            histograms = {name: LogLinearHistogram.decode(record[name]) for name in SessionStats.HISTOGRAMS}
+            for name in counters:
+                counters[name] += record[name]
+        except (ValueError, KeyError, TypeError, IndexError):
+            continue # Skip malformed lines (e.g. one cut short by a crash)
+        for name, histogram in histograms.items():
+            totals[name].merge(histogram)
+        summaries.append({key: value for key, value in record.items() if key not in totals})
+    if not summaries:
+        return [], None
+    summaries.reverse()
+    overall = summarize(summaries[-1]["started"], counters["duration_s"], counters["counter_strafes"],
+                        counters["perfect_strafes"], counters["shots"], counters["shots_moving"],
+                        totals["strafe_gaps"], totals["strafe_overlaps"], totals["settle_times"])
+    return summaries, overall
+
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+
+    # Every value lands in a bucket within the promised relative error
+    histogram = LogLinearHistogram()
+    for value in (0, 1, 31, 32, 33, 100, 1000, 123456, 2**31, 2**40):
+        low, high = histogram._bucket_range(histogram._index(min(value, histogram.max_value)))
+        assert low <= min(value, histogram.max_value) <= high and high - low <= max(low, 1) / 16, (value, low, high)
+    values = [random.randint(0, 200_000) for _ in range(10_000)]
+    for value in values:
+        histogram.record(value)
+    exact = sorted(values)[len(values) // 2]
+    assert abs(histogram.percentile(0.5) - exact) <= exact / 16 + 1
+    assert LogLinearHistogram.decode(json.loads(json.dumps(histogram.encode()))).counts == histogram.counts
+
+    # A short session: two counter-strafes, a settle, and shots
+    now = [1000.0]
+    stats = SessionStats(clock=lambda: now[0])
+    stats.record_strafe(8_000_000, 1.0)
+    stats.record_strafe(-3_000_000, 1.0)
+    stats.record_shot(moving=True)
+    stats.record_shot(moving=False)
+    stats.on_frame(0.00, 6.0, 6.0)
+    stats.on_frame(0.10, 0.0, 6.0) # Spread target drops to the minimum
+    stats.on_frame(0.20, 0.0, 2.0)
+    stats.on_frame(0.25, 0.0, 0.4) # Settled after 150 ms
+    now[0] += 60
+    summary = stats.summary()
+    assert summary["counter_strafes"] == 2 and summary["overlaps"] == 1 and summary["moving_shot_ratio"] == 0.5
+    assert abs(summary["settle_p50_ms"] - 150) <= 150 / 16 and abs(summary["gap_p50_ms"] - 8) <= 0.5, summary
+
+    path = os.path.join(tempfile.gettempdir(), "session_stats_check.jsonl")
+    with open(path, "w") as f:
+        f.write(json.dumps(stats.to_record(), separators=(",", ":")) + "\n")
+        f.write("{\"truncated\n")
+        f.write(json.dumps(stats.to_record(), separators=(",", ":")) + "\n")
+    sessions, overall = read_session_log(path)
+    os.remove(path)
+    assert len(sessions) == 2 and overall["counter_strafes"] == 4 and overall["duration_s"] == 120
+    print(overall)
+    print("Session stats checks passed.")
@@ -0,0 +1,68 @@
+import math
+
+FRAME_SECONDS = 0.016 # Frame interval the old per-frame lerp factors were tuned for
+
+def omega_from_lerp(factor):
+    """Converts a per-frame lerp factor (0-1) into the equivalent spring frequency in 1/s.
+
+    Two chained lerps with rate k behave like a critically damped spring with omega = k,
+    so existing speed settings keep roughly the same feel.
+    """
+    factor = min(max(factor, 0.001), 0.999)
+    return -math.log(1.0 - factor) / FRAME_SECONDS
+
+class CriticallyDampedSpring:
+    """A critically damped spring with an exact closed-form solution.
+
+    x(t) = target + (c1 + c2 * t) * exp(-omega * t), where t is the time since the last retarget.
+    The position can be evaluated at any timestamp, so skipped or irregular frames never drift.
+    """
+
+    SETTLE_EPSILON = 0.01 # Pixels; below this distance (and matching velocity) the spring is settled
+
+    def __init__(self, value=0.0, omega=10.0, now=0.0):
+        self.target = value
+        self.omega = omega
+        self.t0 = now
+        self.c1 = 0.0
+        self.c2 = 0.0
+        self.settled = True
+
+    def retarget(self, target, omega, now):
+        """Changes the target and/or frequency, continuing smoothly from the state at now."""
+        if target == self.target and omega == self.omega:
+            return
+        x, v = self.evaluate(now)
+        self.t0 = now
+        self.target = target
+        self.omega = omega
+        self.c1 = x - target
+        self.c2 = v + omega * self.c1
+        self.settled = self.c1 == 0.0 and v == 0.0
+
+    def evaluate(self, now):
+        """Returns the exact (position, velocity) at the given time."""
+        if self.settled:
+            return self.target, 0.0
+        t = max(now - self.t0, 0.0)
+        decay = math.exp(-self.omega * t)
+        offset = self.c1 + self.c2 * t
+        return self.target + offset * decay, (self.c2 - self.omega * offset) * decay
+
+    def sample(self, now):
+        """Returns the position at now, snapping exactly onto the target once settled."""
+        if self.settled:
+            return self.target
+        x, v = self.evaluate(now)
+        if abs(x - self.target) < self.SETTLE_EPSILON and abs(v) < self.SETTLE_EPSILON * self.omega:
+            self.settled = True
+            return self.target
+        return x
+
+    def snap(self, value, now):
+        """Jumps straight to value with no motion."""
+        self.target = value
+        self.t0 = now
+        self.c1 = 0.0
+        self.c2 = 0.0
+        self.settled = True
@@ -0,0 +1,124 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+
+# Fixed little-endian layout shared with external readers.
+# Header: magic, layout version, payload size, sequence counter (odd while a write is in progress)
+HEADER = struct.Struct('<4sHHI')
+# Payload: frame counter, wall-clock timestamp (ns), gap, length, spread offset, recoil offset,
+# jitter x, jitter y, input bitmask
+PAYLOAD = struct.Struct('<QQffffffI')
+MAGIC = b'CHST'
+VERSION = 1
+SEQ_OFFSET = 8
+PAYLOAD_OFFSET = 16
+STATE_SIZE = 64
+
+# Input bitmask flags
+INPUT_FORWARD = 1 << 0
+INPUT_BACKWARD = 1 << 1
+INPUT_LEFT = 1 << 2
+INPUT_RIGHT = 1 << 3
+INPUT_CROUCH = 1 << 4
+INPUT_MOUSE_LEFT = 1 << 5
+INPUT_MOUSE_RIGHT = 1 << 6
+INPUT_COUNTER_STRAFE = 1 << 7
+
+STATE_FIELDS = ('frame', 'timestamp_ns', 'current_gap', 'current_length', 'current_spread_offset',
+                'recoil_offset', 'jitter_x', 'jitter_y', 'input_bits')
+
+def default_state_path():
+    """Returns the default location of the shared state file (RAM-backed where available)."""
+    if sys.platform.startswith("linux") and os.path.isdir("/dev/shm"):
+        return "/dev/shm/crosshair_state"
+    return os.path.join(tempfile.gettempdir(), "crosshair_state.bin")
+
+class SharedStateExporter:
+    """Publishes the live crosshair state into a memory-mapped file using a seqlock.
+
+    An existing file is reused in place, so external readers can keep it mapped while the
+    exporter is closed and recreated (e.g. when state_export_enabled is toggled).
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_state_path()
+        # Never truncate: a reader that already has the file mapped would get SIGBUS
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(fd).st_size < STATE_SIZE:
+            os.ftruncate(fd, STATE_SIZE)
+        self._file = os.fdopen(fd, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), STATE_SIZE)
+        # Carry on from the previous exporter's sequence (made even) and frame counter, so open
+        # readers stay consistent and keep seeing new frames
+        magic, version, _, seq = HEADER.unpack_from(self._map, 0)
+        if magic == MAGIC and version == VERSION:
+            self.seq = (seq + 1) & ~1
+            self.frame = PAYLOAD.unpack_from(self._map, PAYLOAD_OFFSET)[0]
+        else:
+            self.seq = 0
+            self.frame = 0
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, PAYLOAD.size, self.seq & 0xFFFFFFFF)
+
+    def publish(self, current_gap, current_length, current_spread_offset,
+                recoil_offset, jitter_x, jitter_y, input_bits):
+        """Writes one frame of state. Readers retry if they observe an odd or changed sequence."""
+        self.frame += 1
+        self.seq += 1 # Odd: write in progress
+        struct.pack_into('<I', self._map, SEQ_OFFSET, self.seq & 0xFFFFFFFF)
+        PAYLOAD.pack_into(self._map, PAYLOAD_OFFSET, self.frame, time.time_ns(),
+                          current_gap, current_length, current_spread_offset,
+                          recoil_offset, jitter_x, jitter_y, input_bits)
+        self.seq += 1 # Even: write complete
+        struct.pack_into('<I', self._map, SEQ_OFFSET, self.seq & 0xFFFFFFFF)
+
+    def close(self):
+        """Unmaps and closes the shared state file."""
+        self._map.close()
+        self._file.close()
+
+class SharedStateReader:
+    """Reads consistent snapshots of the crosshair state published by SharedStateExporter."""
+
+    def __init__(self, path=None):
+        self.path = path or default_state_path()
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), STATE_SIZE, access=mmap.ACCESS_READ)
+        magic, version, payload_size, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or payload_size != PAYLOAD.size:
+            self.close()
+            raise ValueError(f"{self.path} is not a crosshair state file (version {VERSION})")
+
+    def read(self, max_retries=100):
+        """Returns the latest state as a dict, or None if no consistent snapshot could be taken."""
+        for _ in range(max_retries):
+            seq_before = struct.unpack_from('<I', self._map, SEQ_OFFSET)[0]
+            if seq_before & 1:
+                continue
+            values = PAYLOAD.unpack_from(self._map, PAYLOAD_OFFSET)
+            if struct.unpack_from('<I', self._map, SEQ_OFFSET)[0] == seq_before:
+                return dict(zip(STATE_FIELDS, values))
+        return None
+
+    def close(self):
+        """Unmaps and closes the shared state file."""
+        self._map.close()
+        self._file.close()
+
+# Example reader (poll the live state from another process)
+if __name__ == "__main__":
+    reader = SharedStateReader(sys.argv[1] if len(sys.argv) > 1 else None)
+    try:
+        last_frame = None
+        while True:
+            state = reader.read()
+            if state and state['frame'] != last_frame:
+                last_frame = state['frame']
+                print(state)
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
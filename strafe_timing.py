@@ -0,0 +1,197 @@
+import math
+from collections import deque
+
+NS_PER_MS = 1_000_000
+
+class _Axis:
+    """Timing state for one pair of opposite movement keys."""
+
+    __slots__ = ('keys', 'held', 'press_ns', 'release_ns', 'active', 'expires_ns', 'overlap_pending',
+                 'quality', 'last_gap_ns', 'gaps', 'gap_sum', 'gap_sq_sum', 'count')
+
+    def __init__(self, keys, history):
+        self.keys = keys
+        self.held = [False, False]
+        self.press_ns = [0, 0]
+        self.release_ns = [None, None] # Last release not yet matched with an opposite press
+        self.active = -1 # Index of the key counter-strafed into, or -1
+        self.expires_ns = None # When the active counter-strafe ends (None while an overlap lasts)
+        self.overlap_pending = False # Opposite key pressed while the other was still held
+        self.quality = 0.0
+        self.last_gap_ns = None
+        self.gaps = deque(maxlen=history)
+        self.gap_sum = 0
+        self.gap_sq_sum = 0
+        self.count = 0 # Counter-strafes since start (the window only keeps the recent ones)
+
+class StrafeTimer:
+    """Counter-strafe detection from release-to-opposite-press timing, per movement axis.
+
+    Timestamps are perf_counter_ns() values taken at hook entry. A counter-strafe is a press
+    of one key within window_ms after releasing the opposite key (a positive gap), or while
+    the opposite key is still held (an overlap, recorded as a negative gap once it's released).
+    Gaps within perfect_ms score quality 1.0, falling linearly to 0.0 at window_ms.
+    A counter-strafe stays active for window_ms after it completes (see expire()), so
+    running on with the new key returns to normal movement.
+
+    Each axis keeps its recent gaps in a fixed-size window with running sums, so every event
+    and every stats query is O(1).
+    """
+
+    def __init__(self, axes=(('moveleft', 'moveright'), ('forward', 'back')), window_ms=100.0, perfect_ms=10.0, history=16):
+        self.window_ns = 0
+        self.perfect_ns = 0
+        self.axes = [_Axis(keys, history) for keys in axes]
+        self._key_map = {} # key -> (axis, index of the key within its axis)
+        self.on_record = None # Optional on_record(gap_ns, quality), called for every recorded gap
+        for axis in self.axes:
+            self._key_map[axis.keys[0]] = (axis, 0)
+            self._key_map[axis.keys[1]] = (axis, 1)
+        self.configure(window_ms, perfect_ms, history)
+
+    def configure(self, window_ms, perfect_ms, history=16):
+        """Updates the timing thresholds and window size. Resizing the window clears it."""
+        self.window_ns = int(window_ms * NS_PER_MS)
+        self.perfect_ns = int(min(perfect_ms, window_ms) * NS_PER_MS)
+        for axis in self.axes:
+            if axis.gaps.maxlen != history:
+                axis.gaps = deque(maxlen=history)
+                axis.gap_sum = 0
+                axis.gap_sq_sum = 0
+
+    def _score(self, gap_ns):
+        gap_ns = abs(gap_ns)
+        if gap_ns <= self.perfect_ns:
+            return 1.0
+        if gap_ns >= self.window_ns:
+            return 0.0
+        return 1.0 - (gap_ns - self.perfect_ns) / (self.window_ns - self.perfect_ns)
+
+    def _record(self, axis, gap_ns):
+        gaps = axis.gaps
+        if len(gaps) == gaps.maxlen:
+            old = gaps[0] # Evicted by the append below
+            axis.gap_sum -= old
+            axis.gap_sq_sum -= old * old
+        gaps.append(gap_ns)
+        axis.gap_sum += gap_ns
+        axis.gap_sq_sum += gap_ns * gap_ns
+        axis.count += 1
+        axis.last_gap_ns = gap_ns
+        axis.quality = self._score(gap_ns)
+        if self.on_record is not None:
+            self.on_record(gap_ns, axis.quality)
+
+    def press(self, key, t_ns):
+        """Handles a key press. Returns True if it started a counter-strafe."""
+        entry = self._key_map.get(key)
+        if entry is None:
+            return False
+        axis, i = entry
+        if axis.held[i]:
+            return False # Key repeat
+        j = 1 - i
+        axis.held[i] = True
+        axis.press_ns[i] = t_ns
+        released = axis.release_ns[j]
+        axis.release_ns[j] = None
+        if axis.held[j]:
+            # Overlap; its length is only known once the opposite key is released
+            axis.active = i
+            axis.expires_ns = None
+            axis.overlap_pending = True
+            axis.quality = 1.0
+            return True
+        if released is not None and t_ns - released <= self.window_ns:
+            axis.active = i
+            axis.expires_ns = t_ns + self.window_ns
+            axis.overlap_pending = False
+            self._record(axis, t_ns - released)
+            return True
+        axis.active = -1
+        return False
+
+    def release(self, key, t_ns):
+        """Handles a key release."""
+        entry = self._key_map.get(key)
+        if entry is None:
+            return
+        axis, i = entry
+        axis.held[i] = False
+        axis.release_ns[i] = t_ns
+        j = 1 - i
+        if axis.active == j and axis.overlap_pending:
+            axis.overlap_pending = False
+            axis.expires_ns = t_ns + self.window_ns
+            self._record(axis, -(t_ns - axis.press_ns[j]))
+        elif axis.active == i:
+            axis.active = -1
+            axis.overlap_pending = False
+
+    def expire(self, t_ns):
+        """Ends counter-strafes older than window_ms at time t_ns. Returns True if any ended."""
+        expired = False
+        for axis in self.axes:
+            if axis.active >= 0 and axis.expires_ns is not None and t_ns >= axis.expires_ns:
+                axis.active = -1
+                axis.expires_ns = None
+                expired = True
+        return expired
+
+    @property
+    def active(self):
+        """True while any axis has an unexpired counter-strafe and still holds its new key."""
+        for axis in self.axes:
+            if axis.active >= 0:
+                return True
+        return False
+
+    @property
+    def quality(self):
+        """Quality (0-1) of the best currently active counter-strafe, or 0.0."""
+        best = 0.0
+        for axis in self.axes:
+            if axis.active >= 0 and axis.quality > best:
+                best = axis.quality
+        return best
+
+    def get_stats(self):
+        """Returns per-axis timing statistics over the current windows, in milliseconds."""
+        stats = {}
+        for axis in self.axes:
+            n = len(axis.gaps)
+            entry = {"count": axis.count, "window": n}
+            if n:
+                mean = axis.gap_sum / n
+                variance = max(axis.gap_sq_sum / n - mean * mean, 0.0)
+                entry["mean_gap_ms"] = round(mean / NS_PER_MS, 3)
+                entry["stdev_gap_ms"] = round(math.sqrt(variance) / NS_PER_MS, 3)
+                entry["last_gap_ms"] = round(axis.last_gap_ns / NS_PER_MS, 3)
+                entry["last_quality"] = round(axis.quality, 3)
+            stats["/".join(axis.keys)] = entry
+        return stats
+
+if __name__ == "__main__":
+    ms = NS_PER_MS
+    timer = StrafeTimer(window_ms=100, perfect_ms=10)
+    timer.press('moveleft', 0)
+    timer.release('moveleft', 1000 * ms)
+    assert timer.press('moveright', 1005 * ms) and timer.active and timer.quality == 1.0
+
+    # Counter-strafe, then keep running with the new key
+    assert not timer.expire(1050 * ms) and timer.active
+    assert timer.expire(1105 * ms) and not timer.active and timer.quality == 0.0
+    assert not timer.expire(5000 * ms)
+
+    # Overlap: active while both keys are held, then for window_ms after the release
+    assert timer.press('moveleft', 6000 * ms) and timer.active
+    assert not timer.expire(60_000 * ms) and timer.active
+    timer.release('moveright', 60_020 * ms)
+    assert timer.get_stats()["moveleft/moveright"]["last_gap_ms"] == -54_020.0
+    assert timer.active and timer.expire(60_120 * ms) and not timer.active
+
+    # A late press isn't a counter-strafe
+    timer.release('moveleft', 61_000 * ms)
+    assert not timer.press('moveright', 61_200 * ms) and not timer.active
+    assert timer.get_stats()["moveleft/moveright"]["count"] == 2
+    print("Strafe timing checks passed.")
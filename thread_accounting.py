@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None # Thread accounting is then only available where /proc is
+
+logger = logging.getLogger(__name__)
+
+TASK_DIR = "/proc/self/task"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def read_proc_threads(task_dir=TASK_DIR):
+    """Returns {tid: (kernel name, CPU seconds, voluntary switches, involuntary switches)} from procfs.
+
+    CPU time comes from schedstat (nanoseconds) where the kernel has it, otherwise from
+    the utime and stime clock ticks in stat. A voluntary switch is the thread blocking,
+    so each one is followed by a wakeup.
+    """
+    threads = {}
+    for entry in os.listdir(task_dir):
+        path = os.path.join(task_dir, entry)
+        try:
+            with open(os.path.join(path, "stat")) as f:
+                stat = f.read()
+            with open(os.path.join(path, "status")) as f:
+                status = f.read()
+        except OSError:
+            continue # The thread exited while we were listing
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        fields = stat[stat.rindex(")") + 2:].split() # Starts at field 3 (state)
+        cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        try:
+            with open(os.path.join(path, "schedstat")) as f:
+                cpu = int(f.read().split()[0]) / 1_000_000_000
+        except (OSError, ValueError, IndexError):
+            pass
+        voluntary = involuntary = None
+        for line in status.splitlines():
+            if line.startswith("voluntary_ctxt_switches:"):
+                voluntary = int(line.split()[1])
+            elif line.startswith("nonvoluntary_ctxt_switches:"):
+                involuntary = int(line.split()[1])
+        threads[int(entry)] = (name, cpu, voluntary, involuntary)
+    return threads
+
+def read_psutil_threads(process=None):
+    """Returns the same mapping as read_proc_threads() from psutil (CPU time only)."""
+    process = process or psutil.Process()
+    return {thread.id: (None, thread.user_time + thread.system_time, None, None) for thread in process.threads()}
+
+def default_reader():
+    """Returns the best per-thread reader for this platform, or None if there is none."""
+    if os.path.isdir(TASK_DIR):
+        return read_proc_threads
+    if psutil is not None:
+        return read_psutil_threads
+    return None
+
+class ThreadAccounting:
+    """Attributes the process's CPU time, wakeups and preemptions to its named threads.
+
+    Each sample() reads every thread's counters and turns the change since the previous
+    sample into rates. Threads are named from threading.enumerate() by native id (the
+    input watchdog names the pynput threads after their hook), falling back to the
+    kernel's thread name. sample() is meant to be called every few seconds off the Tk
+    thread; the latest rows are replaced in one assignment, so readers never see half a sample.
+    """
+
+    def __init__(self, reader=None, clock=time.monotonic):
+        self.reader = reader or default_reader()
+        self.clock = clock
+        self.previous = None
+        self.previous_time = None
+        self.rows = [] # Latest per-thread rates, busiest first
+        self.interval = 0.0
+        self.samples = 0
+        self.failures = 0
+
+    @property
+    def available(self):
+        return self.reader is not None
+
+    def sample(self):
+        """Reads the thread counters and updates the rows. Returns the rows."""
+        now = self.clock()
+        try:
+            threads = self.reader()
+        except (OSError, ValueError) as e:
+            self.failures += 1
+            logger.debug("Could not read thread counters: %s", e)
+            return self.rows
+        names = {thread.native_id: thread.name for thread in threading.enumerate()}
+        previous = self.previous
+        if previous is not None and now > self.previous_time:
+            elapsed = now - self.previous_time
+            rows = []
+            for tid, (kernel_name, cpu, voluntary, involuntary) in threads.items():
+                before = previous.get(tid)
+                if before is None:
+                    continue # Started since the last sample
+                rows.append({
+                    "thread": names.get(tid) or kernel_name or f"tid {tid}",
+                    "tid": tid,
+                    "cpu_pct": round((cpu - before[1]) / elapsed * 100, 1),
+                    "cpu_s": round(cpu, 2),
+                    "wakeups_per_s": _rate(voluntary, before[2], elapsed),
+                    "preemptions_per_s": _rate(involuntary, before[3], elapsed)
+                })
+            rows.sort(key=lambda row: row["cpu_pct"], reverse=True)
+            self.rows = rows
+            self.interval = elapsed
+        self.previous = threads
+        self.previous_time = now
+        self.samples += 1
+        return self.rows
+
+    def get_stats(self):
+        return {
+            "interval_s": round(self.interval, 2),
+            "samples": self.samples,
+            "threads": self.rows
+        }
+
+def _rate(count, before, elapsed):
+    """Returns a counter's rate per second, or None where the platform doesn't report it."""
+    if count is None or before is None:
+        return None
+    return round((count - before) / elapsed, 1)
+
+if __name__ == "__main__":
+    accounting = ThreadAccounting()
+    if not accounting.available:
+        print("No per-thread counters on this platform.")
+    else:
+        stop = threading.Event()
+        def spin():
+            while not stop.is_set():
+                sum(range(1000))
+        def nap():
+            while not stop.wait(0.005):
+                pass
+        workers = [threading.Thread(target=spin, name="spinner"), threading.Thread(target=nap, name="napper")]
+        for worker in workers:
+            worker.start()
+        accounting.sample()
+        time.sleep(0.5)
+        rows = {row["thread"]: row for row in accounting.sample()}
+        stop.set()
+        for worker in workers:
+            worker.join()
+        for row in rows.values():
+            print(row)
+        assert rows["spinner"]["cpu_pct"] > rows["napper"]["cpu_pct"]
+        if rows["napper"]["wakeups_per_s"] is not None:
+            assert rows["napper"]["wakeups_per_s"] > 50 # About 200 naps a second
+        print("Thread accounting checks passed.")
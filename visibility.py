@@ -0,0 +1,116 @@
+import time
+
+# Reasons the crosshair can be hidden for
+HIDE_REASONS = ("game", "hold", "menu", "idle")
+
+class VisibilityController:
+    """Decides whether the crosshair is shown, and accounts for the time the frame loop sleeps.
+
+    The crosshair is hidden while any reason is active: the game isn't running, a hide key
+    or button is held, the menu is open, or no input arrived for `idle_timeout` seconds.
+    The overlay stops scheduling frames while hidden and restarts them from the event that
+    clears the last reason. set() and the idle checks run on the Tk thread; note_input()
+    is a plain store, so the input hooks can call it from their own threads.
+    """
+
+    def __init__(self, idle_timeout=0.0, frame_interval_ms=16, clock=time.perf_counter):
+        self.idle_timeout = idle_timeout # Seconds; 0 disables the idle rule
+        self.frame_interval = frame_interval_ms / 1000
+        self.clock = clock
+        self.hidden_by = set()
+        self.held = set() # Hide keys and buttons currently down
+        self.last_input = clock()
+        self.suspended_at = None
+        self.suspended_total = 0.0
+        self.suspensions = 0
+        self.frames_skipped = 0
+        self.wakes = 0 # Times the Tk thread woke while suspended (input or control commands)
+
+    @property
+    def visible(self):
+        return not self.hidden_by
+
+    def set(self, reason, hidden, now=None):
+        """Activates or clears one reason. Returns True if the crosshair was shown or hidden by it."""
+        if reason not in HIDE_REASONS:
+            raise ValueError(f"Unknown hide reason: {reason}")
+        was_visible = not self.hidden_by
+        if hidden:
+            self.hidden_by.add(reason)
+        else:
+            self.hidden_by.discard(reason)
+        if was_visible == (not self.hidden_by):
+            return False
+        now = self.clock() if now is None else now
+        if was_visible:
+            self.suspended_at = now
+            self.suspensions += 1
+        else:
+            slept = now - self.suspended_at
+            self.suspended_total += slept
+            self.frames_skipped += int(slept / self.frame_interval)
+            self.suspended_at = None
+        return True
+
+    def hold(self, name, pressed, now=None):
+        """Tracks a hide key or button; the crosshair stays hidden until all of them are up."""
+        if pressed:
+            self.held.add(name)
+        else:
+            self.held.discard(name)
+        return self.set("hold", bool(self.held), now)
+
+    def note_wake(self):
+        """Counts a wake of the Tk thread that happened while the frame loop was suspended."""
+        if self.hidden_by:
+            self.wakes += 1
+
+    def note_input(self, now=None):
+        """Records user input for the idle rule. Safe to call from any thread."""
+        self.last_input = self.clock() if now is None else now
+
+    def idle_expired(self, now):
+        """Returns True if the idle timeout has run out (and it isn't already hiding the crosshair)."""
+        return bool(self.idle_timeout) and "idle" not in self.hidden_by and now - self.last_input >= self.idle_timeout
+
+    def get_stats(self, now=None):
+        now = self.clock() if now is None else now
+        suspended = self.suspended_total
+        skipped = self.frames_skipped
+        if self.suspended_at is not None:
+            suspended += now - self.suspended_at
+            skipped += int((now - self.suspended_at) / self.frame_interval)
+        return {
+            "visible": self.visible,
+            "hidden_by": sorted(self.hidden_by),
+            "suspended_s": round(suspended, 1),
+            "suspensions": self.suspensions,
+            "suspended_wakes": self.wakes,
+            "wakeups_saved": max(skipped - self.wakes, 0) # Frames not run, less the wakes that happened instead
+        }
+
+if __name__ == "__main__":
+    now = [0.0]
+    visibility = VisibilityController(idle_timeout=30, clock=lambda: now[0])
+    assert visibility.visible and not visibility.idle_expired(10)
+
+    # Right mouse held for 0.5 s: one suspension, about 31 frames not drawn
+    assert visibility.hold("right", True, 1.0) and not visibility.visible
+    assert not visibility.set("menu", True, 1.2) # Already hidden
+    assert not visibility.hold("right", False, 1.5) # Still hidden by the menu
+    assert visibility.set("menu", False, 1.5) and visibility.visible
+    assert visibility.suspensions == 1 and visibility.frames_skipped == 31
+
+    # Idle for 30 s, then input wakes it
+    assert visibility.idle_expired(31.0)
+    visibility.set("idle", True, 31.0)
+    assert not visibility.idle_expired(40.0)
+    visibility.note_wake() # e.g. a control command drained while hidden
+    visibility.note_input(41.0)
+    visibility.set("idle", False, 41.0)
+    now[0] = 41.0
+    stats = visibility.get_stats()
+    assert stats["suspensions"] == 2 and stats["suspended_s"] == 10.5 and stats["visible"], stats
+    assert stats["wakeups_saved"] == 31 + 625 - 1, stats
+    print(stats)
+    print("Visibility checks passed.")